@@ -0,0 +1,427 @@
+import decimal
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Columnas que se mantienen en memoria por tabla (las mismas que usa la instantánea de la cartera)
+COLUMNAS_PROYECTO = ['id', 'proyecto_id', 'nombre', 'estado', 'fecha_inicio', 'fecha_fin',
+                     'presupuesto_estimado', 'costo_total_recursos', 'porcentaje_progreso']
+COLUMNAS_TAREA = ['id', 'nombre', 'estado', 'fecha_comienzo', 'fecha_final', 'proyecto_id', 'responsable_id']
+COLUMNAS_EMPLEADO = ['id', 'empleado_id', 'nombre', 'disponibilidad', 'departamento', 'puesto']
+
+TABLAS = {
+    'proyectos': ('creativeminds_proyecto', COLUMNAS_PROYECTO),
+    'tareas': ('creativeminds_tarea', COLUMNAS_TAREA),
+    'empleados': ('creativeminds_empleado', COLUMNAS_EMPLEADO),
+}
+
+
+def _es_nulo(valor):
+    return valor is None or (isinstance(valor, float) and valor != valor)
+
+
+class AlmacenAgregados:
+    """Agregados de la cartera mantenidos en memoria a partir de los cambios en write_date.
+
+    La primera sincronización carga las tablas completas; las siguientes solo
+    leen las filas con write_date posterior al último punto de control (menos
+    un margen de solape para no perder transacciones que confirmaron tarde) y
+    aplican la diferencia entre la versión anterior y la nueva de cada fila.
+    Como write_date no refleja los borrados, cada `intervalo_reconciliacion`
+    segundos se compara el número de filas y la suma de ids de cada tabla con
+    los de memoria (una fila por tabla); solo si no coinciden se leen los ids
+    de esa tabla y se retiran las filas que ya no existen.
+
+    Cada proceso tiene su propia copia y su propio sondeo. Con el servidor de
+    producción (servidor.py, preload_app) la carga completa se hace una sola
+    vez en el proceso maestro antes del fork (preparar_maestro en app.py): los
+    workers, también los que se reciclan tras WEB_MAX_REQUESTS, heredan el
+    almacén ya cargado y solo leen los cambios posteriores a esa carga. El
+    coste por worker es entonces la consulta de sondeo por write_date y la
+    comprobación de recuentos de la reconciliación.
+    """
+
+    def __init__(self, intervalo_sondeo=2.0, solape_segundos=60, intervalo_reconciliacion=60):
+        self.intervalo_sondeo = intervalo_sondeo
+        self.solape = timedelta(seconds=solape_segundos)
+        self.intervalo_reconciliacion = intervalo_reconciliacion
+
+        self._lock = threading.RLock()
+        # Serializa las sincronizaciones (sondeo y peticiones) sin bloquear a los lectores
+        self._lock_sincronizacion = threading.Lock()
+        self._filas = {nombre: {} for nombre in TABLAS}
+        self._puntos_control = {nombre: None for nombre in TABLAS}
+        self._ultima_reconciliacion = 0.0
+        self._huella_sincronizada = None
+        self._hoy = None
+        self._cargado = False
+
+        # Agregados
+        self._proyectos_por_estado = Counter()
+        self._tareas_por_estado = Counter()
+        self._tareas_contadas = 0
+        self._tareas_por_responsable = Counter()
+        self._empleados_por_disponibilidad = Counter()
+        self._tareas_retrasadas_por_proyecto = Counter()
+        # Ids de las tareas de cada proyecto, para contarlas o descontarlas cuando el proyecto aparece o desaparece
+        self._tareas_de_proyecto = defaultdict(set)
+        self._retrasados = set()
+        self._suma_presupuesto = 0.0
+        self._suma_costo = 0.0
+        self._suma_progreso = 0.0
+        self._proyectos_con_progreso = 0
+
+        self.version = 0
+        self.sincronizaciones = 0
+        self.filas_aplicadas = 0
+        self.filas_eliminadas = 0
+        self.ultima_sincronizacion = None
+        self._marcos = None
+        self._version_marcos = None
+
+        self._hilo = None
+        self._pid_hilo = None
+        self._detener = threading.Event()
+        self._motor = None
+
+    @classmethod
+    def desde_entorno(cls):
+        """Crea el almacén con INCREMENTAL_POLL_SECONDS, INCREMENTAL_POLL_OVERLAP_SECONDS
+        e INCREMENTAL_RECONCILE_SECONDS"""
+        return cls(
+            intervalo_sondeo=float(os.getenv('INCREMENTAL_POLL_SECONDS', '2')),
+            solape_segundos=float(os.getenv('INCREMENTAL_POLL_OVERLAP_SECONDS', '60')),
+            intervalo_reconciliacion=float(os.getenv('INCREMENTAL_RECONCILE_SECONDS', '60')),
+        )
+
+    # Sincronización
+
+    def obtener(self, engine, huella=None):
+        """Devuelve el almacén listo para leer, sincronizándolo si no hay sondeo en segundo plano.
+
+        Si se indica la huella actual de las tablas y es distinta de la última
+        con la que se sincronizó, se sincroniza en el momento en lugar de
+        esperar al siguiente sondeo.
+        """
+        self._motor = engine
+        if not self._cargado or self.intervalo_sondeo <= 0 or (huella is not None and huella != self._huella_sincronizada):
+            self.sincronizar(engine)
+            if huella is not None:
+                self._huella_sincronizada = huella
+        self._iniciar_sondeo()
+        self._comprobar_dia()
+        return self
+
+    def sincronizar(self, engine):
+        """Lee las filas modificadas desde el último punto de control y aplica los cambios.
+
+        Las consultas se hacen sin el lock de lectura (solo se serializan entre
+        sí), de modo que metricas() y marcos() no esperan a la base de datos;
+        el lock se toma únicamente para aplicar las diferencias ya leídas.
+        """
+        with self._lock_sincronizacion:
+            reconciliar = time.monotonic() - self._ultima_reconciliacion >= self.intervalo_reconciliacion
+            with engine.connect() as conn:
+                leidas = {
+                    nombre: self._leer_cambios(conn, nombre, tabla, columnas)
+                    for nombre, (tabla, columnas) in TABLAS.items()
+                }
+                recuentos = self._leer_recuentos(conn) if reconciliar else None
+
+            with self._lock:
+                cambios = 0
+                for nombre, (filas, punto_control) in leidas.items():
+                    cambios += self._aplicar_cambios(nombre, filas)
+                    self._puntos_control[nombre] = punto_control
+                # Tablas con filas en memoria que pueden haberse borrado
+                descuadradas = [] if recuentos is None else [
+                    nombre for nombre, recuento in recuentos.items()
+                    if recuento != (len(self._filas[nombre]), sum(self._filas[nombre]))
+                ]
+
+            if descuadradas:
+                with engine.connect() as conn:
+                    existentes = self._leer_ids(conn, descuadradas)
+
+            with self._lock:
+                if descuadradas:
+                    cambios += self._reconciliar_borrados(existentes)
+                if reconciliar:
+                    self._ultima_reconciliacion = time.monotonic()
+
+                if not self._cargado:
+                    self._cargado = True
+                    logger.info(f"Almacén de agregados cargado ({len(self._filas['proyectos'])} proyectos, "
+                                f"{len(self._filas['tareas'])} tareas, {len(self._filas['empleados'])} empleados)")
+
+                self._comprobar_dia()
+                if cambios:
+                    self.version += 1
+                self.sincronizaciones += 1
+                self.ultima_sincronizacion = datetime.now()
+                return cambios
+
+    def _leer_cambios(self, conn, nombre, tabla, columnas):
+        """Filas modificadas desde el punto de control y el nuevo punto de control de la tabla"""
+        punto_control = self._puntos_control[nombre]
+        consulta = f"SELECT {', '.join(columnas)}, write_date FROM {tabla}"
+        parametros = {}
+        if punto_control is not None:
+            consulta += " WHERE write_date > :desde"
+            parametros["desde"] = punto_control - self.solape
+
+        filas = []
+        for fila in conn.execute(text(consulta), parametros).mappings():
+            # Los campos numeric de Odoo llegan como Decimal
+            fila = {k: float(v) if isinstance(v, decimal.Decimal) else v for k, v in fila.items()}
+            escritura = fila.pop('write_date')
+            if escritura is not None and (punto_control is None or escritura > punto_control):
+                punto_control = escritura
+            filas.append(fila)
+        return filas, punto_control
+
+    def _aplicar_cambios(self, nombre, filas):
+        """Aplica las filas leídas de una tabla (con el lock tomado)"""
+        aplicadas = 0
+        for fila in filas:
+            anterior = self._filas[nombre].get(fila['id'])
+            if anterior == fila:
+                # Fila ya aplicada (ventana de solape)
+                continue
+            self._aplicar(nombre, anterior, fila)
+            aplicadas += 1
+
+        self.filas_aplicadas += aplicadas
+        return aplicadas
+
+    @staticmethod
+    def _leer_recuentos(conn):
+        """Número de filas y suma de ids de cada tabla, en una sola consulta"""
+        consulta = " UNION ALL ".join(
+            f"SELECT '{nombre}', COUNT(*), COALESCE(SUM(id), 0) FROM {tabla}" for nombre, (tabla, _) in TABLAS.items()
+        )
+        return {nombre: (int(filas), int(suma)) for nombre, filas, suma in conn.execute(text(consulta))}
+
+    @staticmethod
+    def _leer_ids(conn, nombres):
+        """Ids existentes de las tablas indicadas"""
+        return {
+            nombre: {fila[0] for fila in conn.execute(text(f"SELECT id FROM {TABLAS[nombre][0]}"))}
+            for nombre in nombres
+        }
+
+    def _reconciliar_borrados(self, existentes):
+        """Retira de memoria las filas que ya no existen en la base de datos (con el lock tomado)"""
+        eliminadas = 0
+        for nombre, ids in existentes.items():
+            for fila_id in [i for i in self._filas[nombre] if i not in ids]:
+                self._aplicar(nombre, self._filas[nombre][fila_id], None)
+                eliminadas += 1
+        self.filas_eliminadas += eliminadas
+        return eliminadas
+
+    # Aplicación de diferencias
+
+    def _aplicar(self, nombre, anterior, nueva):
+        """Resta la versión anterior de una fila de los agregados y suma la nueva"""
+        if nombre == 'proyectos':
+            self._aplicar_proyecto(anterior, -1)
+            self._aplicar_proyecto(nueva, 1)
+        elif nombre == 'tareas':
+            self._aplicar_tarea(anterior, -1)
+        else:
+            if anterior is not None:
+                self._empleados_por_disponibilidad[anterior['disponibilidad']] -= 1
+            if nueva is not None:
+                self._empleados_por_disponibilidad[nueva['disponibilidad']] += 1
+
+        fila = nueva if nueva is not None else anterior
+        if nueva is None:
+            self._filas[nombre].pop(fila['id'], None)
+        else:
+            self._filas[nombre][fila['id']] = nueva
+
+        if nombre == 'proyectos' and (anterior is None) != (nueva is None):
+            # Las tareas del proyecto solo cuentan mientras el proyecto existe (como en el JOIN)
+            for tarea_id in self._tareas_de_proyecto[fila['id']]:
+                self._contar_tarea(self._filas['tareas'][tarea_id], 1 if nueva is not None else -1)
+        elif nombre == 'tareas':
+            self._aplicar_tarea(nueva, 1)
+
+        # Recalcular la marca de retraso solo de los proyectos afectados
+        if nombre == 'proyectos':
+            self._actualizar_retraso(fila['id'])
+        elif nombre == 'tareas':
+            for proyecto_id in {f['proyecto_id'] for f in (anterior, nueva) if f is not None}:
+                self._actualizar_retraso(proyecto_id)
+
+    def _aplicar_proyecto(self, fila, signo):
+        if fila is None:
+            return
+        self._proyectos_por_estado[fila['estado']] += signo
+        if not _es_nulo(fila['presupuesto_estimado']):
+            self._suma_presupuesto += signo * fila['presupuesto_estimado']
+        if not _es_nulo(fila['costo_total_recursos']):
+            self._suma_costo += signo * fila['costo_total_recursos']
+        if not _es_nulo(fila['porcentaje_progreso']):
+            self._suma_progreso += signo * fila['porcentaje_progreso']
+            self._proyectos_con_progreso += signo
+
+    def _aplicar_tarea(self, fila, signo):
+        """Suma o resta una tarea; solo entra en los recuentos si su proyecto está cargado"""
+        if fila is None:
+            return
+        tareas_proyecto = self._tareas_de_proyecto[fila['proyecto_id']]
+        if signo > 0:
+            tareas_proyecto.add(fila['id'])
+        else:
+            tareas_proyecto.discard(fila['id'])
+            if not tareas_proyecto:
+                del self._tareas_de_proyecto[fila['proyecto_id']]
+        if fila['proyecto_id'] in self._filas['proyectos']:
+            self._contar_tarea(fila, signo)
+        if self._tarea_retrasada(fila):
+            self._tareas_retrasadas_por_proyecto[fila['proyecto_id']] += signo
+
+    def _contar_tarea(self, fila, signo):
+        self._tareas_por_estado[fila['estado']] += signo
+        self._tareas_contadas += signo
+        if fila['responsable_id'] is not None:
+            self._tareas_por_responsable[fila['responsable_id']] += signo
+
+    def _tarea_retrasada(self, fila):
+        return fila['estado'] != 'completada' and fila['fecha_final'] is not None and fila['fecha_final'] < self._dia()
+
+    def _proyecto_vencido(self, fila):
+        return fila['estado'] != 'finalizado' and fila['fecha_fin'] is not None and fila['fecha_fin'] < self._dia()
+
+    def _actualizar_retraso(self, proyecto_id):
+        fila = self._filas['proyectos'].get(proyecto_id)
+        if fila is not None and (self._proyecto_vencido(fila) or self._tareas_retrasadas_por_proyecto[proyecto_id] > 0):
+            self._retrasados.add(proyecto_id)
+        else:
+            self._retrasados.discard(proyecto_id)
+
+    def _dia(self):
+        if self._hoy is None:
+            self._hoy = datetime.now().date()
+        return self._hoy
+
+    def _comprobar_dia(self):
+        """Al cambiar de día se recalculan en memoria las marcas que dependen de la fecha"""
+        with self._lock:
+            hoy = datetime.now().date()
+            if self._hoy == hoy:
+                return
+            self._hoy = hoy
+            self._tareas_retrasadas_por_proyecto = Counter(
+                fila['proyecto_id'] for fila in self._filas['tareas'].values() if self._tarea_retrasada(fila)
+            )
+            self._retrasados = set()
+            for proyecto_id in self._filas['proyectos']:
+                self._actualizar_retraso(proyecto_id)
+            self.version += 1
+
+    # Lectura
+
+    def metricas(self):
+        """Métricas generales del dashboard calculadas a partir de los agregados"""
+        with self._lock:
+            presupuesto = self._suma_presupuesto
+            return {
+                "total_proyectos": len(self._filas['proyectos']),
+                "proyectos_en_progreso": self._proyectos_por_estado['en_progreso'],
+                "proyectos_finalizados": self._proyectos_por_estado['finalizado'],
+                "proyectos_retrasados": len(self._retrasados),
+                "progreso_promedio": self._suma_progreso / self._proyectos_con_progreso if self._proyectos_con_progreso else None,
+                "presupuesto_total": presupuesto,
+                "costo_actual_total": self._suma_costo,
+                "eficiencia_presupuestaria": ((presupuesto - self._suma_costo) / presupuesto) * 100 if presupuesto > 0 else 0,
+                "total_tareas": self._tareas_contadas,
+                "tareas_completadas": self._tareas_por_estado['completada'],
+                "tareas_pendientes": self._tareas_por_estado['pendiente'],
+                "empleados_disponibles": self._empleados_por_disponibilidad['disponible']
+            }
+
+    def tareas_por_responsable(self):
+        """Número de tareas asignadas a cada empleado (por id de empleado)"""
+        with self._lock:
+            return {responsable: n for responsable, n in self._tareas_por_responsable.items() if n > 0}
+
+    def proyectos_retrasados(self):
+        """Ids de los proyectos marcados como retrasados"""
+        with self._lock:
+            return set(self._retrasados)
+
+    def marcos(self):
+        """DataFrames de proyectos, tareas y empleados con las columnas de la instantánea.
+
+        Se reconstruyen solo cuando cambia la versión, así que mientras no haya
+        cambios se devuelven los mismos objetos.
+        """
+        with self._lock:
+            if self._marcos is not None and self._version_marcos == self.version:
+                return self._marcos
+
+            proyectos_df = pd.DataFrame(list(self._filas['proyectos'].values()), columns=COLUMNAS_PROYECTO)
+            nombres = {fila['id']: fila['nombre'] for fila in self._filas['proyectos'].values()}
+            tareas = [
+                dict(fila, nombre_proyecto=nombres[fila['proyecto_id']])
+                for fila in self._filas['tareas'].values() if fila['proyecto_id'] in nombres
+            ]
+            tareas_df = pd.DataFrame(tareas, columns=COLUMNAS_TAREA + ['nombre_proyecto']).drop(columns='responsable_id')
+            empleados_df = pd.DataFrame(list(self._filas['empleados'].values()), columns=COLUMNAS_EMPLEADO).drop(columns='id')
+
+            self._marcos = (proyectos_df, tareas_df, empleados_df)
+            self._version_marcos = self.version
+            return self._marcos
+
+    # Sondeo en segundo plano
+
+    def _iniciar_sondeo(self):
+        """Arranca el hilo de sondeo en este proceso si no está en marcha"""
+        if self.intervalo_sondeo <= 0:
+            return
+        if self._hilo is not None and self._pid_hilo == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is not None and self._pid_hilo == os.getpid() and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle_sondeo, name='sondeo-agregados', daemon=True)
+            self._pid_hilo = os.getpid()
+            self._hilo.start()
+
+    def _bucle_sondeo(self):
+        while not self._detener.wait(self.intervalo_sondeo):
+            try:
+                self.sincronizar(self._motor)
+            except Exception as e:
+                logger.error(f"Error al sincronizar el almacén de agregados: {str(e)}")
+
+    def detener(self):
+        """Detiene el sondeo en segundo plano"""
+        self._detener.set()
+
+    def estadisticas(self):
+        """Estado del almacén y contadores de sincronización"""
+        with self._lock:
+            return {
+                "version": self.version,
+                "cargado": self._cargado,
+                "intervalo_sondeo_segundos": self.intervalo_sondeo,
+                "sincronizaciones": self.sincronizaciones,
+                "filas_aplicadas": self.filas_aplicadas,
+                "filas_eliminadas": self.filas_eliminadas,
+                "ultima_sincronizacion": self.ultima_sincronizacion.isoformat(timespec='seconds') if self.ultima_sincronizacion else None,
+                "filas": {nombre: len(filas) for nombre, filas in self._filas.items()},
+                "puntos_control": {nombre: str(p) if p is not None else None for nombre, p in self._puntos_control.items()},
+            }
@@ -1,13 +1,25 @@
-from flask import Flask, jsonify, request, Blueprint
+from flask import Flask, jsonify, request, Blueprint, Response, stream_with_context, current_app
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
-from sqlalchemy import create_engine
 import logging
 import os
 from dotenv import load_dotenv
+from sqlalchemy import text
+
+from conexion import RegistroMotores
+from consultas_paralelas import EjecutorConsultas
+from grafo_derivados import GrafoDerivados
+from reglas import MotorReglas, Regla, Recomendacion
+from vistas_materializadas import GestorVistasMaterializadas
+from instantanea import CargadorInstantaneas
+from agregados_incrementales import AlmacenAgregados
+from cache_respuestas import CacheRespuestas
+from json_rapido import JSONProviderAnalitica, registros_dataframe
+from metricas_peticiones import MetricasPeticiones
+from consultas_lentas import RegistroConsultasLentas
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -16,35 +28,418 @@ logger = logging.getLogger(__name__)
 # Cargar variables de entorno
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
-
 # Configurar blueprints para organizar la API
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Tiempos por fase (db, compute, serialize) y filas leídas de cada ruta de la API
+# (sumados entre workers si METRICS_MULTIPROC_DIR indica un directorio compartido)
+metricas_api = MetricasPeticiones.desde_entorno()
+metricas_api.instalar(api_bp)
+
+# Huella, duración y filas de cada consulta; las lentas se registran con su plan de ejecución
+registro_consultas = RegistroConsultasLentas.desde_entorno(lambda: registro_motores.obtener('odoo'))
+registro_consultas.instalar()
+
+# Registro de motores compartido por todo el proceso (un pool por base de datos)
+registro_motores = RegistroMotores()
+try:
+    registro_motores.registrar_desde_entorno('odoo')
+except Exception as e:
+    logger.error(f"Error al crear el pool de conexiones: {str(e)}")
+
+# Ejecutor de las consultas independientes de un mismo endpoint (un hilo por consulta)
+ejecutor_consultas = EjecutorConsultas(max_hilos=int(os.getenv('QUERY_EXECUTOR_WORKERS', '4')))
+
 # Configuración de conexión a Odoo
 def get_odoo_connection():
     try:
-        db_user = os.getenv('DB_USER', 'admin')
-        db_password = os.getenv('DB_PASSWORD', 'admin')
-        db_host = os.getenv('DB_HOST', 'localhost')
-        db_port = os.getenv('DB_PORT', '5432')
-        db_name = os.getenv('DB_NAME', 'odoo')
-        
-        connection_string = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-        engine = create_engine(connection_string)
+        engine = registro_motores.obtener('odoo')
+        if engine is None:
+            engine = registro_motores.registrar_desde_entorno('odoo')
         return engine
     except Exception as e:
         logger.error(f"Error al conectar con la base de datos: {str(e)}")
         return None
 
+# Paginación por clave primaria (?limit=&after=) de los listados
+LIMITE_PAGINA_POR_DEFECTO = 100
+LIMITE_PAGINA_MAXIMO = 1000
+
+def _leer_paginacion():
+    """Lee ?limit= y ?after= de la petición; devuelve None si no se pidió paginar"""
+    if 'limit' not in request.args and 'after' not in request.args:
+        return None
+    
+    limite = int(request.args.get('limit', LIMITE_PAGINA_POR_DEFECTO))
+    despues_de = int(request.args.get('after', 0))
+    if limite <= 0:
+        raise ValueError("limit debe ser mayor que 0")
+    
+    return {"limite": min(limite, LIMITE_PAGINA_MAXIMO), "despues_de": despues_de}
+
+def _clausulas_paginacion(paginacion, columna_id):
+    """Devuelve la condición WHERE, el ORDER BY/LIMIT y los parámetros de la página pedida"""
+    if paginacion is None:
+        return "TRUE", f"ORDER BY {columna_id}", {}
+    
+    # Se pide una fila de más para saber si existe una página siguiente
+    return (
+        f"{columna_id} > :despues_de",
+        f"ORDER BY {columna_id} LIMIT :limite_consulta",
+        {"despues_de": paginacion["despues_de"], "limite_consulta": paginacion["limite"] + 1}
+    )
+
+def _recortar_pagina(df, paginacion, columna_id='id'):
+    """Recorta la fila extra de la página y calcula el cursor de la siguiente"""
+    if paginacion is None or len(df) <= paginacion["limite"]:
+        return df, None
+    
+    df = df.iloc[:paginacion["limite"]]
+    return df, int(df[columna_id].iloc[-1])
+
+def _respuesta_paginada(clave, registros, paginacion, siguiente_cursor):
+    """Construye la respuesta JSON de un listado, con el cursor si se paginó"""
+    respuesta = {clave: registros}
+    if paginacion is not None:
+        respuesta["limit"] = paginacion["limite"]
+        respuesta["siguiente_cursor"] = siguiente_cursor
+    return jsonify(respuesta)
+
+# Proyección de campos (?fields=): columnas que se pueden pedir de cada modelo
+CAMPOS_PERMITIDOS = {
+    'proyecto': [
+        'id', 'proyecto_id', 'nombre', 'descripcion', 'cliente', 'estado', 'porcentaje_progreso',
+        'fecha_inicio', 'fecha_fin', 'prioridad', 'responsable_id', 'presupuesto_estimado',
+        'costo_total_recursos', 'costo_por_hora', 'horas_asignadas', 'costo_total',
+        'colaboradores', 'riesgos', 'hitos', 'dependencias', 'comentarios'
+    ],
+    'tarea': [
+        'id', 'nombre', 'descripcion', 'estado', 'fecha_comienzo', 'fecha_final',
+        'proyecto_id', 'responsable_id'
+    ],
+    'recurso': [
+        'id', 'nombre', 'proyecto_id', 'costo_por_hora', 'horas_asignadas', 'costo_total',
+        'fecha_inicio', 'fecha_fin', 'estado'
+    ],
+    'kpi': ['id', 'proyecto_id', 'nombre', 'valor', 'objetivo'],
+}
+
+# Columnas que los cálculos de la API necesitan aunque no se pidan
+CAMPOS_NECESARIOS = {
+    'proyecto': ['id', 'estado', 'fecha_inicio', 'fecha_fin', 'porcentaje_progreso',
+                 'presupuesto_estimado', 'costo_total_recursos'],
+    'tarea': ['id', 'proyecto_id', 'estado', 'fecha_comienzo', 'fecha_final', 'responsable_id'],
+    'recurso': ['id', 'proyecto_id'],
+    'kpi': ['id', 'proyecto_id'],
+}
+
+# Máximo de proyectos por petición en /proyectos/detalle
+MAX_PROYECTOS_DETALLE = 200
+
+# Campos calculados por /proyectos que también se pueden pedir
+CAMPOS_CALCULADOS_PROYECTOS = [
+    'total_tareas', 'tareas_completadas', 'total_recursos', 'eficiencia', 'estado_salud', 'dias_restantes'
+]
+
+def _leer_campos(modelo_por_defecto, calculados=()):
+    """Interpreta ?fields= como {modelo: campos pedidos}; devuelve None si no se pidió proyección.
+    
+    Acepta "campo" (del modelo por defecto) o "modelo.campo" y lanza ValueError
+    si algún campo no está en la lista permitida del modelo.
+    """
+    valor = request.args.get('fields')
+    if valor is None:
+        return None
+    
+    campos = {}
+    for nombre in (c.strip() for c in valor.split(',')):
+        if not nombre:
+            continue
+        modelo, _, campo = nombre.rpartition('.')
+        modelo = modelo or modelo_por_defecto
+        permitidos = CAMPOS_PERMITIDOS.get(modelo, [])
+        if modelo == modelo_por_defecto:
+            permitidos = permitidos + list(calculados)
+        if campo not in permitidos:
+            raise ValueError(f"Campo no permitido: {nombre}")
+        if campo not in campos.setdefault(modelo, []):
+            campos[modelo].append(campo)
+    
+    if not campos:
+        raise ValueError("El parámetro fields no puede estar vacío")
+    return campos
+
+def _columnas_consulta(modelo, campos, alias=None):
+    """Lista explícita de columnas SQL (pedidas + necesarias), o * si no hay proyección"""
+    prefijo = f"{alias}." if alias else ""
+    if campos is None:
+        return f"{prefijo}*"
+    
+    pedidos = campos.get(modelo)
+    if pedidos is None:
+        # Modelo no mencionado en fields: todas sus columnas permitidas
+        seleccion = CAMPOS_PERMITIDOS[modelo]
+    else:
+        seleccion = [c for c in CAMPOS_PERMITIDOS[modelo] if c in pedidos or c in CAMPOS_NECESARIOS[modelo]]
+    return ", ".join(f"{prefijo}{c}" for c in seleccion)
+
+def _proyectar(df, modelo, campos):
+    """Deja en el DataFrame solo el id y las columnas pedidas del modelo"""
+    if campos is None or modelo not in campos:
+        return df
+    columnas = ['id'] + [c for c in campos[modelo] if c != 'id']
+    return df[[c for c in columnas if c in df.columns]]
+
+# Consultas de la vista global de la cartera (compartidas con el modo asíncrono)
+CONSULTAS_CARTERA = {
+    # Consulta para proyectos
+    "proyectos": """
+    SELECT 
+        id, proyecto_id, nombre, estado, fecha_inicio, fecha_fin, 
+        presupuesto_estimado, costo_total_recursos, porcentaje_progreso
+    FROM 
+        creativeminds_proyecto
+    """,
+    # Consulta para tareas
+    "tareas": """
+    SELECT 
+        t.id, t.nombre, t.estado, t.fecha_comienzo, t.fecha_final, 
+        t.proyecto_id, p.nombre as nombre_proyecto
+    FROM 
+        creativeminds_tarea t
+    JOIN 
+        creativeminds_proyecto p ON t.proyecto_id = p.id
+    """,
+    # Consulta para empleados
+    "empleados": """
+    SELECT 
+        e.empleado_id, e.nombre, e.disponibilidad, e.departamento, e.puesto
+    FROM 
+        creativeminds_empleado e
+    """
+}
+
+# Consultas del análisis por proyecto de toda la cartera (/proyectos/analisis)
+CONSULTAS_ANALISIS_PROYECTOS = {
+    "proyectos": """
+    SELECT
+        id, nombre, estado, fecha_inicio, fecha_fin,
+        presupuesto_estimado, costo_total_recursos, porcentaje_progreso
+    FROM
+        creativeminds_proyecto
+    ORDER BY
+        id
+    """,
+    "tareas": """
+    SELECT
+        proyecto_id, estado, fecha_comienzo, fecha_final, responsable_id
+    FROM
+        creativeminds_tarea
+    WHERE
+        proyecto_id IS NOT NULL
+    """,
+    "recursos": "SELECT proyecto_id FROM creativeminds_recurso WHERE proyecto_id IS NOT NULL",
+    "kpis": "SELECT proyecto_id FROM creativeminds_kpi WHERE proyecto_id IS NOT NULL",
+}
+
+# Agregados de la cartera mantenidos a partir de los cambios en write_date
+almacen_agregados = None
+if os.getenv('INCREMENTAL_STORE_ENABLED', 'true').strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on'):
+    almacen_agregados = AlmacenAgregados.desde_entorno()
+
+# Tablas de las que dependen la instantánea de la cartera y las respuestas que se calculan con ella
+TABLAS_CARTERA = ['creativeminds_proyecto', 'creativeminds_tarea', 'creativeminds_empleado']
+
+def _huella_cartera():
+    """Huella de las tablas de la cartera, la misma con la que la caché de respuestas construye la clave"""
+    try:
+        huella = cache_respuestas.huella_actual()
+    except Exception as e:
+        logger.warning(f"No se pudo calcular la huella de la cartera: {str(e)}")
+        return None
+    return None if huella is None else tuple((tabla, huella.get(tabla)) for tabla in TABLAS_CARTERA)
+
+def _cargar_cartera(engine):
+    """Carga proyectos, tareas y empleados para la vista global de la cartera"""
+    if almacen_agregados is not None:
+        # Solo se leen las filas modificadas; si no hay cambios se devuelven los mismos DataFrames
+        return almacen_agregados.obtener(engine, _huella_cartera()).marcos()
+    
+    datos = ejecutor_consultas.leer(engine, CONSULTAS_CARTERA)
+    
+    return datos["proyectos"], datos["tareas"], datos["empleados"]
+
+# Instantánea de la cartera compartida por /dashboard y /recomendaciones; caduca por
+# tiempo y también en cuanto cambia la huella de sus tablas
+cargador_cartera = CargadorInstantaneas(
+    _cargar_cartera,
+    ttl_segundos=float(os.getenv('SNAPSHOT_TTL_SECONDS', '5')),
+    obtener_huella=_huella_cartera
+)
+
+# Caché de respuestas de los endpoints analíticos, invalidada por la huella de las tablas
+cache_respuestas = CacheRespuestas(
+    get_odoo_connection,
+    max_entradas=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256')),
+    ttl_segundos=float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '300')),
+    intervalo_huella=float(os.getenv('RESPONSE_CACHE_FINGERPRINT_INTERVAL', '1'))
+)
+
+# Vistas materializadas con los agregados de rendimiento por departamento y equipo
+vistas_rendimiento = GestorVistasMaterializadas.desde_entorno(get_odoo_connection)
+
+def _metricas_dashboard(instantanea):
+    """Métricas generales del dashboard calculadas sobre la instantánea completa"""
+    proyectos_df = instantanea.proyectos
+    tareas_df = instantanea.tareas
+    empleados_df = instantanea.empleados
+    
+    return {
+        "total_proyectos": len(proyectos_df),
+        "proyectos_en_progreso": len(proyectos_df[proyectos_df['estado'] == 'en_progreso']),
+        "proyectos_finalizados": len(proyectos_df[proyectos_df['estado'] == 'finalizado']),
+        "proyectos_retrasados": int(instantanea.derivado('retrasados', _retrasados_cartera).sum()),
+        "progreso_promedio": proyectos_df['porcentaje_progreso'].mean(),
+        "presupuesto_total": proyectos_df['presupuesto_estimado'].sum(),
+        "costo_actual_total": proyectos_df['costo_total_recursos'].sum(),
+        "eficiencia_presupuestaria": _calcular_eficiencia_presupuestaria(proyectos_df),
+        "total_tareas": len(tareas_df),
+        "tareas_completadas": len(tareas_df[tareas_df['estado'] == 'completada']),
+        "tareas_pendientes": len(tareas_df[tareas_df['estado'] == 'pendiente']),
+        "empleados_disponibles": len(empleados_df[empleados_df['disponibilidad'] == 'disponible'])
+    }
+
+def _datos_dashboard(instantanea, engine):
+    """Construye la respuesta del dashboard a partir de la instantánea de la cartera"""
+    proyectos_df = instantanea.proyectos
+    
+    # Métricas generales (incrementales si el almacén de agregados está activo)
+    if almacen_agregados is not None:
+        metricas = almacen_agregados.obtener(engine, _huella_cartera()).metricas()
+    else:
+        metricas = _metricas_dashboard(instantanea)
+    
+    # Proyectos principales (top 5 por progreso)
+    top_proyectos = proyectos_df.sort_values('porcentaje_progreso', ascending=False).head(5)
+    
+    # Análisis de fortalezas y debilidades
+    analisis = instantanea.derivado('analisis', _analisis_cartera)
+    
+    # Recomendaciones para mejora
+    recomendaciones = instantanea.derivado('recomendaciones', _recomendaciones_cartera)
+    
+    return {
+        "metricas": metricas,
+        "proyectos_destacados": top_proyectos,
+        "analisis": analisis,
+        "recomendaciones": recomendaciones,
+        "instantanea": instantanea.descripcion()
+    }
+
+def _datos_recomendaciones(instantanea):
+    """Construye la respuesta de recomendaciones generales a partir de la instantánea de la cartera"""
+    # Análisis de fortalezas y debilidades
+    analisis = instantanea.derivado('analisis', _analisis_cartera)
+    
+    # Generar recomendaciones
+    recomendaciones = instantanea.derivado('recomendaciones', _recomendaciones_cartera)
+    
+    # Identificar áreas de mejora críticas
+    areas_mejora = _identificar_areas_mejora(instantanea.proyectos, instantanea.tareas, instantanea.empleados)
+    
+    return {
+        "analisis_foda": analisis,
+        "recomendaciones": recomendaciones,
+        "areas_mejora_prioritarias": areas_mejora,
+        "instantanea": instantanea.descripcion()
+    }
+
+def _retrasados_cartera(instantanea):
+    """Marca de proyecto retrasado calculada una vez por instantánea"""
+    return _marcar_proyectos_retrasados(instantanea.proyectos, instantanea.tareas)
+
+def _reglas_cartera(instantanea):
+    """Reglas FODA y de recomendaciones evaluadas una vez por instantánea"""
+    return _evaluar_reglas_cartera(instantanea.proyectos, instantanea.tareas, instantanea.empleados)
+
+def _analisis_cartera(instantanea):
+    """Análisis FODA global calculado una vez por instantánea"""
+    return instantanea.derivado('reglas', _reglas_cartera).analisis()
+
+def _recomendaciones_cartera(instantanea):
+    """Recomendaciones globales calculadas una vez por instantánea"""
+    return _generar_recomendaciones(instantanea.derivado('reglas', _reglas_cartera))
+
 # Rutas de la API
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """Endpoint para verificar que la API está funcionando"""
     return jsonify({"status": "OK", "message": "Creative Minds Analytics API está funcionando correctamente"})
 
+@api_bp.route('/health/pool', methods=['GET'])
+def health_pool():
+    """Devuelve las estadísticas de uso y latencia de los pools de conexiones"""
+    return jsonify({"pools": registro_motores.estadisticas(), "ejecutor": ejecutor_consultas.estadisticas()})
+
+@api_bp.route('/health/cache', methods=['GET'])
+def health_cache():
+    """Devuelve los contadores de la caché de respuestas"""
+    return jsonify({"cache": cache_respuestas.estadisticas()})
+
+@api_bp.route('/health/vistas', methods=['GET'])
+def health_vistas():
+    """Devuelve el estado y los contadores de refresco de las vistas materializadas"""
+    return jsonify({"vistas": vistas_rendimiento.estadisticas()})
+
+@api_bp.route('/health/agregados', methods=['GET'])
+def health_agregados():
+    """Devuelve el estado del almacén de agregados incrementales"""
+    if almacen_agregados is None:
+        return jsonify({"agregados": None})
+    return jsonify({"agregados": almacen_agregados.estadisticas()})
+
+def _metricas_adicionales():
+    """Métricas del proceso (pools de conexiones y caché de respuestas) que se publican junto a las de las rutas"""
+    pools = registro_motores.estadisticas()
+    cache = cache_respuestas.estadisticas()
+    return [
+        ("db_pool_checked_out_connections", "gauge", "Conexiones prestadas por el pool",
+         [({"pool": nombre}, datos["conexiones_prestadas"]) for nombre, datos in pools.items() if datos["conexiones_prestadas"] is not None]),
+        ("db_pool_size", "gauge", "Tamaño configurado del pool de conexiones",
+         [({"pool": nombre}, datos["tamano_pool"]) for nombre, datos in pools.items() if datos["tamano_pool"] is not None]),
+        ("response_cache_hits_total", "counter", "Respuestas servidas desde la caché", [({}, cache["aciertos"])]),
+        ("response_cache_misses_total", "counter", "Respuestas calculadas por fallo de caché", [({}, cache["fallos"])]),
+        ("response_cache_entries", "gauge", "Entradas en la caché de respuestas", [({}, cache["entradas"])]),
+    ]
+
+metricas_api.extras = _metricas_adicionales
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Expone los contadores e histogramas de la API en formato de texto de Prometheus"""
+    return Response(metricas_api.exportar(), mimetype='text/plain; version=0.0.4')
+
+# Las rutas /debug muestran sentencias SQL y sus planes de ejecución: solo se
+# sirven si se activan expresamente (DEBUG_ENDPOINTS_ENABLED, desactivado por defecto)
+DEBUG_ENDPOINTS_ENABLED = os.getenv('DEBUG_ENDPOINTS_ENABLED', 'false').strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+@api_bp.route('/debug/slow-queries', methods=['GET'])
+def get_consultas_lentas():
+    """Devuelve las últimas consultas lentas con su plan y las sentencias con más tiempo acumulado"""
+    if not DEBUG_ENDPOINTS_ENABLED:
+        return jsonify({"error": "Recurso no encontrado"}), 404
+    try:
+        limite = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "El parámetro limit debe ser un entero"}), 400
+    return jsonify({
+        "estadisticas": registro_consultas.estadisticas(),
+        "consultas_lentas": registro_consultas.recientes(),
+        "sentencias_mas_costosas": registro_consultas.resumen(limite)
+    })
+
 @api_bp.route('/dashboard', methods=['GET'])
+@cache_respuestas.cacheada(TABLAS_CARTERA)
 def get_dashboard():
     """Obtiene un resumen general del estado de todos los proyectos"""
     try:
@@ -52,71 +447,17 @@ def get_dashboard():
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        # Consulta para proyectos
-        proyectos_df = pd.read_sql("""
-            SELECT 
-                proyecto_id, nombre, estado, fecha_inicio, fecha_fin, 
-                presupuesto_estimado, costo_total_recursos, porcentaje_progreso
-            FROM 
-                creativeminds_proyecto
-        """, engine)
-        
-        # Consulta para tareas
-        tareas_df = pd.read_sql("""
-            SELECT 
-                t.id, t.nombre, t.estado, t.fecha_comienzo, t.fecha_final, 
-                t.proyecto_id, p.nombre as nombre_proyecto
-            FROM 
-                creativeminds_tarea t
-            JOIN 
-                creativeminds_proyecto p ON t.proyecto_id = p.id
-        """, engine)
-        
-        # Consulta para empleados
-        empleados_df = pd.read_sql("""
-            SELECT 
-                e.empleado_id, e.nombre, e.disponibilidad, e.departamento, e.puesto
-            FROM 
-                creativeminds_empleado e
-        """, engine)
-        
-        # Métricas generales
-        metricas = {
-            "total_proyectos": len(proyectos_df),
-            "proyectos_en_progreso": len(proyectos_df[proyectos_df['estado'] == 'en_progreso']),
-            "proyectos_finalizados": len(proyectos_df[proyectos_df['estado'] == 'finalizado']),
-            "proyectos_retrasados": _calcular_proyectos_retrasados(proyectos_df, tareas_df),
-            "progreso_promedio": proyectos_df['porcentaje_progreso'].mean(),
-            "presupuesto_total": proyectos_df['presupuesto_estimado'].sum(),
-            "costo_actual_total": proyectos_df['costo_total_recursos'].sum(),
-            "eficiencia_presupuestaria": _calcular_eficiencia_presupuestaria(proyectos_df),
-            "total_tareas": len(tareas_df),
-            "tareas_completadas": len(tareas_df[tareas_df['estado'] == 'completada']),
-            "tareas_pendientes": len(tareas_df[tareas_df['estado'] == 'pendiente']),
-            "empleados_disponibles": len(empleados_df[empleados_df['disponibilidad'] == 'disponible'])
-        }
-        
-        # Proyectos principales (top 5 por progreso)
-        top_proyectos = proyectos_df.sort_values('porcentaje_progreso', ascending=False).head(5)
+        # Datos compartidos de la cartera
+        instantanea = cargador_cartera.obtener(engine)
         
-        # Análisis de fortalezas y debilidades
-        analisis = _analizar_fortalezas_debilidades(proyectos_df, tareas_df, empleados_df)
-        
-        # Recomendaciones para mejora
-        recomendaciones = _generar_recomendaciones(proyectos_df, tareas_df, empleados_df, analisis)
-        
-        return jsonify({
-            "metricas": metricas,
-            "proyectos_destacados": top_proyectos.to_dict(orient='records'),
-            "analisis": analisis,
-            "recomendaciones": recomendaciones
-        })
+        return jsonify(_datos_dashboard(instantanea, engine))
         
     except Exception as e:
         logger.error(f"Error en el dashboard: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @api_bp.route('/proyectos', methods=['GET'])
+@cache_respuestas.cacheada(['creativeminds_proyecto', 'creativeminds_tarea', 'creativeminds_recurso'])
 def get_proyectos():
     """Obtiene todos los proyectos con métricas detalladas"""
     try:
@@ -124,97 +465,191 @@ def get_proyectos():
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        proyectos_df = pd.read_sql("""
-            SELECT 
-                p.*, 
-                COUNT(DISTINCT t.id) as total_tareas,
-                SUM(CASE WHEN t.estado = 'completada' THEN 1 ELSE 0 END) as tareas_completadas,
-                COUNT(DISTINCT r.id) as total_recursos
-            FROM 
-                creativeminds_proyecto p
-            LEFT JOIN 
-                creativeminds_tarea t ON p.id = t.proyecto_id
-            LEFT JOIN 
-                creativeminds_recurso r ON p.id = r.proyecto_id
-            GROUP BY 
-                p.id
-        """, engine)
+        try:
+            paginacion = _leer_paginacion()
+        except ValueError:
+            return jsonify({"error": "Parámetros de paginación no válidos (limit y after deben ser enteros)"}), 400
+        filtro, orden, parametros = _clausulas_paginacion(paginacion, 'p.id')
         
-        # Calcular métricas adicionales para cada proyecto
-        proyectos_metricas = []
-        for _, proyecto in proyectos_df.iterrows():
-            # Calcular eficiencia y estado general
-            eficiencia = _calcular_eficiencia_proyecto(proyecto)
-            estado_salud = _determinar_estado_salud_proyecto(proyecto)
-            
-            # Añadir métricas específicas
-            proyecto_data = proyecto.to_dict()
-            proyecto_data["eficiencia"] = eficiencia
-            proyecto_data["estado_salud"] = estado_salud
-            proyecto_data["dias_restantes"] = _calcular_dias_restantes(proyecto)
-            
-            proyectos_metricas.append(proyecto_data)
+        try:
+            campos = _leer_campos('proyecto', CAMPOS_CALCULADOS_PROYECTOS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        def completar(proyectos_df):
+            # Calcular eficiencia, estado de salud y días restantes y aplicar la proyección
+            return _proyectar(_completar_proyectos(proyectos_df), 'proyecto', campos)
         
-        return jsonify({"proyectos": proyectos_metricas})
+        consulta = _consulta_proyectos(filtro, orden, _columnas_consulta('proyecto', campos, 'p'))
+        if _formato_ndjson():
+            return _respuesta_ndjson(engine, consulta, parametros, completar, paginacion)
+        
+        proyectos_df = pd.read_sql(consulta, engine, params=parametros)
+        proyectos_df, siguiente_cursor = _recortar_pagina(proyectos_df, paginacion)
+        proyectos_metricas = completar(proyectos_df)
+        
+        return _respuesta_paginada("proyectos", proyectos_metricas, paginacion, siguiente_cursor)
         
     except Exception as e:
         logger.error(f"Error al obtener proyectos: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
-@api_bp.route('/proyectos/<int:proyecto_id>', methods=['GET'])
-def get_proyecto_detalle(proyecto_id):
-    """Obtiene detalles completos de un proyecto específico con análisis profundo"""
+@api_bp.route('/proyectos/detalle', methods=['GET'])
+def get_proyectos_detalle():
+    """Obtiene el detalle completo de varios proyectos (?ids=1,2,3) con un número fijo de consultas"""
     try:
         engine = get_odoo_connection()
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        # Obtener datos del proyecto
-        proyecto_df = pd.read_sql(f"""
-            SELECT * FROM creativeminds_proyecto WHERE id = {proyecto_id}
-        """, engine)
+        try:
+            ids = list(dict.fromkeys(int(i) for i in request.args.get('ids', '').split(',') if i.strip()))
+            campos = _leer_campos('proyecto')
+        except ValueError as e:
+            return jsonify({"error": f"Parámetros no válidos: {str(e)}"}), 400
+        
+        if not ids:
+            return jsonify({"error": "Debe indicar al menos un id en el parámetro ids"}), 400
+        if len(ids) > MAX_PROYECTOS_DETALLE:
+            return jsonify({"error": f"Se admiten como máximo {MAX_PROYECTOS_DETALLE} proyectos por petición"}), 400
+        
+        parametros = {"ids": ids}
+        
+        # Una consulta por tabla para todos los proyectos pedidos, ejecutadas en paralelo
+        datos = ejecutor_consultas.leer(engine, {
+            "proyectos": (text(f"""
+                SELECT {_columnas_consulta('proyecto', campos)} FROM creativeminds_proyecto WHERE id = ANY(:ids)
+            """), parametros),
+            "tareas": (text(f"""
+                SELECT {_columnas_consulta('tarea', campos)} FROM creativeminds_tarea WHERE proyecto_id = ANY(:ids)
+            """), parametros),
+            "recursos": (text(f"""
+                SELECT {_columnas_consulta('recurso', campos)} FROM creativeminds_recurso WHERE proyecto_id = ANY(:ids)
+            """), parametros),
+            "kpis": (text(f"""
+                SELECT {_columnas_consulta('kpi', campos)} FROM creativeminds_kpi WHERE proyecto_id = ANY(:ids)
+            """), parametros),
+        })
+        proyectos_df = datos["proyectos"]
+        tareas_df = datos["tareas"]
+        recursos_df = datos["recursos"]
+        kpis_df = datos["kpis"]
+        
+        # Repartir las filas relacionadas por proyecto
+        tareas_por_proyecto = dict(tuple(tareas_df.groupby('proyecto_id')))
+        recursos_por_proyecto = dict(tuple(recursos_df.groupby('proyecto_id')))
+        kpis_por_proyecto = dict(tuple(kpis_df.groupby('proyecto_id')))
+        filas_proyecto = proyectos_df.set_index('id', drop=False)
+        
+        # Reglas de todos los proyectos pedidos en una sola evaluación; el grafo de
+        # cada proyecto recibe su análisis y sus recomendaciones ya calculados
+        hoy = datetime.now().date()
+        evaluacion = motor_proyectos.evaluar(_indicadores_proyectos(proyectos_df, tareas_df, recursos_df, kpis_df, hoy))
+        reglas_proyecto = {
+            proyecto_id: {
+                "analisis": analisis,
+                "recomendaciones": _textos_recomendaciones_proyecto(recomendaciones),
+            }
+            for proyecto_id, analisis, recomendaciones in zip(
+                proyectos_df['id'].tolist(), evaluacion.analisis_filas(), evaluacion.recomendaciones_filas()
+            )
+        }
         
-        if proyecto_df.empty:
-            return jsonify({"error": "Proyecto no encontrado"}), 404
+        detalles = []
+        for proyecto_id in ids:
+            if proyecto_id not in filas_proyecto.index:
+                continue
+            try:
+                detalles.append(_detalle_proyecto(
+                    filas_proyecto.loc[proyecto_id],
+                    tareas_por_proyecto.get(proyecto_id, tareas_df.iloc[0:0]),
+                    recursos_por_proyecto.get(proyecto_id, recursos_df.iloc[0:0]),
+                    kpis_por_proyecto.get(proyecto_id, kpis_df.iloc[0:0]),
+                    campos,
+                    hoy=hoy,
+                    precalculados=reglas_proyecto[proyecto_id]
+                ))
+            except Exception as e:
+                logger.error(f"Error al analizar el proyecto {proyecto_id}: {str(e)}")
+                detalles.append({"id": proyecto_id, "error": str(e)})
         
-        # Obtener tareas relacionadas
-        tareas_df = pd.read_sql(f"""
-            SELECT * FROM creativeminds_tarea WHERE proyecto_id = {proyecto_id}
-        """, engine)
+        return jsonify({
+            "proyectos": detalles,
+            "no_encontrados": [i for i in ids if i not in filas_proyecto.index]
+        })
         
-        # Obtener recursos relacionados
-        recursos_df = pd.read_sql(f"""
-            SELECT * FROM creativeminds_recurso WHERE proyecto_id = {proyecto_id}
-        """, engine)
+    except Exception as e:
+        logger.error(f"Error al obtener detalles de proyectos: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route('/proyectos/analisis', methods=['GET'])
+@cache_respuestas.cacheada(['creativeminds_proyecto', 'creativeminds_tarea', 'creativeminds_recurso', 'creativeminds_kpi'])
+def get_proyectos_analisis():
+    """Obtiene el análisis (puntos fuertes, débiles, riesgos y oportunidades) y las recomendaciones de todos los proyectos"""
+    try:
+        engine = get_odoo_connection()
+        if not engine:
+            return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        # Obtener KPIs relacionados
-        kpis_df = pd.read_sql(f"""
-            SELECT * FROM creativeminds_kpi WHERE proyecto_id = {proyecto_id}
-        """, engine)
+        # Todas las filas de cada tabla en una consulta, con solo las columnas que usan las reglas
+        datos = ejecutor_consultas.leer(engine, CONSULTAS_ANALISIS_PROYECTOS)
+        
+        return jsonify({
+            "proyectos": _analisis_proyectos(datos["proyectos"], datos["tareas"], datos["recursos"], datos["kpis"])
+        })
+    
+    except Exception as e:
+        logger.error(f"Error al analizar los proyectos: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@api_bp.route('/proyectos/<int:proyecto_id>', methods=['GET'])
+def get_proyecto_detalle(proyecto_id):
+    """Obtiene detalles completos de un proyecto específico con análisis profundo"""
+    try:
+        engine = get_odoo_connection()
+        if not engine:
+            return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        # Calcular métricas específicas del proyecto
-        metricas_proyecto = _calcular_metricas_proyecto(proyecto_df.iloc[0], tareas_df, recursos_df, kpis_df)
+        try:
+            campos = _leer_campos('proyecto')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Generar análisis personalizado
-        analisis_proyecto = _analizar_proyecto(proyecto_df.iloc[0], tareas_df, recursos_df, kpis_df)
+        # Proyecto, tareas, recursos y KPIs son independientes: se consultan en paralelo
+        datos = ejecutor_consultas.leer(engine, _consultas_detalle_proyecto(proyecto_id, campos))
+        proyecto_df = datos["proyecto"]
         
-        # Generar recomendaciones específicas
-        recomendaciones_proyecto = _generar_recomendaciones_proyecto(proyecto_df.iloc[0], tareas_df, recursos_df)
+        if proyecto_df.empty:
+            return jsonify({"error": "Proyecto no encontrado"}), 404
         
-        return jsonify({
-            "proyecto": proyecto_df.iloc[0].to_dict(),
-            "tareas": tareas_df.to_dict(orient='records'),
-            "recursos": recursos_df.to_dict(orient='records'),
-            "kpis": kpis_df.to_dict(orient='records'),
-            "metricas": metricas_proyecto,
-            "analisis": analisis_proyecto,
-            "recomendaciones": recomendaciones_proyecto
-        })
+        return jsonify(_detalle_proyecto(proyecto_df.iloc[0], datos["tareas"], datos["recursos"], datos["kpis"], campos))
         
     except Exception as e:
         logger.error(f"Error al obtener detalles del proyecto: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def _consultas_detalle_proyecto(proyecto_id, campos):
+    """Consultas del detalle de un proyecto: datos, tareas, recursos y KPIs"""
+    parametros = {"proyecto_id": proyecto_id}
+    return {
+        # Obtener datos del proyecto
+        "proyecto": (text(f"""
+            SELECT {_columnas_consulta('proyecto', campos)} FROM creativeminds_proyecto WHERE id = :proyecto_id
+        """), parametros),
+        # Obtener tareas relacionadas
+        "tareas": (text(f"""
+            SELECT {_columnas_consulta('tarea', campos)} FROM creativeminds_tarea WHERE proyecto_id = :proyecto_id
+        """), parametros),
+        # Obtener recursos relacionados
+        "recursos": (text(f"""
+            SELECT {_columnas_consulta('recurso', campos)} FROM creativeminds_recurso WHERE proyecto_id = :proyecto_id
+        """), parametros),
+        # Obtener KPIs relacionados
+        "kpis": (text(f"""
+            SELECT {_columnas_consulta('kpi', campos)} FROM creativeminds_kpi WHERE proyecto_id = :proyecto_id
+        """), parametros),
+    }
+
 @api_bp.route('/empleados', methods=['GET'])
 def get_empleados():
     """Obtiene datos de empleados con análisis de carga de trabajo y rendimiento"""
@@ -223,42 +658,24 @@ def get_empleados():
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
+        try:
+            paginacion = _leer_paginacion()
+        except ValueError:
+            return jsonify({"error": "Parámetros de paginación no válidos (limit y after deben ser enteros)"}), 400
+        filtro, orden, parametros = _clausulas_paginacion(paginacion, 'e.id')
+        
         # Obtener datos de empleados
-        empleados_df = pd.read_sql("""
-            SELECT 
-                e.*, 
-                COUNT(DISTINCT pt.id) as total_proyectos,
-                COUNT(DISTINCT t.id) as total_tareas,
-                SUM(CASE WHEN t.estado = 'completada' THEN 1 ELSE 0 END) as tareas_completadas
-            FROM 
-                creativeminds_empleado e
-            LEFT JOIN 
-                creativeminds_proyecto_empleado_rel pe ON e.id = pe.empleado_id
-            LEFT JOIN 
-                creativeminds_proyecto pt ON pe.proyecto_id = pt.id
-            LEFT JOIN 
-                creativeminds_tarea t ON t.responsable_id = e.id
-            GROUP BY 
-                e.id
-        """, engine)
+        consulta = _consulta_empleados(filtro, orden)
+        if _formato_ndjson():
+            return _respuesta_ndjson(engine, consulta, parametros, _completar_empleados, paginacion)
         
-        # Calcular métricas por empleado
-        empleados_metricas = []
-        for _, empleado in empleados_df.iterrows():
-            empleado_data = empleado.to_dict()
-            
-            # Calcular tasa de completitud
-            if empleado_data["total_tareas"] > 0:
-                empleado_data["tasa_completitud"] = empleado_data["tareas_completadas"] / empleado_data["total_tareas"]
-            else:
-                empleado_data["tasa_completitud"] = 0
-            
-            # Calcular carga de trabajo
-            empleado_data["carga_trabajo"] = _calcular_carga_trabajo(empleado_data)
-            
-            empleados_metricas.append(empleado_data)
+        empleados_df = pd.read_sql(consulta, engine, params=parametros)
+        empleados_df, siguiente_cursor = _recortar_pagina(empleados_df, paginacion)
         
-        return jsonify({"empleados": empleados_metricas})
+        # Calcular tasa de completitud y carga de trabajo
+        empleados_metricas = _completar_empleados(empleados_df)
+        
+        return _respuesta_paginada("empleados", empleados_metricas, paginacion, siguiente_cursor)
         
     except Exception as e:
         logger.error(f"Error al obtener datos de empleados: {str(e)}")
@@ -271,68 +688,42 @@ def get_metricas_rendimiento():
         engine = get_odoo_connection()
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
-            
-        # Métricas por departamento
-        departamentos_df = pd.read_sql("""
-            SELECT 
-                e.departamento,
-                COUNT(DISTINCT e.id) as total_empleados,
-                COUNT(DISTINCT p.id) as total_proyectos,
-                AVG(p.porcentaje_progreso) as progreso_promedio,
-                SUM(p.costo_total_recursos) as costo_total,
-                SUM(p.presupuesto_estimado) as presupuesto_total
-            FROM 
-                creativeminds_empleado e
-            LEFT JOIN 
-                creativeminds_proyecto_empleado_rel pe ON e.id = pe.empleado_id
-            LEFT JOIN 
-                creativeminds_proyecto p ON pe.proyecto_id = p.id
-            WHERE 
-                e.departamento IS NOT NULL
-            GROUP BY 
-                e.departamento
-        """, engine)
         
-        # Métricas por equipo
-        equipos_df = pd.read_sql("""
-            SELECT 
-                eq.id, eq.nombre,
-                COUNT(DISTINCT em.id) as total_miembros,
-                COUNT(DISTINCT p.id) as total_proyectos,
-                AVG(p.porcentaje_progreso) as progreso_promedio
-            FROM 
-                creativeminds_equipo eq
-            LEFT JOIN 
-                creativeminds_equipo_empleado_rel ee ON eq.id = ee.equipo_id
-            LEFT JOIN 
-                creativeminds_empleado em ON ee.empleado_id = em.id
-            LEFT JOIN 
-                creativeminds_proyecto_empleado_rel pe ON em.id = pe.empleado_id
-            LEFT JOIN 
-                creativeminds_proyecto p ON pe.proyecto_id = p.id
-            GROUP BY 
-                eq.id, eq.nombre
-        """, engine)
-        
-        # Añadir eficiencia por departamento
-        for i, dept in departamentos_df.iterrows():
-            if dept['presupuesto_total'] > 0:
-                departamentos_df.at[i, 'eficiencia_presupuestaria'] = (
-                    1 - (dept['costo_total'] / dept['presupuesto_total'])
-                ) * 100
-            else:
-                departamentos_df.at[i, 'eficiencia_presupuestaria'] = 0
+        # Agregados precalculados en las vistas materializadas
+        datos = ejecutor_consultas.leer(engine, _consultas_rendimiento(engine))
         
-        return jsonify({
-            "departamentos": departamentos_df.to_dict(orient='records'),
-            "equipos": equipos_df.to_dict(orient='records')
-        })
+        return jsonify(_datos_rendimiento(datos["departamentos"], datos["equipos"]))
         
     except Exception as e:
         logger.error(f"Error al obtener métricas de rendimiento: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def _consultas_rendimiento(engine):
+    """Consultas de los agregados de rendimiento por departamento y equipo"""
+    return {
+        "departamentos": vistas_rendimiento.consulta(engine, 'creativeminds_api_rendimiento_departamento'),
+        "equipos": vistas_rendimiento.consulta(engine, 'creativeminds_api_rendimiento_equipo')
+    }
+
+def _datos_rendimiento(departamentos_df, equipos_df):
+    """Construye la respuesta de métricas de rendimiento a partir de los agregados"""
+    # Añadir eficiencia por departamento
+    for i, dept in departamentos_df.iterrows():
+        if dept['presupuesto_total'] > 0:
+            departamentos_df.at[i, 'eficiencia_presupuestaria'] = (
+                1 - (dept['costo_total'] / dept['presupuesto_total'])
+            ) * 100
+        else:
+            departamentos_df.at[i, 'eficiencia_presupuestaria'] = 0
+    
+    return {
+        "departamentos": departamentos_df,
+        "equipos": equipos_df,
+        "vistas": vistas_rendimiento.descripcion()
+    }
+
 @api_bp.route('/metricas/historicas', methods=['GET'])
+@cache_respuestas.cacheada(['creativeminds_proyecto'])
 def get_metricas_historicas():
     """Obtiene métricas históricas para análisis de tendencias"""
     try:
@@ -340,87 +731,265 @@ def get_metricas_historicas():
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        # Obtener proyectos con fechas
-        proyectos_df = pd.read_sql("""
-            SELECT 
-                id, nombre, estado, fecha_inicio, fecha_fin, 
-                presupuesto_estimado, costo_total_recursos, porcentaje_progreso
-            FROM 
-                creativeminds_proyecto
-            WHERE 
-                fecha_inicio IS NOT NULL
-        """, engine)
+        # Parámetros del periodo de análisis (por defecto, el último año por meses)
+        granularidad = request.args.get('granularidad', 'month')
+        if granularidad not in GRANULARIDADES_HISTORICAS:
+            return jsonify({"error": f"Granularidad no válida: {granularidad}. Valores permitidos: week, month, quarter"}), 400
         
-        # Convertir fechas a formato datetime
-        proyectos_df['fecha_inicio'] = pd.to_datetime(proyectos_df['fecha_inicio'])
-        proyectos_df['fecha_fin'] = pd.to_datetime(proyectos_df['fecha_fin'])
+        try:
+            hoy = datetime.now().date()
+            hasta = datetime.strptime(request.args['hasta'], '%Y-%m-%d').date() if 'hasta' in request.args else hoy
+            desde = datetime.strptime(request.args['desde'], '%Y-%m-%d').date() if 'desde' in request.args else hoy - timedelta(days=365)
+        except ValueError:
+            return jsonify({"error": "Las fechas desde/hasta deben tener el formato AAAA-MM-DD"}), 400
         
-        # Obtener el rango de tiempo (último año)
-        hoy = datetime.now()
-        inicio_periodo = hoy - timedelta(days=365)
+        if desde > hasta:
+            return jsonify({"error": "La fecha 'desde' no puede ser posterior a 'hasta'"}), 400
         
-        # Filtrar proyectos del último año
-        proyectos_periodo = proyectos_df[proyectos_df['fecha_inicio'] >= inicio_periodo]
+        # Solo periodos completos: ambos límites se amplían a los periodos que los contienen
+        desde, hasta = _limites_periodos(desde, hasta, granularidad)
         
-        # Crear series temporales por mes
-        proyectos_periodo['mes_inicio'] = proyectos_periodo['fecha_inicio'].dt.to_period('M')
+        # Agregar por periodo en la base de datos; solo vuelven las filas agregadas
+        # (date_trunc sobre una fecha devuelve timestamptz: se trunca como timestamp)
+        periodos_df = pd.read_sql(text("""
+            SELECT 
+                date_trunc(:granularidad, CAST(fecha_inicio AS timestamp)) AS periodo,
+                COUNT(*) AS proyectos_iniciados,
+                COALESCE(SUM(presupuesto_estimado), 0) AS presupuesto_total,
+                COALESCE(SUM(costo_total_recursos), 0) AS costo_total,
+                AVG(porcentaje_progreso) AS progreso_promedio
+            FROM 
+                creativeminds_proyecto
+            WHERE 
+                fecha_inicio >= :desde
+                AND fecha_inicio <= :hasta
+            GROUP BY 
+                1
+            ORDER BY 
+                1
+        """), engine, params={
+            "granularidad": granularidad,
+            "desde": desde,
+            "hasta": hasta
+        })
         
-        # Agrupar por mes y calcular métricas
-        metricas_mensuales = []
+        # Etiquetar periodos y calcular eficiencia presupuestaria
+        periodos = pd.to_datetime(periodos_df['periodo'])
+        periodos_df['periodo'] = _etiquetar_periodos(periodos, granularidad)
+        periodos_df['eficiencia_presupuestaria'] = (
+            (1 - (periodos_df['costo_total'] / periodos_df['presupuesto_total'])) * 100
+        ).where(periodos_df['presupuesto_total'] > 0, 0)
+        if granularidad == 'month':
+            periodos_df['mes'] = periodos_df['periodo']
         
-        for mes in pd.period_range(start=inicio_periodo, end=hoy, freq='M'):
-            proyectos_mes = proyectos_periodo[proyectos_periodo['mes_inicio'] == mes]
-            
-            if not proyectos_mes.empty:
-                metricas_mes = {
-                    "mes": mes.strftime('%Y-%m'),
-                    "proyectos_iniciados": len(proyectos_mes),
-                    "presupuesto_total": proyectos_mes['presupuesto_estimado'].sum(),
-                    "costo_total": proyectos_mes['costo_total_recursos'].sum(),
-                    "progreso_promedio": proyectos_mes['porcentaje_progreso'].mean()
-                }
-                
-                # Calcular eficiencia presupuestaria
-                if metricas_mes["presupuesto_total"] > 0:
-                    metricas_mes["eficiencia_presupuestaria"] = (
-                        1 - (metricas_mes["costo_total"] / metricas_mes["presupuesto_total"])
-                    ) * 100
-                else:
-                    metricas_mes["eficiencia_presupuestaria"] = 0
-                
-                metricas_mensuales.append(metricas_mes)
+        metricas_mensuales = registros_dataframe(periodos_df)
         
         # Tendencias y predicciones
         tendencias = _calcular_tendencias(metricas_mensuales)
         
         return jsonify({
             "metricas_mensuales": metricas_mensuales,
-            "tendencias": tendencias
+            "tendencias": tendencias,
+            "periodo": {
+                "desde": desde.isoformat(),
+                "hasta": hasta.isoformat(),
+                "granularidad": granularidad
+            }
         })
         
     except Exception as e:
         logger.error(f"Error al obtener métricas históricas: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Consultas y cálculos de los listados (compartidos por las respuestas JSON y NDJSON)
+
+# Tamaño de los bloques leídos del cursor de servidor en modo NDJSON
+TAMANO_BLOQUE_NDJSON = int(os.getenv('NDJSON_CHUNK_SIZE', '1000'))
+
+def _formato_ndjson():
+    """Indica si la petición pidió el listado en formato NDJSON (?format=ndjson)"""
+    return request.args.get('format', '').lower() == 'ndjson'
+
+def _respuesta_ndjson(engine, consulta, parametros, completar, paginacion=None):
+    """Transmite un listado como NDJSON leyendo por bloques de un cursor de servidor.
+    
+    Cada bloque se completa con `completar` y se serializa línea a línea, de modo
+    que la memoria usada no depende del tamaño de la tabla.
+    """
+    limite = paginacion["limite"] if paginacion else None
+    proveedor_json = current_app.json
+    
+    def generar():
+        enviados = 0
+        try:
+            with engine.connect().execution_options(stream_results=True, max_row_buffer=TAMANO_BLOQUE_NDJSON) as conn:
+                for bloque in pd.read_sql(consulta, conn, params=parametros, chunksize=TAMANO_BLOQUE_NDJSON):
+                    if limite is not None:
+                        bloque = bloque.iloc[:limite - enviados]
+                    for registro in registros_dataframe(completar(bloque)):
+                        yield proveedor_json.dumps_bytes(registro) + b"\n"
+                    enviados += len(bloque)
+                    if limite is not None and enviados >= limite:
+                        break
+        except Exception as e:
+            logger.error(f"Error al transmitir el listado en NDJSON: {str(e)}")
+            yield proveedor_json.dumps_bytes({"error": str(e)}) + b"\n"
+    
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+def _consulta_proyectos(filtro, orden, columnas='p.*'):
+    """Consulta de proyectos con sus totales de tareas y recursos"""
+    return text(f"""
+        SELECT 
+            {columnas}, 
+            COUNT(DISTINCT t.id) as total_tareas,
+            SUM(CASE WHEN t.estado = 'completada' THEN 1 ELSE 0 END) as tareas_completadas,
+            COUNT(DISTINCT r.id) as total_recursos
+        FROM 
+            creativeminds_proyecto p
+        LEFT JOIN 
+            creativeminds_tarea t ON p.id = t.proyecto_id
+        LEFT JOIN 
+            creativeminds_recurso r ON p.id = r.proyecto_id
+        WHERE 
+            {filtro}
+        GROUP BY 
+            p.id
+        {orden}
+    """)
+
+def _completar_proyectos(proyectos_df):
+    """Añade eficiencia, estado de salud y días restantes a un bloque de proyectos"""
+    return proyectos_df.join(_puntuar_proyectos(proyectos_df))
+
+def _consulta_empleados(filtro, orden):
+    """Consulta de empleados con proyectos y tareas agregados por separado (sin multiplicar filas)"""
+    return text(f"""
+        SELECT 
+            e.*, 
+            COALESCE(pr.total_proyectos, 0) as total_proyectos,
+            COALESCE(ta.total_tareas, 0) as total_tareas,
+            COALESCE(ta.tareas_completadas, 0) as tareas_completadas
+        FROM 
+            creativeminds_empleado e
+        LEFT JOIN (
+            SELECT 
+                pe.empleado_id, 
+                COUNT(DISTINCT pe.proyecto_id) as total_proyectos
+            FROM 
+                creativeminds_proyecto_empleado_rel pe
+            JOIN 
+                creativeminds_proyecto p ON pe.proyecto_id = p.id
+            GROUP BY 
+                pe.empleado_id
+        ) pr ON pr.empleado_id = e.id
+        LEFT JOIN (
+            SELECT 
+                t.responsable_id,
+                COUNT(*) as total_tareas,
+                COUNT(*) FILTER (WHERE t.estado = 'completada') as tareas_completadas
+            FROM 
+                creativeminds_tarea t
+            WHERE 
+                t.responsable_id IS NOT NULL
+            GROUP BY 
+                t.responsable_id
+        ) ta ON ta.responsable_id = e.id
+        WHERE 
+            {filtro}
+        {orden}
+    """)
+
+def _completar_empleados(empleados_df):
+    """Añade tasa de completitud y carga de trabajo a un bloque de empleados"""
+    empleados_df = empleados_df.copy()
+    empleados_df['tasa_completitud'] = (
+        empleados_df['tareas_completadas'] / empleados_df['total_tareas']
+    ).where(empleados_df['total_tareas'] > 0, 0)
+    
+    carga = _calcular_carga_trabajo(empleados_df)
+    empleados_df['carga_trabajo'] = [
+        {"nivel": nivel, "categoria": categoria}
+        for nivel, categoria in zip(carga['nivel'].tolist(), carga['categoria'].tolist())
+    ]
+    return empleados_df
+
+def _consulta_recursos(filtro, orden):
+    """Consulta de recursos con el nombre de su proyecto"""
+    return text(f"""
+        SELECT 
+            r.*, 
+            p.nombre as nombre_proyecto
+        FROM 
+            creativeminds_recurso r
+        LEFT JOIN 
+            creativeminds_proyecto p ON r.proyecto_id = p.id
+        WHERE 
+            {filtro}
+        {orden}
+    """)
+
+def _completar_recursos(recursos_df):
+    """Añade la eficiencia de costo a un bloque de recursos"""
+    recursos_df = recursos_df.copy()
+    recursos_df['eficiencia_costo'] = (
+        (recursos_df['horas_asignadas'] * recursos_df['costo_por_hora']) / recursos_df['costo_total']
+    ).where(recursos_df['costo_total'] > 0, 0)
+    return recursos_df
+
 # Funciones auxiliares para cálculos y análisis
+
+# Frecuencia de pandas equivalente a cada granularidad de /metricas/historicas
+# (las semanas van de lunes a domingo, como date_trunc('week') de Postgres)
+GRANULARIDADES_HISTORICAS = {
+    'week': 'W-SUN',
+    'month': 'M',
+    'quarter': 'Q',
+}
+
+def _limites_periodos(desde, hasta, granularidad):
+    """Amplía desde/hasta al primer día del periodo de `desde` y al último del periodo de `hasta`"""
+    frecuencia = GRANULARIDADES_HISTORICAS[granularidad]
+    return (
+        pd.Period(desde, freq=frecuencia).start_time.date(),
+        pd.Period(hasta, freq=frecuencia).end_time.date()
+    )
+
+def _etiquetar_periodos(periodos, granularidad):
+    """Convierte el inicio de cada periodo en su etiqueta (2024-05, 2024-W19, 2024-Q2)"""
+    if granularidad == 'week':
+        iso = periodos.dt.isocalendar()
+        return iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+    if granularidad == 'quarter':
+        return periodos.dt.year.astype(str) + '-Q' + periodos.dt.quarter.astype(str)
+    return periodos.dt.strftime('%Y-%m')
+
+def _marcar_proyectos_retrasados(proyectos_df, tareas_df):
+    """Indica por proyecto (Serie booleana alineada con proyectos_df) si está retrasado.
+    
+    Un proyecto está retrasado si, sin estar finalizado, ha superado su fecha de fin
+    o si tiene alguna tarea no completada cuya fecha final ya pasó.
+    """
+    hoy = pd.Timestamp(datetime.now().date())
+    
+    # Proyectos vencidos
+    fecha_fin = pd.to_datetime(proyectos_df['fecha_fin'], errors='coerce')
+    vencidos = (proyectos_df['estado'] != 'finalizado') & (fecha_fin < hoy)
+    
+    # Proyectos con al menos una tarea retrasada
+    if tareas_df.empty:
+        return vencidos.rename('retrasado')
+    
+    fecha_final = pd.to_datetime(tareas_df['fecha_final'], errors='coerce')
+    tarea_retrasada = (tareas_df['estado'] != 'completada') & (fecha_final < hoy)
+    tareas_retrasadas_por_proyecto = tarea_retrasada.groupby(tareas_df['proyecto_id']).any()
+    con_tareas_retrasadas = proyectos_df['id'].map(tareas_retrasadas_por_proyecto).fillna(False).astype(bool)
+    
+    return (vencidos | con_tareas_retrasadas).rename('retrasado')
+
 def _calcular_proyectos_retrasados(proyectos_df, tareas_df):
     """Calcula el número de proyectos que están retrasados"""
-    hoy = datetime.now().date()
-    count = 0
-    
-    for _, proyecto in proyectos_df.iterrows():
-        if proyecto['estado'] != 'finalizado' and proyecto['fecha_fin'] and pd.to_datetime(proyecto['fecha_fin']).date() < hoy:
-            count += 1
-            continue
-            
-        # Verificar tareas retrasadas
-        tareas_proyecto = tareas_df[tareas_df['proyecto_id'] == proyecto['id']]
-        for _, tarea in tareas_proyecto.iterrows():
-            if tarea['estado'] != 'completada' and tarea['fecha_final'] and pd.to_datetime(tarea['fecha_final']).date() < hoy:
-                count += 1
-                break
-                
-    return count
+    return int(_marcar_proyectos_retrasados(proyectos_df, tareas_df).sum())
 
 def _calcular_eficiencia_presupuestaria(proyectos_df):
     """Calcula la eficiencia presupuestaria en porcentaje"""
@@ -431,88 +1000,132 @@ def _calcular_eficiencia_presupuestaria(proyectos_df):
         return ((presupuesto_total - costo_actual) / presupuesto_total) * 100
     return 0
 
-def _calcular_eficiencia_proyecto(proyecto):
-    """Calcula la eficiencia de un proyecto específico"""
-    if proyecto['presupuesto_estimado'] > 0:
-        eficiencia_presupuesto = (1 - (proyecto['costo_total_recursos'] / proyecto['presupuesto_estimado'])) * 100
-    else:
-        eficiencia_presupuesto = 0
-        
-    if proyecto['total_tareas'] > 0:
-        eficiencia_tareas = (proyecto['tareas_completadas'] / proyecto['total_tareas']) * 100
+def _puntuar_proyectos(proyectos_df):
+    """Calcula eficiencia, estado de salud y días restantes de todos los proyectos a la vez.
+    
+    Devuelve un DataFrame alineado con proyectos_df con las columnas
+    'eficiencia', 'estado_salud' ("Bueno", "Regular", "En riesgo", "Crítico")
+    y 'dias_restantes' (None si el proyecto no tiene fecha de fin).
+    """
+    hoy = pd.Timestamp(datetime.now().date())
+    
+    presupuesto = pd.to_numeric(proyectos_df['presupuesto_estimado'], errors='coerce')
+    costo = pd.to_numeric(proyectos_df['costo_total_recursos'], errors='coerce')
+    progreso = pd.to_numeric(proyectos_df['porcentaje_progreso'], errors='coerce')
+    fecha_inicio = pd.to_datetime(proyectos_df['fecha_inicio'], errors='coerce')
+    fecha_fin = pd.to_datetime(proyectos_df['fecha_fin'], errors='coerce')
+    con_presupuesto = presupuesto > 0
+    
+    # Eficiencia: 60% presupuesto, 40% tareas
+    eficiencia_presupuesto = ((1 - costo / presupuesto) * 100).where(con_presupuesto, 0)
+    if 'total_tareas' in proyectos_df.columns:
+        total_tareas = pd.to_numeric(proyectos_df['total_tareas'], errors='coerce')
+        tareas_completadas = pd.to_numeric(proyectos_df['tareas_completadas'], errors='coerce')
+        eficiencia_tareas = (tareas_completadas / total_tareas * 100).where(total_tareas > 0, 0)
     else:
         eficiencia_tareas = 0
-        
-    # Ponderación: 60% presupuesto, 40% tareas
-    return (eficiencia_presupuesto * 0.6) + (eficiencia_tareas * 0.4)
+    eficiencia = (eficiencia_presupuesto * 0.6) + (eficiencia_tareas * 0.4)
+    
+    # Desviación del progreso respecto al esperado según las fechas
+    vencido = fecha_fin.notna() & (fecha_fin < hoy) & (proyectos_df['estado'] != 'finalizado')
+    duracion_total = (fecha_fin - fecha_inicio).dt.days
+    tiempo_transcurrido = (fecha_fin.clip(upper=hoy) - fecha_inicio).dt.days
+    progreso_esperado = tiempo_transcurrido / duracion_total * 100
+    desviacion_progreso = (progreso - progreso_esperado).where(duracion_total > 0, 0)
+    
+    # Desviación presupuestaria
+    desviacion_presupuesto = ((costo / presupuesto) * 100 - 100).where(con_presupuesto, 0)
+    
+    estado_salud = np.select(
+        [
+            vencido,
+            (desviacion_progreso < -20) | (desviacion_presupuesto > 20),
+            (desviacion_progreso < -10) | (desviacion_presupuesto > 10),
+        ],
+        ["Crítico", "En riesgo", "Regular"],
+        default="Bueno"
+    )
+    
+    # Días restantes (nunca negativos)
+    dias_restantes = (fecha_fin - hoy).dt.days.clip(lower=0).astype('Int64').astype(object)
+    dias_restantes = dias_restantes.where(fecha_fin.notna(), None)
+    
+    return pd.DataFrame({
+        "eficiencia": eficiencia,
+        "estado_salud": estado_salud,
+        "dias_restantes": dias_restantes
+    }, index=proyectos_df.index)
 
-def _determinar_estado_salud_proyecto(proyecto):
-    """Determina el estado de salud de un proyecto: Bueno, Regular, En riesgo, Crítico"""
-    try:
-        # Verificar si hay fecha de fin establecida y si está vencida
-        hoy = datetime.now().date()
-        fecha_fin = pd.to_datetime(proyecto['fecha_fin']).date() if pd.notna(proyecto['fecha_fin']) else None
-        vencido = fecha_fin and fecha_fin < hoy and proyecto['estado'] != 'finalizado'
-        
-        # Calcular progreso esperado basado en fechas
-        if fecha_fin and pd.notna(proyecto['fecha_inicio']):
-            fecha_inicio = pd.to_datetime(proyecto['fecha_inicio']).date()
-            duracion_total = (fecha_fin - fecha_inicio).days
-            if duracion_total > 0:
-                tiempo_transcurrido = (min(hoy, fecha_fin) - fecha_inicio).days
-                progreso_esperado = (tiempo_transcurrido / duracion_total) * 100
-                desviacion_progreso = proyecto['porcentaje_progreso'] - progreso_esperado
-            else:
-                desviacion_progreso = 0
-        else:
-            desviacion_progreso = 0
-        
-        # Calcular desviación presupuestaria
-        if proyecto['presupuesto_estimado'] > 0:
-            desviacion_presupuesto = (proyecto['costo_total_recursos'] / proyecto['presupuesto_estimado']) * 100 - 100
-        else:
-            desviacion_presupuesto = 0
-        
-        # Determinar estado de salud
-        if vencido:
-            return "Crítico"
-        elif desviacion_progreso < -20 or desviacion_presupuesto > 20:
-            return "En riesgo"
-        elif desviacion_progreso < -10 or desviacion_presupuesto > 10:
-            return "Regular"
-        else:
-            return "Bueno"
-    except:
-        return "No determinado"
-
-def _calcular_dias_restantes(proyecto):
-    """Calcula los días restantes para la finalización del proyecto"""
-    hoy = datetime.now().date()
+def _detalle_proyecto(proyecto, tareas_df, recursos_df, kpis_df, campos=None, hoy=None, precalculados=None):
+    """Construye el detalle de un proyecto: datos, métricas, análisis y recomendaciones"""
+    # Métricas, análisis y recomendaciones comparten los valores intermedios del grafo
+    derivados = _evaluar_proyecto(proyecto, tareas_df, recursos_df, kpis_df, hoy, precalculados)
     
-    if pd.notna(proyecto['fecha_fin']):
-        fecha_fin = pd.to_datetime(proyecto['fecha_fin']).date()
-        dias_restantes = (fecha_fin - hoy).days
-        return max(0, dias_restantes)
+    if campos is not None and 'proyecto' in campos:
+        proyecto = proyecto[[c for c in ['id'] + campos['proyecto'] if c in proyecto.index]]
     
-    return None
+    return {
+        "proyecto": proyecto,
+        "tareas": _proyectar(tareas_df, 'tarea', campos),
+        "recursos": _proyectar(recursos_df, 'recurso', campos),
+        "kpis": _proyectar(kpis_df, 'kpi', campos),
+        "metricas": derivados['metricas'],
+        "analisis": derivados['analisis'],
+        "recomendaciones": derivados['recomendaciones']
+    }
+
+# Grafo de valores derivados de un proyecto: cada nodo recibe como parámetros
+# los valores de los que depende y se calcula una sola vez por evaluación
+grafo_proyecto = GrafoDerivados()
+
+def _evaluar_proyecto(proyecto, tareas_df, recursos_df, kpis_df, hoy=None, precalculados=None):
+    """Prepara la evaluación del grafo de un proyecto con la fecha de referencia de la petición.
+    
+    Los valores de `precalculados` (p. ej. el análisis de una evaluación conjunta
+    de varios proyectos) se usan en lugar de calcular los nodos del mismo nombre.
+    """
+    return grafo_proyecto.evaluar(
+        **(precalculados or {}),
+        proyecto=proyecto,
+        tareas=tareas_df,
+        recursos=recursos_df,
+        kpis=kpis_df,
+        hoy=hoy or datetime.now().date()
+    )
+
+@grafo_proyecto.nodo('fecha_inicio')
+def _fecha_inicio_proyecto(proyecto):
+    """Fecha de inicio del proyecto o None si no está definida"""
+    return pd.to_datetime(proyecto['fecha_inicio']).date() if pd.notna(proyecto['fecha_inicio']) else None
+
+@grafo_proyecto.nodo('fecha_fin')
+def _fecha_fin_proyecto(proyecto):
+    """Fecha de finalización del proyecto o None si no está definida"""
+    return pd.to_datetime(proyecto['fecha_fin']).date() if pd.notna(proyecto['fecha_fin']) else None
+
+@grafo_proyecto.nodo('dias_transcurridos')
+def _dias_transcurridos_proyecto(fecha_inicio, hoy):
+    """Días desde el inicio del proyecto (negativo si aún no ha empezado)"""
+    return (hoy - fecha_inicio).days if fecha_inicio else None
+
+@grafo_proyecto.nodo('conteo_estados_tareas')
+def _conteo_estados_tareas(tareas):
+    """Número de tareas por estado (incluidas las que no tienen estado)"""
+    return tareas['estado'].value_counts(dropna=False)
 
-def _calcular_metricas_proyecto(proyecto, tareas_df, recursos_df, kpis_df):
+@grafo_proyecto.nodo('metricas')
+def _calcular_metricas_proyecto(proyecto, recursos, kpis, conteo_estados_tareas, fecha_inicio, fecha_fin, dias_transcurridos):
     """Calcula métricas detalladas para un proyecto específico"""
-    hoy = datetime.now().date()
-    
     # Cálculos básicos
-    total_tareas = len(tareas_df)
-    tareas_completadas = len(tareas_df[tareas_df['estado'] == 'completada'])
-    tareas_pendientes = len(tareas_df[tareas_df['estado'] == 'pendiente'])
-    tareas_en_progreso = len(tareas_df[tareas_df['estado'] == 'en_progreso'])
+    total_tareas = int(conteo_estados_tareas.sum())
+    tareas_completadas = int(conteo_estados_tareas.get('completada', 0))
+    tareas_pendientes = int(conteo_estados_tareas.get('pendiente', 0))
+    tareas_en_progreso = int(conteo_estados_tareas.get('en_progreso', 0))
     
     # Cálculos de tiempo
-    fecha_inicio = pd.to_datetime(proyecto['fecha_inicio']).date() if pd.notna(proyecto['fecha_inicio']) else None
-    fecha_fin = pd.to_datetime(proyecto['fecha_fin']).date() if pd.notna(proyecto['fecha_fin']) else None
-    
     if fecha_inicio and fecha_fin:
         duracion_total = (fecha_fin - fecha_inicio).days
-        duracion_transcurrida = (hoy - fecha_inicio).days if hoy > fecha_inicio else 0
+        duracion_transcurrida = max(dias_transcurridos, 0)
         porcentaje_tiempo_transcurrido = (duracion_transcurrida / duracion_total) * 100 if duracion_total > 0 else 0
         desviacion_tiempo = porcentaje_tiempo_transcurrido - proyecto['porcentaje_progreso']
     else:
@@ -555,342 +1168,432 @@ def _calcular_metricas_proyecto(proyecto, tareas_df, recursos_df, kpis_df):
         "valor_ganado": valor_ganado,
         "indice_rendimiento_cronograma": indice_rendimiento_cronograma,
         "indice_rendimiento_costo": indice_rendimiento_costo,
-        "total_recursos": len(recursos_df),
-        "total_kpis": len(kpis_df)
+        "total_recursos": len(recursos),
+        "total_kpis": len(kpis)
     }
 
-def _analizar_proyecto(proyecto, tareas_df, recursos_df, kpis_df):
+@grafo_proyecto.nodo('indicadores')
+def _indicadores_proyecto(proyecto, tareas, metricas, fecha_fin, dias_transcurridos, hoy):
+    """Fila de indicadores de las reglas del proyecto (las columnas de _indicadores_proyectos) a partir de las métricas"""
+    hoy_dia = np.datetime64(hoy, 'D')
+    estado_tareas = tareas['estado'].to_numpy()
+    comienzo = _fechas_dia(tareas['fecha_comienzo'])
+    final = _fechas_dia(tareas['fecha_final'])
+    
+    def numero(valor):
+        return np.nan if valor is None else float(valor)
+    
+    return pd.DataFrame({
+        "estado": [proyecto['estado']],
+        "porcentaje_progreso": [numero(proyecto['porcentaje_progreso'])],
+        "presupuesto_estimado": [numero(proyecto['presupuesto_estimado'])],
+        "costo_total_recursos": [numero(proyecto['costo_total_recursos'])],
+        "numero_tareas": [len(tareas)],
+        "total_tareas": [metricas['total_tareas']],
+        "tasa_completitud": [metricas['tasa_completitud']],
+        "tareas_retrasadas": [int(((estado_tareas != 'completada') & (final < hoy_dia)).sum())],
+        "tareas_sin_progreso": [int(((estado_tareas == 'pendiente') & (comienzo <= hoy_dia)).sum())],
+        "tareas_sin_responsable": [int(tareas['responsable_id'].isna().sum())],
+        "total_recursos": [metricas['total_recursos']],
+        "total_kpis": [metricas['total_kpis']],
+        "dias_transcurridos": [numero(dias_transcurridos)],
+        "dias_restantes": [numero((fecha_fin - hoy).days if fecha_fin else None)],
+        "porcentaje_tiempo_transcurrido": [numero(metricas['porcentaje_tiempo_transcurrido'])],
+        "desviacion_tiempo_progreso": [numero(metricas['desviacion_tiempo_progreso'])],
+        "porcentaje_presupuesto_usado": [numero(metricas['porcentaje_presupuesto_usado'])],
+        "indice_rendimiento_cronograma": [numero(metricas['indice_rendimiento_cronograma'])],
+        "indice_rendimiento_costo": [numero(metricas['indice_rendimiento_costo'])],
+    })
+
+@grafo_proyecto.nodo('reglas')
+def _reglas_proyecto(indicadores):
+    """Reglas de análisis y recomendaciones evaluadas sobre la fila de indicadores del proyecto"""
+    return motor_proyectos.evaluar(indicadores)
+
+@grafo_proyecto.nodo('analisis')
+def _analizar_proyecto(reglas):
     """Genera un análisis detallado de un proyecto específico"""
-    metricas = _calcular_metricas_proyecto(proyecto, tareas_df, recursos_df, kpis_df)
-    
-    analisis = {
-        "puntos_fuertes": [],
-        "puntos_debiles": [],
-        "riesgos": [],
-        "oportunidades": []
-    }
-    
-    # Analizar puntos fuertes
-    if metricas["indice_rendimiento_costo"] > 1.05:
-        analisis["puntos_fuertes"].append("Excelente rendimiento de costos")
-    
-    if metricas["indice_rendimiento_cronograma"] > 1.05:
-        analisis["puntos_fuertes"].append("Progreso por encima del cronograma planificado")
-    
-    if metricas["tasa_completitud"] > 75:
-        analisis["puntos_fuertes"].append("Alta tasa de completitud de tareas")
-    
-    if metricas["porcentaje_presupuesto_usado"] < 85 and metricas["porcentaje_tiempo_transcurrido"] > 80:
-        analisis["puntos_fuertes"].append("Eficiencia presupuestaria")
-    
-    # Analizar puntos débiles
-    if metricas["indice_rendimiento_cronograma"] < 0.9:
-        analisis["puntos_debiles"].append("Retraso en el cronograma")
-    
-    if metricas["indice_rendimiento_costo"] < 0.9:
-        analisis["puntos_debiles"].append("Sobrecosto del proyecto")
-    
-    if metricas["porcentaje_tiempo_transcurrido"] > 70 and metricas["tasa_completitud"] < 50:
-        analisis["puntos_debiles"].append("Baja tasa de completitud en relación al tiempo transcurrido")
-    
-    # Analizar riesgos
-    if metricas["desviacion_tiempo_progreso"] > 20:
-        analisis["riesgos"].append("Riesgo de retraso significativo en la entrega")
-    
-    if metricas["porcentaje_presupuesto_usado"] > 90 and metricas["porcentaje_tiempo_transcurrido"] < 80:
-        analisis["riesgos"].append("Riesgo de sobrecosto del proyecto")
-    
-    tareas_sin_progreso = tareas_df[(tareas_df['estado'] == 'pendiente') & (pd.to_datetime(tareas_df['fecha_comienzo']) < pd.Timestamp.now())]
-    if len(tareas_sin_progreso) > 3:
-        analisis["riesgos"].append(f"Hay {len(tareas_sin_progreso)} tareas que debieron iniciarse pero siguen pendientes")
-    
-    # Analizar oportunidades
-    if len(kpis_df) < 3:
-        analisis["oportunidades"].append("Definir más KPIs para un mejor seguimiento del proyecto")
-    
-    if metricas["total_recursos"] < 2:
-        analisis["oportunidades"].append("Considerar asignar más recursos al proyecto")
-    
-    if metricas["tasa_completitud"] > 95 and proyecto['estado'] != 'finalizado':
-        analisis["oportunidades"].append("El proyecto está casi completado, considerar finalizarlo formalmente")
-        
-    # Si no hay nada, agregar mensajes predeterminados
-    if not analisis["puntos_fuertes"]:
-        analisis["puntos_fuertes"].append("No se identificaron puntos fuertes destacables")
-    if not analisis["puntos_debiles"]:
-        analisis["puntos_debiles"].append("No se identificaron puntos débiles significativos")
-    if not analisis["riesgos"]:
-        analisis["riesgos"].append("No se identificaron riesgos críticos en este momento")
-    if not analisis["oportunidades"]:
-        analisis["oportunidades"].append("Considerar realizar una revisión detallada para identificar oportunidades de mejora")
-        
-    return analisis
+    return reglas.analisis()
 
-def _generar_recomendaciones_proyecto(proyecto, tareas_df, recursos_df):
+@grafo_proyecto.nodo('recomendaciones')
+def _generar_recomendaciones_proyecto(reglas):
     """Genera recomendaciones específicas para mejorar un proyecto"""
-    recomendaciones = []
-    
-    # Análisis de estado
-    if proyecto['estado'] == 'en_progreso':
-        # Verificar si hay tareas sin asignar
-        tareas_sin_responsable = tareas_df[tareas_df['responsable_id'].isna()]
-        if not tareas_sin_responsable.empty:
-            recomendaciones.append(f"Asignar responsables a las {len(tareas_sin_responsable)} tareas sin asignar")
-        
-        # Verificar si hay tareas retrasadas
-        hoy = datetime.now().date()
-        tareas_retrasadas = tareas_df[(tareas_df['estado'] != 'completada') & 
-                                      (pd.notnull(tareas_df['fecha_final'])) & 
-                                      (pd.to_datetime(tareas_df['fecha_final']).dt.date < hoy)]
-        if not tareas_retrasadas.empty:
-            recomendaciones.append(f"Priorizar las {len(tareas_retrasadas)} tareas retrasadas")
-    
-    # Análisis de recursos
-    if len(recursos_df) == 0:
-        recomendaciones.append("Asignar recursos al proyecto para un mejor seguimiento y control")
-    
-    # Verificar presupuesto
-    if proyecto['costo_total_recursos'] > proyecto['presupuesto_estimado'] * 0.9:
-        recomendaciones.append("Reevaluar el presupuesto del proyecto, ya que está cerca o por encima del límite")
-    
-    # Analizar progreso y fechas
-    if pd.notnull(proyecto['fecha_fin']):
-        fecha_fin = pd.to_datetime(proyecto['fecha_fin']).date()
-        hoy = datetime.now().date()
-        dias_restantes = (fecha_fin - hoy).days
-        
-        if dias_restantes < 30 and proyecto['porcentaje_progreso'] < 70:
-            recomendaciones.append("Considerar extender la fecha de finalización o reasignar más recursos debido al bajo progreso")
-    
-    # Recomendaciones por estado
-    if proyecto['estado'] == 'planificacion':
-        recomendaciones.append("Definir hitos claros y KPIs medibles antes de iniciar el proyecto")
-        recomendaciones.append("Realizar una evaluación de riesgos detallada")
-    
-    # Si el progreso es bajo
-    if proyecto['porcentaje_progreso'] < 25 and pd.notnull(proyecto['fecha_inicio']):
-        fecha_inicio = pd.to_datetime(proyecto['fecha_inicio']).date()
-        hoy = datetime.now().date()
-        dias_transcurridos = (hoy - fecha_inicio).days
-        
-        if dias_transcurridos > 30:
-            recomendaciones.append("Evaluar los obstáculos que impiden el progreso del proyecto")
-    
-    # Si el proyecto tiene más de 10 tareas
-    if len(tareas_df) > 10:
-        recomendaciones.append("Considerar dividir el proyecto en fases o subproyectos para un mejor seguimiento")
-    
-    # Si no hay recomendaciones, agregar una genérica
-    if not recomendaciones:
-        recomendaciones.append("El proyecto parece estar avanzando adecuadamente. Mantener el monitoreo regular")
-    
-    return recomendaciones
+    return _textos_recomendaciones_proyecto(reglas.recomendaciones())
 
-def _analizar_fortalezas_debilidades(proyectos_df, tareas_df, empleados_df):
-    """Analiza fortalezas y debilidades globales de la gestión de proyectos"""
-    analisis = {
-        "fortalezas": [],
-        "debilidades": [],
-        "oportunidades": [],
-        "amenazas": []
+# Reglas del análisis y de las recomendaciones de cada proyecto, sobre una fila de
+# indicadores por proyecto. Las evalúan el grafo de un proyecto (una sola fila,
+# construida por _indicadores_proyecto con sus métricas) y /proyectos/analisis
+# (toda la cartera de una vez, con _indicadores_proyectos). Los indicadores que pueden no existir (sin fechas) son NaN, y
+# cualquier comparación con NaN es falsa.
+REGLAS_PROYECTO = [
+    # Puntos fuertes
+    Regla('COSTO_EXCELENTE', lambda i: i.indice_rendimiento_costo > 1.05, 'puntos_fuertes',
+          "Excelente rendimiento de costos"),
+    Regla('ADELANTADO', lambda i: i.indice_rendimiento_cronograma > 1.05, 'puntos_fuertes',
+          "Progreso por encima del cronograma planificado"),
+    Regla('COMPLETITUD_ALTA', lambda i: i.tasa_completitud > 75, 'puntos_fuertes',
+          "Alta tasa de completitud de tareas"),
+    Regla('EFICIENCIA_PRESUPUESTARIA', lambda i: (i.porcentaje_presupuesto_usado < 85) & (i.porcentaje_tiempo_transcurrido > 80),
+          'puntos_fuertes', "Eficiencia presupuestaria"),
+    # Puntos débiles
+    Regla('CRONOGRAMA_RETRASADO', lambda i: i.indice_rendimiento_cronograma < 0.9, 'puntos_debiles',
+          "Retraso en el cronograma"),
+    Regla('SOBRECOSTO', lambda i: i.indice_rendimiento_costo < 0.9, 'puntos_debiles',
+          "Sobrecosto del proyecto"),
+    Regla('COMPLETITUD_BAJA', lambda i: (i.porcentaje_tiempo_transcurrido > 70) & (i.tasa_completitud < 50), 'puntos_debiles',
+          "Baja tasa de completitud en relación al tiempo transcurrido"),
+    # Riesgos
+    Regla('RIESGO_RETRASO', lambda i: i.desviacion_tiempo_progreso > 20, 'riesgos',
+          "Riesgo de retraso significativo en la entrega"),
+    Regla('RIESGO_SOBRECOSTO', lambda i: (i.porcentaje_presupuesto_usado > 90) & (i.porcentaje_tiempo_transcurrido < 80), 'riesgos',
+          "Riesgo de sobrecosto del proyecto"),
+    Regla('TAREAS_SIN_INICIAR', lambda i: i.tareas_sin_progreso > 3, 'riesgos',
+          "Hay {tareas_sin_progreso} tareas que debieron iniciarse pero siguen pendientes"),
+    # Oportunidades
+    Regla('POCOS_KPIS', lambda i: i.total_kpis < 3, 'oportunidades',
+          "Definir más KPIs para un mejor seguimiento del proyecto"),
+    Regla('POCOS_RECURSOS', lambda i: i.total_recursos < 2, 'oportunidades',
+          "Considerar asignar más recursos al proyecto"),
+    Regla('CASI_COMPLETADO', lambda i: (i.tasa_completitud > 95) & (i.estado != 'finalizado'), 'oportunidades',
+          "El proyecto está casi completado, considerar finalizarlo formalmente"),
+    # Recomendaciones
+    Regla('TAREAS_SIN_RESPONSABLE', lambda i: (i.estado == 'en_progreso') & (i.tareas_sin_responsable > 0), recomendaciones=[
+        "Asignar responsables a las {tareas_sin_responsable} tareas sin asignar",
+    ]),
+    Regla('TAREAS_RETRASADAS', lambda i: (i.estado == 'en_progreso') & (i.tareas_retrasadas > 0), recomendaciones=[
+        "Priorizar las {tareas_retrasadas} tareas retrasadas",
+    ]),
+    Regla('SIN_RECURSOS', lambda i: i.total_recursos == 0, recomendaciones=[
+        "Asignar recursos al proyecto para un mejor seguimiento y control",
+    ]),
+    Regla('PRESUPUESTO_AL_LIMITE', lambda i: i.costo_total_recursos > i.presupuesto_estimado * 0.9, recomendaciones=[
+        "Reevaluar el presupuesto del proyecto, ya que está cerca o por encima del límite",
+    ]),
+    Regla('FIN_CERCANO', lambda i: (i.dias_restantes < 30) & (i.porcentaje_progreso < 70), recomendaciones=[
+        "Considerar extender la fecha de finalización o reasignar más recursos debido al bajo progreso",
+    ]),
+    Regla('EN_PLANIFICACION', lambda i: i.estado == 'planificacion', recomendaciones=[
+        "Definir hitos claros y KPIs medibles antes de iniciar el proyecto",
+        "Realizar una evaluación de riesgos detallada",
+    ]),
+    Regla('PROGRESO_ESTANCADO', lambda i: (i.porcentaje_progreso < 25) & (i.dias_transcurridos > 30), recomendaciones=[
+        "Evaluar los obstáculos que impiden el progreso del proyecto",
+    ]),
+    Regla('MUCHAS_TAREAS', lambda i: i.numero_tareas > 10, recomendaciones=[
+        "Considerar dividir el proyecto en fases o subproyectos para un mejor seguimiento",
+    ]),
+]
+
+motor_proyectos = MotorReglas(
+    REGLAS_PROYECTO,
+    categorias=("puntos_fuertes", "puntos_debiles", "riesgos", "oportunidades"),
+    por_defecto={
+        "puntos_fuertes": "No se identificaron puntos fuertes destacables",
+        "puntos_debiles": "No se identificaron puntos débiles significativos",
+        "riesgos": "No se identificaron riesgos críticos en este momento",
+        "oportunidades": "Considerar realizar una revisión detallada para identificar oportunidades de mejora",
     }
-    
-    # Analizar proyectos
-    proyectos_en_progreso = proyectos_df[proyectos_df['estado'] == 'en_progreso']
-    proyectos_finalizados = proyectos_df[proyectos_df['estado'] == 'finalizado']
-    
+)
+
+# Recomendación de un proyecto al que no se le aplica ninguna regla
+RECOMENDACION_PROYECTO_POR_DEFECTO = "El proyecto parece estar avanzando adecuadamente. Mantener el monitoreo regular"
+
+def _textos_recomendaciones_proyecto(recomendaciones):
+    """Textos de las recomendaciones de un proyecto, con la genérica si no se activó ninguna regla"""
+    return [r.texto for r in recomendaciones] or [RECOMENDACION_PROYECTO_POR_DEFECTO]
+
+def _fechas_dia(serie):
+    """Columna de fechas (objetos date de read_sql o datetime64) como datetime64[D], con NaT si falta"""
+    return pd.to_datetime(serie, errors='coerce').to_numpy().astype('datetime64[D]')
+
+def _dias(desde, hasta):
+    """Días entre dos arrays datetime64[D] como float (NaN si falta alguna fecha)"""
+    return np.where(np.isnat(desde) | np.isnat(hasta), np.nan, (hasta - desde).astype('timedelta64[D]').astype(float))
+
+def _indicadores_proyectos(proyectos_df, tareas_df, recursos_df, kpis_df, hoy=None):
+    """Indicadores de todos los proyectos (una fila por proyecto) con los mismos cálculos que el grafo de un proyecto"""
+    hoy = np.datetime64(hoy or datetime.now().date(), 'D')
+    n = len(proyectos_df)
+    ids = pd.Index(proyectos_df['id'])
+    
+    def contar(df, mascara=None):
+        # Filas de cada proyecto (solo las que cumplen la máscara, si se indica)
+        posiciones = ids.get_indexer(df['proyecto_id'])
+        validas = posiciones >= 0
+        if mascara is not None:
+            validas &= np.asarray(mascara, dtype=bool)
+        return np.bincount(posiciones[validas], minlength=n)
+    
+    # Tareas por estado, retrasadas, sin iniciar y sin responsable
+    estado_tareas = tareas_df['estado'].to_numpy()
+    comienzo = _fechas_dia(tareas_df['fecha_comienzo'])
+    final = _fechas_dia(tareas_df['fecha_final'])
+    total_tareas = contar(tareas_df)
+    completadas = contar(tareas_df, estado_tareas == 'completada')
+    
+    # Fechas y tiempo transcurrido
+    fecha_inicio = _fechas_dia(proyectos_df['fecha_inicio'])
+    fecha_fin = _fechas_dia(proyectos_df['fecha_fin'])
+    hoy_columna = np.full(n, hoy)
+    dias_transcurridos = _dias(fecha_inicio, hoy_columna)
+    duracion_total = _dias(fecha_inicio, fecha_fin)
+    
+    progreso = proyectos_df['porcentaje_progreso'].to_numpy(dtype=float)
+    presupuesto = proyectos_df['presupuesto_estimado'].to_numpy(dtype=float)
+    costo = proyectos_df['costo_total_recursos'].to_numpy(dtype=float)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        porcentaje_tiempo = np.where(
+            duracion_total > 0, np.maximum(dias_transcurridos, 0) / duracion_total * 100, 0
+        )
+        porcentaje_tiempo[np.isnan(duracion_total)] = np.nan
+        
+        # Valor ganado (EV), como en _calcular_metricas_proyecto
+        valor_planificado = np.where(
+            (porcentaje_tiempo != 0) & ~np.isnan(porcentaje_tiempo), presupuesto * (porcentaje_tiempo / 100), 0
+        )
+        valor_ganado = presupuesto * (progreso / 100)
+        
+        indicadores = pd.DataFrame({
+            "estado": proyectos_df['estado'].to_numpy(),
+            "porcentaje_progreso": progreso,
+            "presupuesto_estimado": presupuesto,
+            "costo_total_recursos": costo,
+            "numero_tareas": total_tareas,
+            "total_tareas": total_tareas,
+            "tasa_completitud": np.where(total_tareas > 0, completadas / total_tareas * 100, 0),
+            "tareas_retrasadas": contar(tareas_df, (estado_tareas != 'completada') & (final < hoy)),
+            "tareas_sin_progreso": contar(tareas_df, (estado_tareas == 'pendiente') & (comienzo <= hoy)),
+            "tareas_sin_responsable": contar(tareas_df, tareas_df['responsable_id'].isna()),
+            "total_recursos": contar(recursos_df),
+            "total_kpis": contar(kpis_df),
+            "dias_transcurridos": dias_transcurridos,
+            "dias_restantes": _dias(hoy_columna, fecha_fin),
+            "porcentaje_tiempo_transcurrido": porcentaje_tiempo,
+            "desviacion_tiempo_progreso": porcentaje_tiempo - progreso,
+            "porcentaje_presupuesto_usado": np.where(presupuesto > 0, costo / presupuesto * 100, 0),
+            "indice_rendimiento_cronograma": np.where(valor_planificado > 0, valor_ganado / valor_planificado, 0),
+            "indice_rendimiento_costo": np.where(costo > 0, valor_ganado / costo, 0),
+        }, index=proyectos_df.index)
+    
+    return indicadores
+
+def _analisis_proyectos(proyectos_df, tareas_df, recursos_df, kpis_df, hoy=None):
+    """Análisis y recomendaciones de cada proyecto de la cartera en una sola evaluación de las reglas"""
+    evaluacion = motor_proyectos.evaluar(_indicadores_proyectos(proyectos_df, tareas_df, recursos_df, kpis_df, hoy))
+    analisis = evaluacion.analisis_filas()
+    recomendaciones = evaluacion.recomendaciones_filas()
+    
+    return [
+        {
+            "id": proyecto_id,
+            "nombre": nombre,
+            "estado": estado,
+            "analisis": analisis_proyecto,
+            "recomendaciones": _textos_recomendaciones_proyecto(recomendaciones_proyecto),
+        }
+        for proyecto_id, nombre, estado, analisis_proyecto, recomendaciones_proyecto in zip(
+            proyectos_df['id'].tolist(), proyectos_df['nombre'].tolist(), proyectos_df['estado'].tolist(),
+            analisis, recomendaciones
+        )
+    ]
+
+# Reglas del análisis FODA y de las recomendaciones globales de la cartera.
+# Cada regla es una condición vectorial (función de las columnas) sobre los indicadores de _indicadores_cartera;
+# las recomendaciones se asocian al código de la regla que las activa.
+REGLAS_CARTERA = [
     # 1. Eficiencia presupuestaria
-    if len(proyectos_finalizados) > 0:
-        eficiencia_media = _calcular_eficiencia_presupuestaria(proyectos_finalizados)
-        if eficiencia_media > 10:
-            analisis["fortalezas"].append(f"Buena eficiencia presupuestaria global ({eficiencia_media:.2f}% de ahorro promedio)")
-        elif eficiencia_media < -5:
-            analisis["debilidades"].append(f"Tendencia a superar presupuestos ({-eficiencia_media:.2f}% de sobrecosto promedio)")
-    
+    Regla('EFICIENCIA_ALTA', lambda i: (i.n_finalizados > 0) & (i.eficiencia_finalizados > 10), 'fortalezas',
+          "Buena eficiencia presupuestaria global ({eficiencia_finalizados:.2f}% de ahorro promedio)"),
+    Regla('SOBRECOSTO', lambda i: (i.n_finalizados > 0) & (i.eficiencia_finalizados < -5), 'debilidades',
+          "Tendencia a superar presupuestos ({sobrecosto_finalizados:.2f}% de sobrecosto promedio)",
+          prioridad=10, recomendaciones=[
+              Recomendacion("Implementar un proceso más riguroso de estimación de presupuestos", secundaria=True),
+              "Establecer revisiones periódicas de gastos durante la ejecución de proyectos",
+          ]),
     # 2. Cumplimiento de plazos
-    hoy = datetime.now().date()
-    proyectos_retrasados = sum(1 for _, p in proyectos_en_progreso.iterrows() 
-                              if pd.notna(p['fecha_fin']) and pd.to_datetime(p['fecha_fin']).date() < hoy)
-    
-    porcentaje_retrasados = (proyectos_retrasados / len(proyectos_en_progreso)) * 100 if len(proyectos_en_progreso) > 0 else 0
-    
-    if porcentaje_retrasados > 30:
-        analisis["debilidades"].append(f"Alto porcentaje de proyectos retrasados ({porcentaje_retrasados:.2f}%)")
-    elif porcentaje_retrasados < 10 and len(proyectos_en_progreso) > 3:
-        analisis["fortalezas"].append(f"Excelente cumplimiento de plazos (solo {porcentaje_retrasados:.2f}% de proyectos retrasados)")
-    
+    Regla('RETRASOS_ALTOS', lambda i: i.porcentaje_retrasados > 30, 'debilidades',
+          "Alto porcentaje de proyectos retrasados ({porcentaje_retrasados:.2f}%)",
+          prioridad=10, recomendaciones=[
+              "Revisar y ajustar el proceso de planificación de plazos",
+              Recomendacion("Implementar alertas tempranas para proyectos en riesgo de retraso", secundaria=True),
+          ]),
+    Regla('PLAZOS_CUMPLIDOS', lambda i: (i.porcentaje_retrasados < 10) & (i.n_en_progreso > 3), 'fortalezas',
+          "Excelente cumplimiento de plazos (solo {porcentaje_retrasados:.2f}% de proyectos retrasados)"),
     # 3. Disponibilidad de personal
-    empleados_disponibles = len(empleados_df[empleados_df['disponibilidad'] == 'disponible'])
-    porcentaje_disponibles = (empleados_disponibles / len(empleados_df)) * 100 if len(empleados_df) > 0 else 0
-    
-    if porcentaje_disponibles < 15:
-        analisis["amenazas"].append(f"Baja disponibilidad de personal ({porcentaje_disponibles:.2f}%)")
-    elif porcentaje_disponibles > 40:
-        analisis["oportunidades"].append(f"Alta disponibilidad de personal ({porcentaje_disponibles:.2f}%) para nuevos proyectos")
-    
+    Regla('PERSONAL_ESCASO', lambda i: i.porcentaje_disponibles < 15, 'amenazas',
+          "Baja disponibilidad de personal ({porcentaje_disponibles:.2f}%)",
+          prioridad=20, recomendaciones=[
+              "Evaluar la necesidad de contratar personal adicional o freelancers",
+              "Priorizar proyectos y posiblemente posponer los menos críticos",
+          ]),
+    Regla('PERSONAL_DISPONIBLE', lambda i: i.porcentaje_disponibles > 40, 'oportunidades',
+          "Alta disponibilidad de personal ({porcentaje_disponibles:.2f}%) para nuevos proyectos",
+          prioridad=30, recomendaciones=[
+              "Aprovechar la disponibilidad para capacitar al personal en nuevas habilidades",
+              "Considerar iniciar proyectos estratégicos planificados para el futuro",
+          ]),
     # 4. Progreso global
-    progreso_promedio = proyectos_en_progreso['porcentaje_progreso'].mean() if len(proyectos_en_progreso) > 0 else 0
-    
-    if progreso_promedio < 30:
-        analisis["debilidades"].append(f"Bajo progreso promedio en los proyectos activos ({progreso_promedio:.2f}%)")
-    elif progreso_promedio > 70:
-        analisis["fortalezas"].append(f"Buen progreso promedio en los proyectos activos ({progreso_promedio:.2f}%)")
-    
-    # 5. Diversidad de departamentos y equipos involucrados
-    if 'departamento' in empleados_df.columns:
-        departamentos_unicos = empleados_df['departamento'].nunique()
-        if departamentos_unicos > 3:
-            analisis["fortalezas"].append(f"Buena colaboración interdepartamental ({departamentos_unicos} departamentos)")
-    
-    # 6. Evaluar la carga de trabajo
-    tareas_por_empleado = []
-    for _, empleado in empleados_df.iterrows():
-        if 'id' in empleado:
-            tareas = tareas_df[tareas_df['responsable_id'] == empleado['id']]
-            tareas_por_empleado.append(len(tareas))
-    
-    if tareas_por_empleado:
-        max_tareas = max(tareas_por_empleado) if tareas_por_empleado else 0
-        desviacion_tareas = np.std(tareas_por_empleado) if len(tareas_por_empleado) > 1 else 0
-        
-        if max_tareas > 10:
-            analisis["amenazas"].append(f"Posible sobrecarga de trabajo en algunos empleados (máx. {max_tareas} tareas)")
-        
-        if desviacion_tareas > 5:
-            analisis["debilidades"].append("Distribución desigual de la carga de trabajo entre empleados")
-    
-    # Verificar que haya al menos un elemento en cada categoría
-    if not analisis["fortalezas"]:
-        analisis["fortalezas"].append("La organización mantiene operaciones estables")
-    
-    if not analisis["debilidades"]:
-        analisis["debilidades"].append("No se identificaron debilidades críticas en este momento")
-    
-    if not analisis["oportunidades"]:
-        analisis["oportunidades"].append("Considerar implementar más KPIs para medir el rendimiento de los proyectos")
-    
-    if not analisis["amenazas"]:
-        analisis["amenazas"].append("Vigilar la asignación de recursos para evitar cuellos de botella")
-    
-    return analisis
+    Regla('PROGRESO_BAJO', lambda i: i.progreso_promedio < 30, 'debilidades',
+          "Bajo progreso promedio en los proyectos activos ({progreso_promedio:.2f}%)",
+          prioridad=10, recomendaciones=[
+              "Realizar revisiones semanales del progreso de proyectos críticos",
+              "Considerar la implementación de metodologías ágiles para mejorar la velocidad de entrega",
+          ]),
+    Regla('PROGRESO_ALTO', lambda i: i.progreso_promedio > 70, 'fortalezas',
+          "Buen progreso promedio en los proyectos activos ({progreso_promedio:.2f}%)"),
+    # 5. Diversidad de departamentos
+    Regla('COLABORACION', lambda i: i.departamentos_unicos > 3, 'fortalezas',
+          "Buena colaboración interdepartamental ({departamentos_unicos} departamentos)"),
+    # 6. Carga de trabajo
+    Regla('SOBRECARGA', lambda i: i.max_tareas_empleado > 10, 'amenazas',
+          "Posible sobrecarga de trabajo en algunos empleados (máx. {max_tareas_empleado} tareas)",
+          prioridad=20, recomendaciones=[
+              "Redistribuir tareas entre el equipo para evitar el agotamiento",
+              "Considerar herramientas de automatización para tareas repetitivas",
+          ]),
+    Regla('CARGA_DESIGUAL', lambda i: i.desviacion_tareas > 5, 'debilidades',
+          "Distribución desigual de la carga de trabajo entre empleados",
+          prioridad=10, recomendaciones=[
+              "Revisar la asignación de tareas para equilibrar la carga de trabajo",
+              Recomendacion("Implementar un sistema de rotación para tareas repetitivas", secundaria=True),
+          ]),
+    # Recomendaciones basadas solo en métricas
+    Regla('SOBRECOSTO_GLOBAL', lambda i: i.eficiencia_global < 0, prioridad=40, recomendaciones=[
+        "Realizar un análisis detallado de costos para identificar áreas de optimización",
+    ]),
+    Regla('SIN_KPIS', lambda i: i.proyectos_sin_kpis > 0, prioridad=40, recomendaciones=[
+        "Definir KPIs para los {proyectos_sin_kpis} proyectos que carecen de indicadores",
+    ]),
+    Regla('CASI_TERMINADOS', lambda i: i.proyectos_casi_terminados > 0, prioridad=40, recomendaciones=[
+        "Verificar criterios de finalización para {proyectos_casi_terminados} proyectos con más del 90% de progreso",
+    ]),
+    # Mejores prácticas generales
+    Regla('BUENAS_PRACTICAS', lambda i: True, prioridad=50, recomendaciones=[
+        Recomendacion("Implementar reuniones retrospectivas al finalizar cada proyecto para identificar mejoras", secundaria=True),
+        Recomendacion("Mantener una base de conocimientos documentando lecciones aprendidas de cada proyecto", secundaria=True),
+    ]),
+]
 
-def _generar_recomendaciones(proyectos_df, tareas_df, empleados_df, analisis):
-    """Genera recomendaciones para mejorar la gestión de proyectos basadas en el análisis"""
-    recomendaciones = []
-    
-    # 1. Recomendaciones basadas en debilidades
-    for debilidad in analisis.get("debilidades", []):
-        if "presupuestos" in debilidad.lower():
-            recomendaciones.append("Implementar un proceso más riguroso de estimación de presupuestos")
-            recomendaciones.append("Establecer revisiones periódicas de gastos durante la ejecución de proyectos")
-        
-        elif "retrasados" in debilidad.lower():
-            recomendaciones.append("Revisar y ajustar el proceso de planificación de plazos")
-            recomendaciones.append("Implementar alertas tempranas para proyectos en riesgo de retraso")
-        
-        elif "progreso" in debilidad.lower():
-            recomendaciones.append("Realizar revisiones semanales del progreso de proyectos críticos")
-            recomendaciones.append("Considerar la implementación de metodologías ágiles para mejorar la velocidad de entrega")
-        
-        elif "distribución" in debilidad.lower() and "carga" in debilidad.lower():
-            recomendaciones.append("Revisar la asignación de tareas para equilibrar la carga de trabajo")
-            recomendaciones.append("Implementar un sistema de rotación para tareas repetitivas")
-    
-    # 2. Recomendaciones basadas en amenazas
-    for amenaza in analisis.get("amenazas", []):
-        if "disponibilidad" in amenaza.lower() and "personal" in amenaza.lower():
-            recomendaciones.append("Evaluar la necesidad de contratar personal adicional o freelancers")
-            recomendaciones.append("Priorizar proyectos y posiblemente posponer los menos críticos")
-        
-        elif "sobrecarga" in amenaza.lower():
-            recomendaciones.append("Redistribuir tareas entre el equipo para evitar el agotamiento")
-            recomendaciones.append("Considerar herramientas de automatización para tareas repetitivas")
-    
-    # 3. Recomendaciones basadas en oportunidades
-    for oportunidad in analisis.get("oportunidades", []):
-        if "disponibilidad" in oportunidad.lower() and "personal" in oportunidad.lower():
-            recomendaciones.append("Aprovechar la disponibilidad para capacitar al personal en nuevas habilidades")
-            recomendaciones.append("Considerar iniciar proyectos estratégicos planificados para el futuro")
-    
-    # 4. Recomendaciones específicas basadas en métricas
-    
-    # Verificar eficiencia presupuestaria global
-    eficiencia_global = _calcular_eficiencia_presupuestaria(proyectos_df)
-    if eficiencia_global < 0:
-        recomendaciones.append("Realizar un análisis detallado de costos para identificar áreas de optimización")
-    
-    # Verificar proyectos sin KPIs definidos
+motor_cartera = MotorReglas(
+    REGLAS_CARTERA,
+    categorias=("fortalezas", "debilidades", "oportunidades", "amenazas"),
+    por_defecto={
+        "fortalezas": "La organización mantiene operaciones estables",
+        "debilidades": "No se identificaron debilidades críticas en este momento",
+        "oportunidades": "Considerar implementar más KPIs para medir el rendimiento de los proyectos",
+        "amenazas": "Vigilar la asignación de recursos para evitar cuellos de botella",
+    }
+)
+
+# Máximo de recomendaciones globales antes de resumir las secundarias
+MAX_RECOMENDACIONES = 10
+
+def _indicadores_cartera(proyectos_df, tareas_df, empleados_df):
+    """Indicadores globales de la cartera (una fila) sobre los que se evalúan las reglas"""
+    hoy = pd.Timestamp(datetime.now().date())
+    en_progreso = proyectos_df['estado'] == 'en_progreso'
+    finalizados = proyectos_df[proyectos_df['estado'] == 'finalizado']
+    n_en_progreso = int(en_progreso.sum())
+    
+    eficiencia_finalizados = _calcular_eficiencia_presupuestaria(finalizados) if len(finalizados) > 0 else 0
+    
+    fecha_fin = pd.to_datetime(proyectos_df['fecha_fin'], errors='coerce')
+    retrasados = int((en_progreso & (fecha_fin < hoy)).sum())
+    
+    disponibles = int((empleados_df['disponibilidad'] == 'disponible').sum())
+    
+    # Tareas por empleado (solo si los empleados traen su id y las tareas su responsable)
+    max_tareas, desviacion_tareas = 0, 0
+    if 'id' in empleados_df.columns and len(empleados_df) > 0:
+        tareas_por_empleado = empleados_df['id'].map(
+            tareas_df.groupby('responsable_id').size()
+        ).fillna(0).astype(int)
+        max_tareas = int(tareas_por_empleado.max())
+        desviacion_tareas = float(np.std(tareas_por_empleado.to_numpy())) if len(tareas_por_empleado) > 1 else 0
+    
+    proyectos_sin_kpis = 0
     if 'indicadores_ids' in proyectos_df.columns:
-        proyectos_sin_kpis = proyectos_df[proyectos_df['indicadores_ids'].isna() | (proyectos_df['indicadores_ids'] == '[]')]
-        if len(proyectos_sin_kpis) > 0:
-            recomendaciones.append(f"Definir KPIs para los {len(proyectos_sin_kpis)} proyectos que carecen de indicadores")
-    
-    # Verificar proyectos casi finalizados
-    proyectos_casi_terminados = proyectos_df[(proyectos_df['estado'] == 'en_progreso') & 
-                                            (proyectos_df['porcentaje_progreso'] > 90)]
-    if len(proyectos_casi_terminados) > 0:
-        recomendaciones.append(f"Verificar criterios de finalización para {len(proyectos_casi_terminados)} proyectos con más del 90% de progreso")
-    
-    # Recomendaciones de mejores prácticas generales
-    recomendaciones.append("Implementar reuniones retrospectivas al finalizar cada proyecto para identificar mejoras")
-    recomendaciones.append("Mantener una base de conocimientos documentando lecciones aprendidas de cada proyecto")
-    
-    # Limitar a 10 recomendaciones máximo para no abrumar
-    if len(recomendaciones) > 10:
+        proyectos_sin_kpis = int((proyectos_df['indicadores_ids'].isna() | (proyectos_df['indicadores_ids'] == '[]')).sum())
+    
+    return pd.DataFrame({
+        "n_finalizados": [len(finalizados)],
+        "eficiencia_finalizados": [eficiencia_finalizados],
+        "sobrecosto_finalizados": [-eficiencia_finalizados],
+        "n_en_progreso": [n_en_progreso],
+        "porcentaje_retrasados": [(retrasados / n_en_progreso) * 100 if n_en_progreso > 0 else 0],
+        "porcentaje_disponibles": [(disponibles / len(empleados_df)) * 100 if len(empleados_df) > 0 else 0],
+        "progreso_promedio": [proyectos_df.loc[en_progreso, 'porcentaje_progreso'].mean() if n_en_progreso > 0 else 0],
+        "departamentos_unicos": [empleados_df['departamento'].nunique() if 'departamento' in empleados_df.columns else 0],
+        "max_tareas_empleado": [max_tareas],
+        "desviacion_tareas": [desviacion_tareas],
+        "eficiencia_global": [_calcular_eficiencia_presupuestaria(proyectos_df)],
+        "proyectos_sin_kpis": [proyectos_sin_kpis],
+        "proyectos_casi_terminados": [int((en_progreso & (proyectos_df['porcentaje_progreso'] > 90)).sum())],
+    })
+
+def _evaluar_reglas_cartera(proyectos_df, tareas_df, empleados_df):
+    """Evalúa las reglas de la cartera en una sola pasada"""
+    return motor_cartera.evaluar(_indicadores_cartera(proyectos_df, tareas_df, empleados_df))
+
+def _analizar_fortalezas_debilidades(proyectos_df, tareas_df, empleados_df, evaluacion=None):
+    """Analiza fortalezas y debilidades globales de la gestión de proyectos"""
+    if evaluacion is None:
+        evaluacion = _evaluar_reglas_cartera(proyectos_df, tareas_df, empleados_df)
+    return evaluacion.analisis()
+
+def _generar_recomendaciones(evaluacion):
+    """Genera recomendaciones para mejorar la gestión de proyectos a partir de las reglas activadas"""
+    recomendaciones = evaluacion.recomendaciones()
+    
+    # Limitar el número de recomendaciones para no abrumar
+    if len(recomendaciones) > MAX_RECOMENDACIONES:
         # Priorizar recomendaciones específicas sobre las generales
-        recomendaciones = [r for r in recomendaciones if not r.startswith("Implementar") and not r.startswith("Mantener")][:8]
-        recomendaciones.append("Implementar reuniones retrospectivas al finalizar cada proyecto")
-        recomendaciones.append("Mantener una base de conocimientos con lecciones aprendidas")
+        return [r.texto for r in recomendaciones if not r.secundaria][:8] + [
+            "Implementar reuniones retrospectivas al finalizar cada proyecto",
+            "Mantener una base de conocimientos con lecciones aprendidas"
+        ]
     
-    return recomendaciones
+    return [r.texto for r in recomendaciones]
 
-def _calcular_carga_trabajo(empleado_data):
-    """Calcula el nivel de carga de trabajo de un empleado"""
+def _calcular_carga_trabajo(empleados_df):
+    """Calcula el nivel (0-10) y la categoría de carga de trabajo de cada empleado"""
     # Factores para considerar:
     # 1. Número de tareas asignadas
     # 2. Número de proyectos en los que participa
     # 3. Disponibilidad declarada
-    
-    nivel_carga = 0
+    total_tareas = empleados_df['total_tareas']
+    total_proyectos = empleados_df['total_proyectos']
+    disponibilidad = empleados_df['disponibilidad']
     
     # Factor de tareas
-    if empleado_data["total_tareas"] > 15:
-        nivel_carga += 5
-    elif empleado_data["total_tareas"] > 10:
-        nivel_carga += 4
-    elif empleado_data["total_tareas"] > 7:
-        nivel_carga += 3
-    elif empleado_data["total_tareas"] > 4:
-        nivel_carga += 2
-    elif empleado_data["total_tareas"] > 1:
-        nivel_carga += 1
+    factor_tareas = np.select(
+        [total_tareas > 15, total_tareas > 10, total_tareas > 7, total_tareas > 4, total_tareas > 1],
+        [5, 4, 3, 2, 1],
+        default=0
+    )
     
     # Factor de proyectos
-    if empleado_data["total_proyectos"] > 5:
-        nivel_carga += 5
-    elif empleado_data["total_proyectos"] > 3:
-        nivel_carga += 3
-    elif empleado_data["total_proyectos"] > 1:
-        nivel_carga += 1
+    factor_proyectos = np.select(
+        [total_proyectos > 5, total_proyectos > 3, total_proyectos > 1],
+        [5, 3, 1],
+        default=0
+    )
     
     # Factor de disponibilidad
-    if empleado_data["disponibilidad"] == "no_disponible":
-        nivel_carga += 5
-    elif empleado_data["disponibilidad"] == "parcial":
-        nivel_carga += 3
-    elif empleado_data["disponibilidad"] == "asignado":
-        nivel_carga += 2
+    factor_disponibilidad = np.select(
+        [disponibilidad == "no_disponible", disponibilidad == "parcial", disponibilidad == "asignado"],
+        [5, 3, 2],
+        default=0
+    )
     
     # Normalizar a escala 0-10
-    nivel_carga = min(nivel_carga, 10)
+    nivel_carga = np.minimum(factor_tareas + factor_proyectos + factor_disponibilidad, 10)
     
     # Determinar categoría de carga
-    if nivel_carga >= 8:
-        return {"nivel": nivel_carga, "categoria": "Alta"}
-    elif nivel_carga >= 5:
-        return {"nivel": nivel_carga, "categoria": "Media"}
-    else:
-        return {"nivel": nivel_carga, "categoria": "Baja"}
+    categoria = np.select([nivel_carga >= 8, nivel_carga >= 5], ["Alta", "Media"], default="Baja")
+    
+    return pd.DataFrame({"nivel": nivel_carga, "categoria": categoria}, index=empleados_df.index)
 
 def _calcular_tendencias(metricas_mensuales):
     """Calcula tendencias a partir de las métricas históricas"""
@@ -903,7 +1606,7 @@ def _calcular_tendencias(metricas_mensuales):
         }
     
     # Extraer series temporales
-    meses = [m["mes"] for m in metricas_mensuales]
+    meses = [m.get("periodo", m.get("mes")) for m in metricas_mensuales]
     proyectos_por_mes = [m["proyectos_iniciados"] for m in metricas_mensuales]
     presupuesto_por_mes = [m["presupuesto_total"] for m in metricas_mensuales]
     eficiencia_por_mes = [m.get("eficiencia_presupuestaria", 0) for m in metricas_mensuales]
@@ -970,8 +1673,9 @@ def get_equipos():
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        # Obtener datos de equipos
-        equipos_df = pd.read_sql("""
+        datos = ejecutor_consultas.leer(engine, {
+            # Obtener datos de equipos
+            "equipos": """
             SELECT 
                 e.id, e.nombre, e.descripcion, e.responsable_id,
                 COUNT(DISTINCT ee.empleado_id) as num_miembros
@@ -981,10 +1685,9 @@ def get_equipos():
                 creativeminds_equipo_empleado_rel ee ON e.id = ee.equipo_id
             GROUP BY 
                 e.id, e.nombre, e.descripcion, e.responsable_id
-        """, engine)
-        
-        # Obtener datos de miembros por equipo
-        miembros_df = pd.read_sql("""
+            """,
+            # Obtener datos de miembros por equipo
+            "miembros": """
             SELECT 
                 ee.equipo_id, 
                 e.empleado_id, 
@@ -996,10 +1699,9 @@ def get_equipos():
                 creativeminds_equipo_empleado_rel ee
             JOIN 
                 creativeminds_empleado e ON ee.empleado_id = e.id
-        """, engine)
-        
-        # Obtener datos de proyectos por equipo
-        proyectos_equipo_df = pd.read_sql("""
+            """,
+            # Obtener datos de proyectos por equipo
+            "proyectos": """
             SELECT 
                 ee.equipo_id,
                 COUNT(DISTINCT pe.proyecto_id) as total_proyectos,
@@ -1014,7 +1716,11 @@ def get_equipos():
                 creativeminds_proyecto p ON pe.proyecto_id = p.id
             GROUP BY 
                 ee.equipo_id
-        """, engine)
+            """
+        })
+        equipos_df = datos["equipos"]
+        miembros_df = datos["miembros"]
+        proyectos_equipo_df = datos["proyectos"]
         
         # Combinar datos
         equipos_completos = []
@@ -1053,30 +1759,30 @@ def get_recursos():
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        recursos_df = pd.read_sql("""
-            SELECT 
-                r.*, 
-                p.nombre as nombre_proyecto
-            FROM 
-                creativeminds_recurso r
-            LEFT JOIN 
-                creativeminds_proyecto p ON r.proyecto_id = p.id
-        """, engine)
+        try:
+            paginacion = _leer_paginacion()
+        except ValueError:
+            return jsonify({"error": "Parámetros de paginación no válidos (limit y after deben ser enteros)"}), 400
+        filtro, orden, parametros = _clausulas_paginacion(paginacion, 'r.id')
+        
+        consulta = _consulta_recursos(filtro, orden)
+        if _formato_ndjson():
+            return _respuesta_ndjson(engine, consulta, parametros, _completar_recursos, paginacion)
+        
+        recursos_df = pd.read_sql(consulta, engine, params=parametros)
+        recursos_df, siguiente_cursor = _recortar_pagina(recursos_df, paginacion)
         
         # Calcular métricas adicionales
-        recursos_df['eficiencia_costo'] = recursos_df.apply(
-            lambda r: (r['horas_asignadas'] * r['costo_por_hora']) / r['costo_total'] 
-            if r['costo_total'] > 0 else 0, 
-            axis=1
-        )
+        recursos_metricas = _completar_recursos(recursos_df)
         
-        return jsonify({"recursos": recursos_df.to_dict(orient='records')})
+        return _respuesta_paginada("recursos", recursos_metricas, paginacion, siguiente_cursor)
         
     except Exception as e:
         logger.error(f"Error al obtener datos de recursos: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @api_bp.route('/predicciones', methods=['GET'])
+@cache_respuestas.cacheada(['creativeminds_proyecto'])
 def get_predicciones():
     """Genera predicciones para la planificación futura"""
     try:
@@ -1142,6 +1848,14 @@ def get_predicciones():
             }
         }
         
+        # Serie diaria de proyectos activos para gráficas (opcional)
+        if request.args.get('serie', '').lower() in ('1', 'true', 'si'):
+            fechas, activos = _serie_proyectos_activos(proyectos_df)
+            predicciones["capacidad_optima"]["serie_proyectos_activos"] = [
+                {"fecha": fecha.strftime('%Y-%m-%d'), "activos": int(n)}
+                for fecha, n in zip(fechas, activos)
+            ] if fechas is not None else []
+        
         return jsonify({"predicciones": predicciones})
         
     except Exception as e:
@@ -1250,41 +1964,51 @@ def _calcular_rendimiento_equipo(equipo_data, miembros):
         "factores": factores
     }
 
+def _serie_proyectos_activos(proyectos_df):
+    """Calcula cuántos proyectos había activos cada día del histórico.
+    
+    Barrido por eventos: +1 el día de inicio y -1 el día siguiente al fin de cada
+    proyecto; la suma acumulada de los eventos da el número de activos por día.
+    Devuelve (fechas, activos) o (None, None) si no hay fechas válidas.
+    """
+    fecha_inicio = pd.to_datetime(proyectos_df['fecha_inicio'], errors='coerce')
+    fecha_fin = pd.to_datetime(proyectos_df['fecha_fin'], errors='coerce')
+    
+    fecha_min = fecha_inicio.min()
+    fecha_max = fecha_fin.max()
+    if pd.isna(fecha_min) or pd.isna(fecha_max) or fecha_min > fecha_max:
+        return None, None
+    
+    num_dias = (fecha_max - fecha_min).days + 1
+    
+    # Solo cuentan los proyectos con ambas fechas y un intervalo no vacío
+    validos = fecha_inicio.notna() & fecha_fin.notna() & (fecha_inicio <= fecha_fin)
+    inicios = (fecha_inicio[validos] - fecha_min).dt.days.to_numpy()
+    fines = (fecha_fin[validos] - fecha_min).dt.days.to_numpy() + 1
+    
+    eventos = np.bincount(inicios, minlength=num_dias + 1) - np.bincount(fines, minlength=num_dias + 1)
+    activos = np.cumsum(eventos)[:num_dias]
+    fechas = pd.date_range(start=fecha_min, periods=num_dias)
+    
+    return fechas, activos
+
 def _estimar_capacidad_optima(proyectos_df):
     """Estima la capacidad óptima de proyectos simultáneos basada en datos históricos"""
     try:
-        # Convertir fechas a datetime
-        proyectos_df['fecha_inicio'] = pd.to_datetime(proyectos_df['fecha_inicio'])
-        proyectos_df['fecha_fin'] = pd.to_datetime(proyectos_df['fecha_fin'])
-        
-        # Crear un rango de fechas para análisis
         if len(proyectos_df) > 0:
-            fecha_min = proyectos_df['fecha_inicio'].min()
-            fecha_max = proyectos_df['fecha_fin'].max()
+            fechas, proyectos_por_dia = _serie_proyectos_activos(proyectos_df)
             
-            if pd.notna(fecha_min) and pd.notna(fecha_max):
-                # Crear serie temporal de proyectos activos por día
-                dias = pd.date_range(start=fecha_min, end=fecha_max)
-                proyectos_por_dia = []
+            if proyectos_por_dia is not None and len(proyectos_por_dia) > 0:
+                # Calcular estadísticas
+                max_proyectos = int(proyectos_por_dia.max())
+                promedio_proyectos = float(proyectos_por_dia.sum() / len(proyectos_por_dia))
+                percentil_75 = np.percentile(proyectos_por_dia, 75)
                 
-                for dia in dias:
-                    # Contar proyectos activos en este día
-                    activos = sum(1 for _, p in proyectos_df.iterrows() 
-                               if pd.notna(p['fecha_inicio']) and pd.notna(p['fecha_fin']) 
-                               and p['fecha_inicio'] <= dia <= p['fecha_fin'])
-                    proyectos_por_dia.append(activos)
-                
-                if proyectos_por_dia:
-                    # Calcular estadísticas
-                    max_proyectos = max(proyectos_por_dia)
-                    promedio_proyectos = sum(proyectos_por_dia) / len(proyectos_por_dia)
-                    percentil_75 = np.percentile(proyectos_por_dia, 75)
-                    
-                    return {
-                        "maximo_historico": max_proyectos,
-                        "promedio_historico": round(promedio_proyectos, 1),
-                        "recomendado": max(round(percentil_75, 0), 1)  # Al menos 1 proyecto
-                    }
+                return {
+                    "maximo_historico": max_proyectos,
+                    "promedio_historico": round(promedio_proyectos, 1),
+                    "recomendado": max(round(percentil_75, 0), 1)  # Al menos 1 proyecto
+                }
         
         # Si no hay datos suficientes
         return {
@@ -1343,48 +2067,10 @@ def get_recomendaciones_generales():
         if not engine:
             return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
         
-        # Obtener datos de proyectos
-        proyectos_df = pd.read_sql("""
-            SELECT 
-                proyecto_id, nombre, estado, fecha_inicio, fecha_fin, 
-                presupuesto_estimado, costo_total_recursos, porcentaje_progreso
-            FROM 
-                creativeminds_proyecto
-        """, engine)
+        # Datos compartidos de la cartera
+        instantanea = cargador_cartera.obtener(engine)
         
-        # Obtener tareas
-        tareas_df = pd.read_sql("""
-            SELECT 
-                t.id, t.nombre, t.estado, t.fecha_comienzo, t.fecha_final, 
-                t.proyecto_id, p.nombre as nombre_proyecto
-            FROM 
-                creativeminds_tarea t
-            JOIN 
-                creativeminds_proyecto p ON t.proyecto_id = p.id
-        """, engine)
-        
-        # Obtener empleados
-        empleados_df = pd.read_sql("""
-            SELECT 
-                e.empleado_id, e.nombre, e.disponibilidad, e.departamento, e.puesto
-            FROM 
-                creativeminds_empleado e
-        """, engine)
-        
-        # Análisis de fortalezas y debilidades
-        analisis = _analizar_fortalezas_debilidades(proyectos_df, tareas_df, empleados_df)
-        
-        # Generar recomendaciones
-        recomendaciones = _generar_recomendaciones(proyectos_df, tareas_df, empleados_df, analisis)
-        
-        # Identificar áreas de mejora críticas
-        areas_mejora = _identificar_areas_mejora(proyectos_df, tareas_df, empleados_df)
-        
-        return jsonify({
-            "analisis_foda": analisis,
-            "recomendaciones": recomendaciones,
-            "areas_mejora_prioritarias": areas_mejora
-        })
+        return jsonify(_datos_recomendaciones(instantanea))
         
     except Exception as e:
         logger.error(f"Error al generar recomendaciones: {str(e)}")
@@ -1507,6 +2193,70 @@ def _identificar_areas_mejora(proyectos_df, tareas_df, empleados_df):
     
     return areas_mejora
 
+def preparar_maestro():
+    """Prepara el proceso maestro antes del fork: los workers heredan el almacén de agregados ya cargado"""
+    # Las métricas de una ejecución anterior del servidor no se suman a las de esta
+    metricas_api.limpiar()
+    
+    if almacen_agregados is None:
+        return
+    
+    engine = get_odoo_connection()
+    if engine is None:
+        return
+    try:
+        almacen_agregados.sincronizar(engine)
+    except Exception as e:
+        logger.error(f"Error al cargar el almacén de agregados en el proceso maestro: {str(e)}")
+    finally:
+        # Las conexiones abiertas en el maestro no deben heredarse
+        engine.dispose()
+
+def preparar_worker():
+    """Prepara un proceso worker recién creado con fork: pools propios y conexiones ya abiertas"""
+    # Las conexiones y los hilos heredados del proceso padre no se pueden compartir
+    registro_motores.reiniciar_tras_fork()
+    ejecutor_consultas.reiniciar_tras_fork()
+    registro_consultas.reiniciar_tras_fork()
+    metricas_api.reiniciar_tras_fork()
+    
+    try:
+        abiertas = registro_motores.calentar('odoo')
+        logger.info(f"Worker {os.getpid()}: pool de conexiones precalentado ({abiertas} conexiones)")
+    except Exception as e:
+        logger.error(f"Error al precalentar el pool de conexiones: {str(e)}")
+
+def cerrar_worker():
+    """Antes de que un worker termine, vuelca sus últimas métricas al directorio compartido"""
+    try:
+        metricas_api.volcar()
+    except OSError as e:
+        logger.error(f"Error al volcar las métricas del worker {os.getpid()}: {str(e)}")
+
+def worker_terminado(pid):
+    """En el maestro, acumula los contadores de un worker que ha terminado"""
+    try:
+        metricas_api.proceso_terminado(pid)
+    except OSError as e:
+        logger.error(f"Error al acumular las métricas del worker {pid}: {str(e)}")
+
+# Aplicación única del proceso. Las rutas (api_bp), los servicios y sus hooks son
+# globales de este módulo y se crean al importarlo, así que todos los servidores
+# (desarrollo, gunicorn con "app:app" y asgi.py) sirven esta misma aplicación
+app = Flask(__name__)
+app.json = JSONProviderAnalitica(app)
+CORS(app)
+
+# Servicios compartidos por todo el proceso
+app.extensions['registro_motores'] = registro_motores
+app.extensions['ejecutor_consultas'] = ejecutor_consultas
+app.extensions['cache_respuestas'] = cache_respuestas
+app.extensions['vistas_rendimiento'] = vistas_rendimiento
+app.extensions['metricas_api'] = metricas_api
+app.extensions['registro_consultas'] = registro_consultas
+if almacen_agregados is not None:
+    app.extensions['almacen_agregados'] = almacen_agregados
+
 # Registrar los blueprints
 app.register_blueprint(api_bp)
 
@@ -1534,5 +2284,7 @@ if __name__ == '__main__':
     
     logger.info("Iniciando Creative Minds Analytics API...")
     
-    # Ejecutar en modo debug y permitir acceso desde cualquier host
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Servidor de desarrollo (un solo proceso); en producción usar servidor.py
+    # con varios workers. El modo debug solo se activa con FLASK_DEBUG=true
+    app.run(debug=os.getenv('FLASK_DEBUG', 'false').strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on'),
+            host='0.0.0.0', port=5000)
\ No newline at end of file
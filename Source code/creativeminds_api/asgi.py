@@ -0,0 +1,277 @@
+"""Modo asíncrono (ASGI) de la API de Creative Minds.
+
+Sirve las mismas rutas de api_bp con las mismas URLs y respuestas:
+
+- Los endpoints más pesados (dashboard, recomendaciones, métricas de
+  rendimiento y detalle de proyecto) se atienden de forma nativa: las
+  consultas se ejecutan con el driver asíncrono de psycopg 3, de modo que la
+  espera a Postgres no ocupa ningún hilo, y el cálculo con pandas se ejecuta
+  en un pool de hilos acotado para no bloquear el bucle de eventos.
+- El resto de rutas se delega en la aplicación Flask dentro de ese mismo
+  pool de hilos.
+
+Uso: uvicorn asgi:aplicacion --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextvars
+import functools
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import run_wsgi_app
+
+from app import (
+    app, logger, get_odoo_connection, cargador_cartera, almacen_agregados, registro_consultas, cache_respuestas,
+    CONSULTAS_CARTERA, TABLAS_CARTERA,
+    _datos_dashboard, _datos_recomendaciones, _consultas_rendimiento, _datos_rendimiento,
+    _consultas_detalle_proyecto, _detalle_proyecto, _leer_campos
+)
+from conexion_async import PoolAsync
+
+# Hilos para el cálculo con pandas y para las rutas servidas por Flask
+pool_hilos = ThreadPoolExecutor(max_workers=int(os.getenv('ASYNC_CPU_WORKERS', '4')), thread_name_prefix='asgi')
+pool_async = PoolAsync.desde_entorno()
+pool_async.registro_consultas = registro_consultas
+app.extensions['pool_async'] = pool_async
+
+
+async def en_hilo(funcion, *args):
+    """Ejecuta una función bloqueante en el pool de hilos conservando el contexto de la petición"""
+    contexto = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        pool_hilos, functools.partial(contexto.run, funcion, *args)
+    )
+
+
+async def _instantanea_cartera(engine):
+    """Instantánea de la cartera cargada sin bloquear el bucle de eventos"""
+    if almacen_agregados is not None:
+        # Los datos ya están en memoria; solo la primera carga consulta la base de datos
+        return await en_hilo(cargador_cartera.obtener, engine)
+
+    async def cargar():
+        datos = await pool_async.leer_varias(CONSULTAS_CARTERA)
+        return datos["proyectos"], datos["tareas"], datos["empleados"]
+
+    return await cargador_cartera.obtener_async(cargar)
+
+
+# Manejadores nativos (mismas respuestas que las vistas de app.py, con la misma caché de respuestas)
+
+@cache_respuestas.cacheada_async(TABLAS_CARTERA, en_hilo)
+async def get_dashboard():
+    """Obtiene un resumen general del estado de todos los proyectos"""
+    try:
+        engine = get_odoo_connection()
+        if not engine:
+            return {"error": "No se pudo conectar a la base de datos"}, 500
+
+        instantanea = await _instantanea_cartera(engine)
+        return await en_hilo(_datos_dashboard, instantanea, engine)
+
+    except Exception as e:
+        logger.error(f"Error en el dashboard: {str(e)}")
+        return {"error": str(e)}, 500
+
+
+async def get_recomendaciones_generales():
+    """Genera recomendaciones generales para mejorar la gestión de proyectos"""
+    try:
+        engine = get_odoo_connection()
+        if not engine:
+            return {"error": "No se pudo conectar a la base de datos"}, 500
+
+        instantanea = await _instantanea_cartera(engine)
+        return await en_hilo(_datos_recomendaciones, instantanea)
+
+    except Exception as e:
+        logger.error(f"Error al generar recomendaciones: {str(e)}")
+        return {"error": str(e)}, 500
+
+
+async def get_metricas_rendimiento():
+    """Obtiene métricas de rendimiento general por departamento y equipo"""
+    try:
+        engine = get_odoo_connection()
+        if not engine:
+            return {"error": "No se pudo conectar a la base de datos"}, 500
+
+        # La primera vez puede crear las vistas materializadas
+        consultas = await en_hilo(_consultas_rendimiento, engine)
+        datos = await pool_async.leer_varias(consultas)
+        return await en_hilo(_datos_rendimiento, datos["departamentos"], datos["equipos"])
+
+    except Exception as e:
+        logger.error(f"Error al obtener métricas de rendimiento: {str(e)}")
+        return {"error": str(e)}, 500
+
+
+async def get_proyecto_detalle(proyecto_id):
+    """Obtiene detalles completos de un proyecto específico con análisis profundo"""
+    try:
+        try:
+            campos = _leer_campos('proyecto')
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        datos = await pool_async.leer_varias(_consultas_detalle_proyecto(proyecto_id, campos))
+        proyecto_df = datos["proyecto"]
+
+        if proyecto_df.empty:
+            return {"error": "Proyecto no encontrado"}, 404
+
+        return await en_hilo(_detalle_proyecto, proyecto_df.iloc[0], datos["tareas"], datos["recursos"], datos["kpis"], campos)
+
+    except Exception as e:
+        logger.error(f"Error al obtener detalles del proyecto: {str(e)}")
+        return {"error": str(e)}, 500
+
+
+# Endpoint de Flask -> manejador asíncrono
+MANEJADORES_ASINCRONOS = {
+    'api.get_dashboard': get_dashboard,
+    'api.get_recomendaciones_generales': get_recomendaciones_generales,
+    'api.get_metricas_rendimiento': get_metricas_rendimiento,
+    'api.get_proyecto_detalle': get_proyecto_detalle,
+}
+
+
+def _environ_wsgi(scope, cuerpo):
+    """Construye el environ WSGI equivalente a una petición ASGI"""
+    servidor = scope.get('server') or ('localhost', 80)
+    cliente = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': cliente[0],
+        'REMOTE_PORT': str(cliente[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(cuerpo),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for nombre, valor in scope.get('headers', []):
+        nombre = nombre.decode('latin-1').upper().replace('-', '_')
+        valor = valor.decode('latin-1')
+        if nombre in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[nombre] = valor
+            continue
+        clave = f'HTTP_{nombre}'
+        environ[clave] = f"{environ[clave]},{valor}" if clave in environ else valor
+    return environ
+
+
+class AplicacionASGI:
+    """Aplicación ASGI que atiende las rutas de Flask de forma asíncrona"""
+
+    def __init__(self, app_flask, manejadores):
+        self.app = app_flask
+        self.manejadores = manejadores
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._ciclo_vida(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        cuerpo = await self._leer_cuerpo(receive)
+        environ = _environ_wsgi(scope, cuerpo)
+
+        try:
+            endpoint, argumentos = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            endpoint, argumentos = None, {}
+
+        manejador = self.manejadores.get(endpoint)
+        if manejador is None:
+            await self._servir_wsgi(environ, send)
+            return
+
+        with self.app.request_context(environ):
+            # before_request del blueprint (p. ej. la medición de tiempos) igual que en Flask
+            resultado = self.app.preprocess_request()
+            if resultado is None:
+                resultado = await manejador(**argumentos)
+            # make_response serializa con el mismo proveedor JSON y
+            # process_response aplica los after_request (CORS)
+            respuesta = self.app.process_response(self.app.make_response(resultado))
+
+        await send({
+            'type': 'http.response.start',
+            'status': respuesta.status_code,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in respuesta.headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': respuesta.get_data()})
+
+    async def _servir_wsgi(self, environ, send):
+        """Atiende la petición con la aplicación Flask en un hilo, transmitiendo la respuesta por bloques"""
+        bucle = asyncio.get_running_loop()
+
+        def enviar(mensaje):
+            asyncio.run_coroutine_threadsafe(send(mensaje), bucle).result()
+
+        def ejecutar():
+            # La respuesta se recorre entera en el mismo hilo (los generadores de Flask
+            # mantienen su contexto) y cada bloque se envía a través del bucle
+            app_iter, estado, cabeceras = run_wsgi_app(self.app.wsgi_app, environ, buffered=False)
+            try:
+                enviar({
+                    'type': 'http.response.start',
+                    'status': int(estado.split(' ', 1)[0]),
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in cabeceras.items()],
+                })
+                for bloque in app_iter:
+                    if bloque:
+                        enviar({'type': 'http.response.body', 'body': bloque, 'more_body': True})
+                enviar({'type': 'http.response.body', 'body': b''})
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+
+        await en_hilo(ejecutar)
+
+    @staticmethod
+    async def _leer_cuerpo(receive):
+        partes = []
+        while True:
+            mensaje = await receive()
+            partes.append(mensaje.get('body', b''))
+            if not mensaje.get('more_body'):
+                return b''.join(partes)
+
+    @staticmethod
+    async def _ciclo_vida(receive, send):
+        while True:
+            mensaje = await receive()
+            if mensaje['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensaje['type'] == 'lifespan.shutdown':
+                await pool_async.cerrar()
+                pool_hilos.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+aplicacion = AplicacionASGI(app, MANEJADORES_ASINCRONOS)
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("El modo asíncrono necesita un servidor ASGI: pip install uvicorn")
+
+    logger.info("Iniciando Creative Minds Analytics API (modo asíncrono)...")
+    uvicorn.run(aplicacion, host='0.0.0.0', port=5000)
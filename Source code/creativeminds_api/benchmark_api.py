@@ -0,0 +1,258 @@
+"""Benchmark de los endpoints de la API sobre datos sintéticos.
+
+Para cada nivel de tamaño genera la base de datos con datos_sinteticos.py y,
+en un proceso nuevo (para que la memoria y las cachés de un nivel no afecten
+al siguiente), recorre todas las rutas GET de api_bp con el cliente de
+pruebas de Flask. De cada ruta se informa la latencia de la primera petición
+y de las repeticiones (p50/p95), las filas leídas de la base de datos por
+segundo y la memoria residente (RSS) tras medirla y cuánto creció durante la
+ruta. El pico de RSS es del proceso y se informa una sola vez por nivel.
+
+    python benchmark_api.py --reemplazar --niveles 1k,10k --salida resultados.json
+    python benchmark_api.py --reemplazar --niveles 1k --comparar resultados.json
+
+Se mide una base de datos de pruebas (--dsn o BENCH_DB_*, ver
+datos_sinteticos.py), nunca la de la API: el proceso hijo recibe sus datos de
+conexión en las variables DB_*. Como generar un nivel sustituye las tablas,
+hay que pedirlo expresamente con --reemplazar (o medir los datos ya cargados
+con --sin-generar).
+
+Con --comparar se marcan como regresión las rutas cuya mediana empeora más
+de la tolerancia respecto a un resultado anterior (y el proceso sale con 1).
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from sqlalchemy import create_engine
+
+from datos_sinteticos import NIVELES, generar_base_datos, url_destino
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Variantes con parámetros que también se miden
+RUTAS_ADICIONALES = ['/api/proyectos?limit=100', '/api/proyectos?fields=id,nombre,estado']
+
+
+def _rss_pico_mb():
+    """Pico de memoria residente del proceso (ru_maxrss está en KB en Linux y en bytes en macOS)"""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024, 1)
+
+
+def _rss_actual_mb():
+    """Memoria residente actual del proceso (de /proc, solo en Linux; None si no está disponible)"""
+    try:
+        with open('/proc/self/statm') as archivo:
+            paginas = int(archivo.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    indice = min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[indice]
+
+
+def _rutas(aplicacion, engine):
+    """URLs a medir: todas las rutas GET de api_bp con valores de ejemplo para sus parámetros"""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        # Los proyectos con más tareas son el peor caso de los endpoints de detalle
+        ids = [fila[0] for fila in conn.execute(text(
+            "SELECT proyecto_id FROM creativeminds_tarea WHERE proyecto_id IS NOT NULL "
+            "GROUP BY proyecto_id ORDER BY COUNT(*) DESC LIMIT 20"
+        ))] or [1]
+    valores = {'proyecto_id': ids[0]}
+    parametros_consulta = {'/api/proyectos/detalle': {'ids': ','.join(str(i) for i in ids)}}
+
+    adaptador = aplicacion.url_map.bind('localhost')
+    rutas = []
+    for regla in sorted(aplicacion.url_map.iter_rules(), key=lambda r: r.rule):
+        if not regla.endpoint.startswith('api.') or 'GET' not in regla.methods:
+            continue
+        argumentos = {arg: valores[arg] for arg in regla.arguments}
+        argumentos.update(parametros_consulta.get(regla.rule, {}))
+        rutas.append((regla.rule, adaptador.build(regla.endpoint, argumentos)))
+    rutas.extend(('/api/proyectos', url) for url in RUTAS_ADICIONALES)
+    return rutas
+
+
+def medir_nivel(repeticiones):
+    """Mide todas las rutas en este proceso y devuelve los resultados (se ejecuta en el proceso hijo)"""
+    import app as modulo_app
+
+    cliente = modulo_app.app.test_client()
+    engine = modulo_app.get_odoo_connection()
+    resultados = {}
+    for regla, url in _rutas(modulo_app.app, engine):
+        antes = modulo_app.metricas_api.estadisticas().get(regla, {}).get("filas", 0)
+        rss_antes = _rss_actual_mb()
+        tiempos = []
+        estado = None
+        bytes_respuesta = 0
+        for _ in range(repeticiones + 1):
+            inicio = time.perf_counter()
+            respuesta = cliente.get(url)
+            cuerpo = respuesta.get_data()
+            tiempos.append(time.perf_counter() - inicio)
+            estado = respuesta.status_code
+            bytes_respuesta = len(cuerpo)
+        filas = modulo_app.metricas_api.estadisticas().get(regla, {}).get("filas", 0) - antes
+        rss_despues = _rss_actual_mb()
+
+        primera, repetidas = tiempos[0], tiempos[1:] or tiempos
+        resultados[url] = {
+            "estado": estado,
+            "primera_ms": round(primera * 1000, 2),
+            "p50_ms": round(_percentil(repetidas, 50) * 1000, 2),
+            "p95_ms": round(_percentil(repetidas, 95) * 1000, 2),
+            "filas": filas,
+            "filas_por_segundo": round(filas / sum(tiempos)) if sum(tiempos) else 0,
+            "bytes": bytes_respuesta,
+            "rss_mb": rss_despues,
+            "rss_delta_mb": round(rss_despues - rss_antes, 1) if rss_antes is not None and rss_despues is not None else None,
+        }
+    return {"rutas": resultados, "rss_pico_mb": _rss_pico_mb()}
+
+
+def _entorno_api(url):
+    """Variables DB_* con las que la API del proceso hijo se conecta a la base de datos de pruebas"""
+    return {
+        'DB_USER': url.username or '',
+        'DB_PASSWORD': url.password or '',
+        'DB_HOST': url.host or 'localhost',
+        'DB_PORT': str(url.port or 5432),
+        'DB_NAME': url.database,
+    }
+
+
+def ejecutar_nivel(nivel, repeticiones, semilla, url, generar=True, con_cache=False):
+    """Genera los datos de un nivel en la base de datos de pruebas y lo mide en un proceso nuevo"""
+    resultado = {"proyectos": NIVELES[nivel]}
+    if generar:
+        inicio = time.perf_counter()
+        engine = create_engine(url)
+        try:
+            resultado["filas_cargadas"] = generar_base_datos(
+                NIVELES[nivel], semilla=semilla, reemplazar=True, engine=engine
+            )
+        finally:
+            engine.dispose()
+        resultado["segundos_generacion"] = round(time.perf_counter() - inicio, 2)
+
+    entorno = dict(os.environ)
+    entorno.update(_entorno_api(url))
+    if not con_cache:
+        # Sin caché de respuestas las repeticiones miden el cálculo y no el acierto de caché
+        entorno['RESPONSE_CACHE_MAX_ENTRIES'] = '0'
+    proceso = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--medir', '--repeticiones', str(repeticiones)],
+        cwd=DIRECTORIO, env=entorno, stdout=subprocess.PIPE, text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"La medición del nivel {nivel} terminó con código {proceso.returncode}")
+    resultado.update(json.loads(proceso.stdout.strip().splitlines()[-1]))
+    return resultado
+
+
+def comparar(actual, base, tolerancia):
+    """Rutas cuya mediana empeora más de `tolerancia` (fracción) respecto al resultado base"""
+    regresiones = []
+    for nivel, datos in actual["niveles"].items():
+        rutas_base = base.get("niveles", {}).get(nivel, {}).get("rutas", {})
+        for url, medida in datos["rutas"].items():
+            anterior = rutas_base.get(url)
+            if not anterior or not anterior.get("p50_ms"):
+                continue
+            ratio = medida["p50_ms"] / anterior["p50_ms"]
+            medida["ratio_p50"] = round(ratio, 3)
+            if ratio > 1 + tolerancia:
+                regresiones.append((nivel, url, anterior["p50_ms"], medida["p50_ms"], ratio))
+    return regresiones
+
+
+def imprimir(resultados):
+    for nivel, datos in resultados["niveles"].items():
+        print(f"\nNivel {nivel} ({datos['proyectos']} proyectos) - pico RSS {datos['rss_pico_mb']} MB")
+        print(f"{'ruta':<48} {'estado':>6} {'primera ms':>11} {'p50 ms':>9} {'p95 ms':>9} {'filas/s':>10} {'ΔRSS MB':>8} {'vs base':>8}")
+        for url, m in datos["rutas"].items():
+            ratio = f"{m['ratio_p50']:.2f}x" if 'ratio_p50' in m else '-'
+            delta = f"{m['rss_delta_mb']:+.1f}" if m.get('rss_delta_mb') is not None else '-'
+            print(f"{url:<48} {m['estado']:>6} {m['primera_ms']:>11.1f} {m['p50_ms']:>9.1f} {m['p95_ms']:>9.1f} "
+                  f"{m['filas_por_segundo']:>10} {delta:>8} {ratio:>8}")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los endpoints de la API sobre datos sintéticos")
+    parser.add_argument('--niveles', default='1k', help=f"Niveles separados por comas ({', '.join(NIVELES)})")
+    parser.add_argument('--repeticiones', type=int, default=5, help="Peticiones por ruta tras la primera")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--dsn', help="URL de la base de datos de pruebas (por defecto, las variables BENCH_DB_*)")
+    parser.add_argument('--reemplazar', action='store_true', help="Permite sustituir las tablas de la base de datos de pruebas")
+    parser.add_argument('--sin-generar', action='store_true', help="Mide los datos que ya hay en la base de datos de pruebas")
+    parser.add_argument('--con-cache', action='store_true', help="Mantiene la caché de respuestas activa")
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--comparar', help="Resultado JSON anterior con el que comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Empeoramiento de p50 admitido (0.25 = 25%%)")
+    parser.add_argument('--medir', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argumentos)
+
+    load_dotenv()
+    if args.medir:
+        print(json.dumps(medir_nivel(args.repeticiones)))
+        return 0
+
+    niveles = [nivel.strip() for nivel in args.niveles.split(',') if nivel.strip()]
+    desconocidos = [nivel for nivel in niveles if nivel not in NIVELES]
+    if desconocidos:
+        parser.error(f"Niveles desconocidos: {', '.join(desconocidos)}")
+    if args.sin_generar and len(niveles) > 1:
+        parser.error("--sin-generar solo admite un nivel")
+    if not args.sin_generar and not args.reemplazar:
+        parser.error("Generar un nivel sustituye las tablas de la base de datos de pruebas: indica --reemplazar (o --sin-generar)")
+    try:
+        url = url_destino(args.dsn)
+    except Exception as e:
+        parser.error(str(e))
+
+    resultados = {"fecha": datetime.now().isoformat(timespec='seconds'), "repeticiones": args.repeticiones, "niveles": {}}
+    for nivel in niveles:
+        logger.info(f"Midiendo el nivel {nivel}...")
+        resultados["niveles"][nivel] = ejecutar_nivel(
+            nivel, args.repeticiones, args.semilla, url, generar=not args.sin_generar, con_cache=args.con_cache
+        )
+
+    regresiones = []
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            regresiones = comparar(resultados, json.load(archivo), args.tolerancia)
+
+    imprimir(resultados)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+
+    for nivel, url, anterior, actual, ratio in regresiones:
+        print(f"REGRESIÓN [{nivel}] {url}: p50 {anterior:.1f} ms -> {actual:.1f} ms ({ratio:.2f}x)")
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""Micro-benchmark de las funciones de cálculo de app.py, sin base de datos.
+
+Cada función (_calcular_*, _analizar_*, _generar_*, _identificar_areas_mejora
+y compañía) recibe DataFrames de tamaño creciente con la misma forma que
+devuelven las consultas de la API, generados con datos_sinteticos.py. De cada
+llamada se mide el tiempo (mediana y mínimo de varias repeticiones) y la
+memoria reservada (pico y retenida, con tracemalloc).
+
+    python benchmark_funciones.py --guardar-base        # guarda la línea base
+    python benchmark_funciones.py                       # compara con la línea base
+
+La línea base depende de la máquina: se guarda en benchmark_funciones_base.json
+(o en --base) y la comparación falla (código de salida 1) si alguna función
+empeora en tiempo o memoria más de la tolerancia indicada.
+"""
+import argparse
+import functools
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from datos_sinteticos import GeneradorDatosSinteticos
+
+logger = logging.getLogger(__name__)
+
+TAMANOS = (100, 1_000, 10_000)
+BASE_POR_DEFECTO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_funciones_base.json')
+
+# Diferencias por debajo de estos mínimos se consideran ruido de medida
+MINIMO_TIEMPO_MS = 0.05
+MINIMO_MEMORIA_KB = 16
+
+
+def _como_fechas(serie):
+    """Columna de fechas como la devuelve read_sql (objetos date y None)"""
+    return pd.Series([valor.date() if pd.notna(valor) else None for valor in serie], index=serie.index, dtype=object)
+
+
+def crear_fixture(proyectos, semilla=42):
+    """Datos de entrada de todas las funciones para una cartera de `proyectos` proyectos"""
+    datos = GeneradorDatosSinteticos(proyectos, semilla=semilla).generar()
+    proyectos_df = datos['creativeminds_proyecto']
+    tareas_df = datos['creativeminds_tarea']
+    empleados_df = datos['creativeminds_empleado']
+    for columna in ('fecha_inicio', 'fecha_fin'):
+        proyectos_df[columna] = _como_fechas(proyectos_df[columna])
+    for columna in ('fecha_comienzo', 'fecha_final'):
+        tareas_df[columna] = _como_fechas(tareas_df[columna])
+    tareas_df['nombre_proyecto'] = tareas_df['proyecto_id'].map(proyectos_df.set_index('id')['nombre'])
+
+    # Empleados con los totales de /empleados (entrada de _calcular_carga_trabajo)
+    relacion = datos['creativeminds_proyecto_empleado_rel']
+    por_responsable = tareas_df.groupby('responsable_id')['estado']
+    empleados_totales = empleados_df.assign(
+        total_proyectos=empleados_df['id'].map(relacion.groupby('empleado_id').size()).fillna(0).astype(int),
+        total_tareas=empleados_df['id'].map(por_responsable.size()).fillna(0).astype(int),
+        tareas_completadas=empleados_df['id'].map(por_responsable.apply(lambda e: (e == 'completada').sum())).fillna(0).astype(int),
+    )
+
+    # Métricas mensuales de /metricas/historicas (entrada de _calcular_tendencias)
+    inicio = pd.to_datetime(proyectos_df['fecha_inicio'])
+    mensual = proyectos_df.assign(periodo=inicio.dt.strftime('%Y-%m')).dropna(subset=['periodo']).groupby('periodo').agg(
+        proyectos_iniciados=('id', 'size'),
+        presupuesto_total=('presupuesto_estimado', 'sum'),
+        costo_total=('costo_total_recursos', 'sum'),
+    ).reset_index()
+    mensual['eficiencia_presupuestaria'] = ((1 - mensual['costo_total'] / mensual['presupuesto_total']) * 100).where(
+        mensual['presupuesto_total'] > 0, 0
+    )
+
+    # El proyecto con más tareas para las funciones de detalle de proyecto
+    proyecto_id = int(tareas_df['proyecto_id'].value_counts().idxmax()) if not tareas_df.empty else 1
+    miembros = empleados_df.head(min(len(empleados_df), max(5, proyectos // 100)))
+
+    return {
+        "proyectos": proyectos_df[['id', 'proyecto_id', 'nombre', 'estado', 'fecha_inicio', 'fecha_fin',
+                                   'presupuesto_estimado', 'costo_total_recursos', 'porcentaje_progreso']],
+        "tareas": tareas_df[['id', 'nombre', 'estado', 'fecha_comienzo', 'fecha_final', 'proyecto_id', 'nombre_proyecto']],
+        "empleados": empleados_df[['empleado_id', 'nombre', 'disponibilidad', 'departamento', 'puesto']],
+        # Filas de /proyectos/analisis (todas las tareas, recursos y KPIs de la cartera)
+        "proyectos_analisis": proyectos_df[['id', 'nombre', 'estado', 'fecha_inicio', 'fecha_fin',
+                                            'presupuesto_estimado', 'costo_total_recursos', 'porcentaje_progreso']],
+        "tareas_analisis": tareas_df[['proyecto_id', 'estado', 'fecha_comienzo', 'fecha_final', 'responsable_id']],
+        "recursos": datos['creativeminds_recurso'][['proyecto_id']],
+        "kpis": datos['creativeminds_kpi'][['proyecto_id']],
+        "empleados_totales": empleados_totales,
+        "metricas_mensuales": mensual.to_dict(orient='records'),
+        "proyecto": proyectos_df.set_index('id', drop=False).loc[proyecto_id],
+        "tareas_proyecto": tareas_df[tareas_df['proyecto_id'] == proyecto_id].reset_index(drop=True),
+        "recursos_proyecto": datos['creativeminds_recurso'].query('proyecto_id == @proyecto_id').reset_index(drop=True),
+        "kpis_proyecto": datos['creativeminds_kpi'].query('proyecto_id == @proyecto_id').reset_index(drop=True),
+        "equipo": {"total_proyectos": 4, "progreso_promedio": float(proyectos_df['porcentaje_progreso'].mean())},
+        "miembros": miembros.to_dict(orient='records'),
+    }
+
+
+def casos(app, fixture):
+    """Llamadas sin argumentos `{función: callable}` sobre un fixture"""
+    p, t, e = fixture["proyectos"], fixture["tareas"], fixture["empleados"]
+    evaluacion = app._evaluar_reglas_cartera(p, t, e)
+
+    # Las funciones del grafo de proyecto reciben los valores intermedios ya calculados
+    contexto = app._evaluar_proyecto(
+        fixture["proyecto"], fixture["tareas_proyecto"], fixture["recursos_proyecto"], fixture["kpis_proyecto"]
+    )
+
+    def nodo(funcion, nombre):
+        argumentos = {dependencia: contexto[dependencia] for dependencia in app.grafo_proyecto.dependencias(nombre)}
+        return functools.partial(funcion, **argumentos)
+
+    return {
+        "_marcar_proyectos_retrasados": functools.partial(app._marcar_proyectos_retrasados, p, t),
+        "_calcular_proyectos_retrasados": functools.partial(app._calcular_proyectos_retrasados, p, t),
+        "_calcular_eficiencia_presupuestaria": functools.partial(app._calcular_eficiencia_presupuestaria, p),
+        "_evaluar_reglas_cartera": functools.partial(app._evaluar_reglas_cartera, p, t, e),
+        "_analizar_fortalezas_debilidades": functools.partial(app._analizar_fortalezas_debilidades, p, t, e),
+        "_generar_recomendaciones": functools.partial(app._generar_recomendaciones, evaluacion),
+        "_identificar_areas_mejora": functools.partial(app._identificar_areas_mejora, p, t, e),
+        "_calcular_carga_trabajo": functools.partial(app._calcular_carga_trabajo, fixture["empleados_totales"]),
+        "_calcular_tendencias": functools.partial(app._calcular_tendencias, fixture["metricas_mensuales"]),
+        "_calcular_rendimiento_equipo": functools.partial(app._calcular_rendimiento_equipo, fixture["equipo"], fixture["miembros"]),
+        "_calcular_metricas_proyecto": nodo(app._calcular_metricas_proyecto, 'metricas'),
+        "_indicadores_proyecto": nodo(app._indicadores_proyecto, 'indicadores'),
+        "_reglas_proyecto": nodo(app._reglas_proyecto, 'reglas'),
+        "_analizar_proyecto": nodo(app._analizar_proyecto, 'analisis'),
+        "_generar_recomendaciones_proyecto": nodo(app._generar_recomendaciones_proyecto, 'recomendaciones'),
+        "_analisis_proyectos": functools.partial(
+            app._analisis_proyectos, fixture["proyectos_analisis"], fixture["tareas_analisis"], fixture["recursos"], fixture["kpis"]
+        ),
+    }
+
+
+def medir(funcion, repeticiones=20, tiempo_minimo=0.2, tiempo_maximo=5.0, max_llamadas=1000):
+    """Tiempo (mediana y mínimo) y memoria reservada de una llamada.
+
+    Se hacen al menos `repeticiones` llamadas y `tiempo_minimo` segundos de
+    medida, salvo que la función sea tan lenta que se supere `tiempo_maximo`
+    (entonces bastan tres llamadas).
+    """
+    funcion()  # calentamiento (importaciones perezosas, cachés de pandas)
+
+    tiempos = []
+    inicio = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+        transcurrido = time.perf_counter() - inicio
+        if len(tiempos) >= max_llamadas:
+            break
+        if len(tiempos) >= repeticiones and transcurrido >= tiempo_minimo:
+            break
+        if len(tiempos) >= 3 and transcurrido >= tiempo_maximo:
+            break
+
+    # La memoria se mide en una llamada aparte: tracemalloc ralentiza la ejecución
+    gc.collect()
+    tracemalloc.start()
+    try:
+        antes, _ = tracemalloc.get_traced_memory()
+        resultado = funcion()
+        despues, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del resultado
+
+    return {
+        "llamadas": len(tiempos),
+        "mediana_ms": round(float(np.median(tiempos)) * 1000, 4),
+        "minimo_ms": round(min(tiempos) * 1000, 4),
+        "memoria_pico_kb": round((pico - antes) / 1024, 1),
+        "memoria_retenida_kb": round((despues - antes) / 1024, 1),
+    }
+
+
+def ejecutar(tamanos=TAMANOS, repeticiones=20, filtro=None, semilla=42):
+    """Mide todas las funciones para cada tamaño; devuelve `{"función@tamaño": medida}`"""
+    import app
+
+    resultados = {}
+    for tamano in tamanos:
+        fixture = crear_fixture(tamano, semilla=semilla)
+        for nombre, funcion in casos(app, fixture).items():
+            if filtro and filtro not in nombre:
+                continue
+            resultados[f"{nombre}@{tamano}"] = medir(funcion, repeticiones)
+    return resultados
+
+
+def comparar(actual, base, tolerancia, tolerancia_memoria):
+    """Regresiones de tiempo o memoria respecto a la línea base: [(clave, métrica, antes, después)]"""
+    regresiones = []
+    for clave, medida in actual.items():
+        anterior = base.get(clave)
+        if anterior is None:
+            continue
+        if (medida["mediana_ms"] > anterior["mediana_ms"] * (1 + tolerancia)
+                and medida["mediana_ms"] - anterior["mediana_ms"] > MINIMO_TIEMPO_MS):
+            regresiones.append((clave, "mediana_ms", anterior["mediana_ms"], medida["mediana_ms"]))
+        if (medida["memoria_pico_kb"] > anterior["memoria_pico_kb"] * (1 + tolerancia_memoria)
+                and medida["memoria_pico_kb"] - anterior["memoria_pico_kb"] > MINIMO_MEMORIA_KB):
+            regresiones.append((clave, "memoria_pico_kb", anterior["memoria_pico_kb"], medida["memoria_pico_kb"]))
+    return regresiones
+
+
+def imprimir(resultados, base):
+    print(f"{'función@tamaño':<48} {'mediana ms':>11} {'mínimo ms':>10} {'pico KB':>10} {'retenida KB':>12} {'vs base':>8}")
+    for clave, m in resultados.items():
+        anterior = base.get(clave)
+        ratio = f"{m['mediana_ms'] / anterior['mediana_ms']:.2f}x" if anterior and anterior["mediana_ms"] else '-'
+        print(f"{clave:<48} {m['mediana_ms']:>11.3f} {m['minimo_ms']:>10.3f} {m['memoria_pico_kb']:>10.1f} "
+              f"{m['memoria_retenida_kb']:>12.1f} {ratio:>8}")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark de las funciones de cálculo de la API")
+    parser.add_argument('--tamanos', default=','.join(str(t) for t in TAMANOS), help="Número de proyectos de cada fixture")
+    parser.add_argument('--repeticiones', type=int, default=20, help="Llamadas mínimas por función")
+    parser.add_argument('--funciones', help="Mide solo las funciones cuyo nombre contiene este texto")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--base', default=BASE_POR_DEFECTO, help="Archivo JSON de la línea base")
+    parser.add_argument('--guardar-base', action='store_true', help="Guarda los resultados como nueva línea base")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Empeoramiento de tiempo admitido (0.2 = 20%%)")
+    parser.add_argument('--tolerancia-memoria', type=float, default=0.2, help="Empeoramiento de memoria admitido")
+    args = parser.parse_args(argumentos)
+
+    try:
+        tamanos = [int(t) for t in args.tamanos.split(',') if t.strip()]
+    except ValueError:
+        parser.error("--tamanos debe ser una lista de enteros separados por comas")
+
+    resultados = ejecutar(tamanos, args.repeticiones, args.funciones, args.semilla)
+
+    base = {}
+    if not args.guardar_base and os.path.exists(args.base):
+        with open(args.base, encoding='utf-8') as archivo:
+            base = json.load(archivo)["resultados"]
+    imprimir(resultados, base)
+
+    if args.guardar_base:
+        with open(args.base, 'w', encoding='utf-8') as archivo:
+            json.dump({"fecha": datetime.now().isoformat(timespec='seconds'), "resultados": resultados},
+                      archivo, indent=2, ensure_ascii=False)
+        print(f"\nLínea base guardada en {args.base}")
+        return 0
+    if not base:
+        print(f"\nNo hay línea base en {args.base}; usa --guardar-base para crearla")
+        return 0
+
+    regresiones = comparar(resultados, base, args.tolerancia, args.tolerancia_memoria)
+    for clave, metrica, anterior, actual in regresiones:
+        print(f"REGRESIÓN {clave} {metrica}: {anterior} -> {actual}")
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, current_app, request
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Tablas de Odoo cuya huella se vigila (las tablas _rel no tienen write_date)
+TABLAS_CON_FECHA = [
+    'creativeminds_proyecto',
+    'creativeminds_tarea',
+    'creativeminds_recurso',
+    'creativeminds_kpi',
+    'creativeminds_empleado',
+    'creativeminds_equipo',
+]
+TABLAS_RELACION = [
+    'creativeminds_proyecto_empleado_rel',
+    'creativeminds_equipo_empleado_rel',
+]
+
+
+def calcular_huella(engine, tablas_con_fecha=None, tablas_relacion=None):
+    """Obtiene en una sola consulta el número de filas y el último write_date de cada tabla"""
+    tablas_con_fecha = TABLAS_CON_FECHA if tablas_con_fecha is None else tablas_con_fecha
+    tablas_relacion = TABLAS_RELACION if tablas_relacion is None else tablas_relacion
+
+    partes = [
+        f"SELECT '{tabla}' AS tabla, COUNT(*) AS filas, MAX(write_date)::text AS ultima_escritura FROM {tabla}"
+        for tabla in tablas_con_fecha
+    ]
+    partes += [
+        f"SELECT '{tabla}' AS tabla, COUNT(*) AS filas, NULL AS ultima_escritura FROM {tabla}"
+        for tabla in tablas_relacion
+    ]
+
+    with engine.connect() as conn:
+        filas = conn.execute(text(" UNION ALL ".join(partes))).fetchall()
+
+    return {tabla: (filas_tabla, ultima_escritura) for tabla, filas_tabla, ultima_escritura in filas}
+
+
+class CacheRespuestas:
+    """Caché LRU/TTL de respuestas JSON invalidada por la huella de los datos.
+
+    La clave de cada entrada incluye la ruta, los parámetros de la petición y la
+    huella (filas y último write_date) de las tablas de las que depende el
+    endpoint, así que una entrada deja de usarse en cuanto cambian esos datos.
+    """
+
+    def __init__(self, obtener_engine, max_entradas=256, ttl_segundos=300, intervalo_huella=1.0):
+        self._obtener_engine = obtener_engine
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.intervalo_huella = intervalo_huella
+
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._huella = None
+        self._huella_calculada = 0.0
+        self._lock_huella = threading.Lock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.expiraciones = 0
+
+    def huella_actual(self):
+        """Devuelve la huella de las tablas, recalculándola como mucho una vez por intervalo"""
+        with self._lock_huella:
+            if self._huella is None or time.monotonic() - self._huella_calculada >= self.intervalo_huella:
+                engine = self._obtener_engine()
+                if engine is None:
+                    return None
+                self._huella = calcular_huella(engine)
+                self._huella_calculada = time.monotonic()
+            return self._huella
+
+    def _obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+
+            creada, respuesta = entrada
+            if time.monotonic() - creada > self.ttl_segundos:
+                del self._entradas[clave]
+                self.expiraciones += 1
+                self.fallos += 1
+                return None
+
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return respuesta
+
+    def _guardar(self, clave, respuesta):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic(), respuesta)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def limpiar(self):
+        """Elimina todas las entradas y fuerza el recálculo de la huella"""
+        with self._lock:
+            self._entradas.clear()
+        with self._lock_huella:
+            self._huella = None
+
+    def estadisticas(self):
+        """Contadores de aciertos, fallos y expulsiones de la caché"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0,
+                "expulsiones": self.expulsiones,
+                "expiraciones": self.expiraciones,
+            }
+
+    def cacheada(self, tablas):
+        """Decorador que sirve la respuesta desde la caché mientras no cambie la huella de `tablas`"""
+        def decorador(vista):
+            @functools.wraps(vista)
+            def envoltura(*args, **kwargs):
+                clave = self._clave(self._huella_o_none(), tablas)
+                if clave is None:
+                    return vista(*args, **kwargs)
+
+                guardada = self._respuesta_guardada(clave)
+                if guardada is not None:
+                    return guardada
+                return self._guardar_respuesta(clave, vista(*args, **kwargs))
+            return envoltura
+        return decorador
+
+    def cacheada_async(self, tablas, en_hilo):
+        """Como cacheada, para manejadores asíncronos (modo ASGI).
+
+        La huella se calcula con `en_hilo` para no bloquear el bucle de eventos
+        y el resultado del manejador se convierte en respuesta de Flask antes
+        de guardarlo, así que las entradas son las mismas que las de la vista
+        síncrona de la misma ruta.
+        """
+        def decorador(manejador):
+            @functools.wraps(manejador)
+            async def envoltura(*args, **kwargs):
+                clave = self._clave(await en_hilo(self._huella_o_none), tablas)
+                if clave is None:
+                    return await manejador(*args, **kwargs)
+
+                guardada = self._respuesta_guardada(clave)
+                if guardada is not None:
+                    return guardada
+                return self._guardar_respuesta(clave, current_app.make_response(await manejador(*args, **kwargs)))
+            return envoltura
+        return decorador
+
+    def _huella_o_none(self):
+        try:
+            return self.huella_actual()
+        except Exception as e:
+            logger.warning(f"No se pudo calcular la huella de datos, se omite la caché: {str(e)}")
+            return None
+
+    @staticmethod
+    def _clave(huella, tablas):
+        """Clave de la petición actual: ruta, parámetros y huella de las tablas (None si no hay huella)"""
+        if huella is None:
+            return None
+        return (
+            request.path,
+            tuple(sorted(request.args.items(multi=True))),
+            tuple((tabla, huella.get(tabla)) for tabla in tablas),
+        )
+
+    def _respuesta_guardada(self, clave):
+        guardada = self._obtener(clave)
+        if guardada is None:
+            return None
+        cuerpo, estado, tipo = guardada
+        respuesta = Response(cuerpo, status=estado, mimetype=tipo)
+        respuesta.headers['X-Cache'] = 'HIT'
+        return respuesta
+
+    def _guardar_respuesta(self, clave, respuesta):
+        """Guarda las respuestas 200 no transmitidas por bloques y devuelve la respuesta"""
+        respuesta_flask = respuesta if isinstance(respuesta, Response) else None
+        if respuesta_flask is not None and respuesta_flask.status_code == 200 and not respuesta_flask.is_streamed:
+            self._guardar(clave, (respuesta_flask.get_data(), 200, respuesta_flask.mimetype))
+            respuesta_flask.headers['X-Cache'] = 'MISS'
+        return respuesta
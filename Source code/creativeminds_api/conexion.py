@@ -0,0 +1,226 @@
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+
+logger = logging.getLogger(__name__)
+
+
+def _leer_entero(nombre, por_defecto):
+    """Lee una variable de entorno entera, usando el valor por defecto si no es válida"""
+    valor = os.getenv(nombre)
+    if valor is None or valor == '':
+        return por_defecto
+    try:
+        return int(valor)
+    except ValueError:
+        logger.warning(f"Valor no válido para {nombre}: {valor!r}, se usa {por_defecto}")
+        return por_defecto
+
+
+def _leer_booleano(nombre, por_defecto):
+    """Lee una variable de entorno booleana (1/0, true/false, si/no)"""
+    valor = os.getenv(nombre)
+    if valor is None or valor == '':
+        return por_defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+
+def configuracion_desde_entorno():
+    """Construye la configuración de conexión y del pool a partir del .env"""
+    db_user = os.getenv('DB_USER', 'admin')
+    db_password = os.getenv('DB_PASSWORD', 'admin')
+    db_host = os.getenv('DB_HOST', 'localhost')
+    db_port = os.getenv('DB_PORT', '5432')
+    db_name = os.getenv('DB_NAME', 'odoo')
+
+    return {
+        "url": f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}",
+        "pool_size": _leer_entero('DB_POOL_SIZE', 5),
+        "max_overflow": _leer_entero('DB_MAX_OVERFLOW', 10),
+        "pool_timeout": _leer_entero('DB_POOL_TIMEOUT', 30),
+        "pool_recycle": _leer_entero('DB_POOL_RECYCLE', 1800),
+        "pool_pre_ping": _leer_booleano('DB_POOL_PRE_PING', True),
+    }
+
+
+class EstadisticasPool:
+    """Contadores de uso y latencia de un pool de conexiones"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.conexiones_creadas = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidaciones = 0
+        self.en_uso = 0
+        self.max_en_uso = 0
+        self.tiempo_conexion_total = 0.0
+        self.tiempo_conexion_max = 0.0
+        self.tiempo_uso_total = 0.0
+        self.tiempo_uso_max = 0.0
+
+    def registrar_conexion(self, duracion):
+        with self._lock:
+            self.conexiones_creadas += 1
+            self.tiempo_conexion_total += duracion
+            self.tiempo_conexion_max = max(self.tiempo_conexion_max, duracion)
+
+    def registrar_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.en_uso += 1
+            self.max_en_uso = max(self.max_en_uso, self.en_uso)
+
+    def registrar_checkin(self, duracion):
+        with self._lock:
+            self.checkins += 1
+            self.en_uso = max(self.en_uso - 1, 0)
+            if duracion is not None:
+                self.tiempo_uso_total += duracion
+                self.tiempo_uso_max = max(self.tiempo_uso_max, duracion)
+
+    def registrar_invalidacion(self):
+        with self._lock:
+            self.invalidaciones += 1
+
+    def como_dict(self):
+        """Devuelve una copia consistente de los contadores (tiempos en milisegundos)"""
+        with self._lock:
+            return {
+                "conexiones_creadas": self.conexiones_creadas,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidaciones": self.invalidaciones,
+                "en_uso": self.en_uso,
+                "max_en_uso": self.max_en_uso,
+                "latencia_conexion_media_ms": round(self.tiempo_conexion_total / self.conexiones_creadas * 1000, 3) if self.conexiones_creadas else 0,
+                "latencia_conexion_max_ms": round(self.tiempo_conexion_max * 1000, 3),
+                "tiempo_uso_medio_ms": round(self.tiempo_uso_total / self.checkins * 1000, 3) if self.checkins else 0,
+                "tiempo_uso_max_ms": round(self.tiempo_uso_max * 1000, 3),
+            }
+
+
+class RegistroMotores:
+    """Registro de motores SQLAlchemy compartidos por todo el proceso.
+
+    Cada motor mantiene su propio pool de conexiones, de modo que las peticiones
+    reutilizan conexiones abiertas en lugar de crear un motor nuevo cada vez.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._motores = {}
+        self._configuraciones = {}
+        self._estadisticas = {}
+
+    def registrar(self, nombre, url, **opciones_pool):
+        """Crea y registra un motor con las opciones de pool indicadas"""
+        with self._lock:
+            anterior = self._motores.pop(nombre, None)
+            if anterior is not None:
+                anterior.dispose()
+
+            engine = create_engine(url, **opciones_pool)
+            estadisticas = EstadisticasPool()
+            self._instrumentar(engine, estadisticas)
+
+            self._motores[nombre] = engine
+            self._configuraciones[nombre] = dict(opciones_pool)
+            self._estadisticas[nombre] = estadisticas
+            logger.info(f"Motor '{nombre}' registrado (pool_size={opciones_pool.get('pool_size')}, "
+                        f"max_overflow={opciones_pool.get('max_overflow')})")
+            return engine
+
+    def registrar_desde_entorno(self, nombre='odoo'):
+        """Registra un motor usando las variables DB_* del entorno"""
+        configuracion = configuracion_desde_entorno()
+        url = configuracion.pop("url")
+        return self.registrar(nombre, url, **configuracion)
+
+    def obtener(self, nombre='odoo'):
+        """Devuelve el motor registrado con ese nombre o None si no existe"""
+        return self._motores.get(nombre)
+
+    def estadisticas(self, nombre=None):
+        """Devuelve las estadísticas de uno o de todos los pools registrados"""
+        nombres = [nombre] if nombre else list(self._motores)
+        resultado = {}
+        for n in nombres:
+            engine = self._motores.get(n)
+            if engine is None:
+                continue
+            pool = engine.pool
+            datos = self._estadisticas[n].como_dict()
+            datos.update({
+                "configuracion": self._configuraciones[n],
+                "tamano_pool": pool.size() if hasattr(pool, 'size') else None,
+                "conexiones_prestadas": pool.checkedout() if hasattr(pool, 'checkedout') else None,
+                "desbordamiento": pool.overflow() if hasattr(pool, 'overflow') else None,
+                "estado": pool.status(),
+            })
+            resultado[n] = datos
+        return resultado
+
+    def calentar(self, nombre='odoo', conexiones=None):
+        """Abre de antemano `conexiones` conexiones del pool (por defecto pool_size) y las deja disponibles"""
+        engine = self._motores.get(nombre)
+        if engine is None:
+            return 0
+        if conexiones is None:
+            conexiones = self._configuraciones[nombre].get('pool_size', 5)
+
+        prestadas = []
+        try:
+            for _ in range(conexiones):
+                conn = engine.connect()
+                prestadas.append(conn)
+                conn.exec_driver_sql("SELECT 1")
+        finally:
+            for conn in prestadas:
+                conn.close()
+        return len(prestadas)
+
+    def reiniciar_tras_fork(self):
+        """Descarta en un proceso hijo las conexiones heredadas del padre sin cerrarlas"""
+        for engine in list(self._motores.values()):
+            # close=False: las conexiones siguen siendo del proceso padre
+            engine.dispose(close=False)
+
+    def cerrar(self):
+        """Libera todos los pools registrados"""
+        with self._lock:
+            for engine in self._motores.values():
+                engine.dispose()
+            self._motores.clear()
+            self._configuraciones.clear()
+            self._estadisticas.clear()
+
+    @staticmethod
+    def _instrumentar(engine, estadisticas):
+        """Engancha los eventos del pool para medir conexiones y préstamos"""
+
+        @event.listens_for(engine, 'do_connect')
+        def _antes_de_conectar(dialect, conn_rec, cargs, cparams):
+            conn_rec.info['inicio_conexion'] = time.perf_counter()
+
+        @event.listens_for(engine, 'connect')
+        def _al_conectar(dbapi_connection, connection_record):
+            inicio = connection_record.info.pop('inicio_conexion', None)
+            estadisticas.registrar_conexion(time.perf_counter() - inicio if inicio else 0.0)
+
+        @event.listens_for(engine, 'checkout')
+        def _al_prestar(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info['inicio_prestamo'] = time.perf_counter()
+            estadisticas.registrar_checkout()
+
+        @event.listens_for(engine, 'checkin')
+        def _al_devolver(dbapi_connection, connection_record):
+            inicio = connection_record.info.pop('inicio_prestamo', None)
+            estadisticas.registrar_checkin(time.perf_counter() - inicio if inicio else None)
+
+        @event.listens_for(engine, 'invalidate')
+        def _al_invalidar(dbapi_connection, connection_record, exception):
+            estadisticas.registrar_invalidacion()
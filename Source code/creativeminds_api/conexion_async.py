@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql.psycopg import PGDialect_psycopg
+
+from conexion import configuracion_desde_entorno
+from metricas_peticiones import medicion_actual
+
+try:
+    import psycopg
+except ImportError:  # psycopg 3 solo es necesario para el modo asíncrono
+    psycopg = None
+
+logger = logging.getLogger(__name__)
+
+# Dialecto usado para traducir los parámetros :nombre de SQLAlchemy al formato %(nombre)s de psycopg
+_DIALECTO = PGDialect_psycopg()
+
+
+def _compilar(consulta, parametros):
+    """Convierte una consulta (texto o text()) y sus parámetros al formato de psycopg"""
+    clausula = text(consulta) if isinstance(consulta, str) else consulta
+    compilada = clausula.compile(dialect=_DIALECTO)
+    return str(compilada), compilada.construct_params(parametros or {})
+
+
+class PoolAsync:
+    """Pool de conexiones asíncronas de psycopg 3 para el modo ASGI.
+
+    Mientras una consulta espera a Postgres el bucle de eventos sigue
+    atendiendo otras peticiones; ningún hilo queda bloqueado en la E/S.
+    """
+
+    def __init__(self, conninfo, tamano=5, timeout=30):
+        if psycopg is None:
+            raise RuntimeError("El modo asíncrono necesita psycopg 3 (pip install 'psycopg[binary]')")
+        self.conninfo = conninfo
+        self.tamano = tamano
+        self.timeout = timeout
+        self._libres = None
+        self._creadas = 0
+        self._lock = None
+        # Registro opcional de consultas lentas (RegistroConsultasLentas)
+        self.registro_consultas = None
+
+        self.consultas = 0
+        self.tiempo_consultas = 0.0
+        self.esperas = 0
+
+    @classmethod
+    def desde_entorno(cls):
+        """Crea el pool con las variables DB_* del entorno (DB_POOL_SIZE y DB_POOL_TIMEOUT)"""
+        configuracion = configuracion_desde_entorno()
+        return cls(configuracion["url"], tamano=configuracion["pool_size"], timeout=configuracion["pool_timeout"])
+
+    def _inicializar(self):
+        # Las primitivas de asyncio se crean dentro del bucle que las usa
+        if self._libres is None:
+            self._libres = asyncio.LifoQueue()
+            self._lock = asyncio.Lock()
+
+    async def _prestar(self):
+        self._inicializar()
+        if self._libres.empty():
+            async with self._lock:
+                if self._creadas < self.tamano:
+                    self._creadas += 1
+                    try:
+                        return await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True)
+                    except Exception:
+                        self._creadas -= 1
+                        raise
+            self.esperas += 1
+        conexion = await asyncio.wait_for(self._libres.get(), timeout=self.timeout)
+        if conexion.closed:
+            self._creadas -= 1
+            return await self._prestar()
+        return conexion
+
+    def _devolver(self, conexion):
+        if conexion.closed or conexion.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+            self._creadas -= 1
+            asyncio.ensure_future(conexion.close())
+            return
+        self._libres.put_nowait(conexion)
+
+    async def leer(self, consulta, parametros=None):
+        """Ejecuta una consulta y devuelve el resultado como DataFrame"""
+        sql, valores = _compilar(consulta, parametros)
+        conexion = await self._prestar()
+        medicion = medicion_actual()
+        if medicion is not None:
+            medicion.consulta_iniciada()
+        inicio = time.perf_counter()
+        filas = None
+        try:
+            async with conexion.cursor() as cursor:
+                await cursor.execute(sql, valores)
+                columnas = [c.name for c in cursor.description] if cursor.description else []
+                filas = await cursor.fetchall()
+        except Exception:
+            await conexion.close()
+            raise
+        finally:
+            self._devolver(conexion)
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.tiempo_consultas += duracion
+            if self.registro_consultas is not None and filas is not None:
+                self.registro_consultas.registrar(None, sql, valores, duracion, len(filas))
+            if medicion is not None:
+                medicion.consulta_terminada(len(filas) if filas is not None else None)
+        return pd.DataFrame.from_records(filas, columns=columnas, coerce_float=True)
+
+    async def leer_varias(self, consultas):
+        """Ejecuta a la vez las consultas `{nombre: consulta}` o `{nombre: (consulta, parámetros)}`"""
+        nombres = list(consultas)
+        tareas = []
+        for nombre in nombres:
+            consulta = consultas[nombre]
+            consulta, parametros = consulta if isinstance(consulta, tuple) else (consulta, None)
+            tareas.append(self.leer(consulta, parametros))
+        return dict(zip(nombres, await asyncio.gather(*tareas)))
+
+    async def cerrar(self):
+        """Cierra las conexiones libres del pool"""
+        if self._libres is None:
+            return
+        while not self._libres.empty():
+            conexion = self._libres.get_nowait()
+            self._creadas -= 1
+            await conexion.close()
+
+    def estadisticas(self):
+        """Contadores de uso del pool asíncrono"""
+        return {
+            "tamano": self.tamano,
+            "conexiones_abiertas": self._creadas,
+            "conexiones_libres": self._libres.qsize() if self._libres is not None else 0,
+            "consultas": self.consultas,
+            "esperas": self.esperas,
+            "tiempo_medio_consulta_ms": round(self.tiempo_consultas / self.consultas * 1000, 3) if self.consultas else 0,
+        }
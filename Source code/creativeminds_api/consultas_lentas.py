@@ -0,0 +1,256 @@
+import functools
+import hashlib
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Opción de ejecución que marca las consultas del propio registro (EXPLAIN) para no medirlas
+OPCION_INTERNA = 'registro_consultas_interna'
+
+_LITERALES = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|\$\d+"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?+)"),
+    (re.compile(r"\s+"), " "),
+]
+
+# Solo se analizan sentencias de lectura: EXPLAIN ANALYZE ejecuta de verdad la sentencia
+_SOLO_LECTURA = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1024)
+def normalizar_sentencia(sentencia):
+    """Sustituye literales y parámetros por ? para agrupar las ejecuciones de una misma consulta"""
+    normalizada = sentencia
+    for patron, reemplazo in _LITERALES:
+        normalizada = patron.sub(reemplazo, normalizada)
+    return normalizada.strip()
+
+
+@functools.lru_cache(maxsize=1024)
+def huella_sentencia(sentencia):
+    """Identificador corto y estable de la sentencia normalizada"""
+    return hashlib.md5(normalizar_sentencia(sentencia).encode('utf-8')).hexdigest()[:16]
+
+
+class EstadisticasHuella:
+    """Ejecuciones acumuladas de una misma sentencia normalizada"""
+
+    def __init__(self, sentencia):
+        self.sentencia = sentencia
+        self.ejecuciones = 0
+        self.lentas = 0
+        self.tiempo_total = 0.0
+        self.tiempo_maximo = 0.0
+        self.filas = 0
+
+    def como_dict(self, huella):
+        return {
+            "huella": huella,
+            "sentencia": self.sentencia,
+            "ejecuciones": self.ejecuciones,
+            "lentas": self.lentas,
+            "tiempo_total_ms": round(self.tiempo_total * 1000, 3),
+            "tiempo_medio_ms": round(self.tiempo_total / self.ejecuciones * 1000, 3) if self.ejecuciones else 0,
+            "tiempo_maximo_ms": round(self.tiempo_maximo * 1000, 3),
+            "filas": self.filas,
+        }
+
+
+class RegistroConsultasLentas:
+    """Registro de ejecución de consultas con captura automática del plan de las lentas.
+
+    Cada sentencia ejecutada por SQLAlchemy se agrupa por su huella (la
+    sentencia sin literales) con su duración y filas devueltas. Las que superan
+    el umbral se escriben en el log de consultas lentas y, si son de lectura y
+    `explicar` está activado (SLOW_QUERY_EXPLAIN, desactivado por defecto), se
+    vuelven a ejecutar en segundo plano con EXPLAIN (ANALYZE, BUFFERS) para
+    guardar el plan que eligió Postgres. Como EXPLAIN ANALYZE repite la
+    consulta, cada huella se analiza como mucho una vez por intervalo.
+    """
+
+    def __init__(self, umbral_ms=500, explicar=False, intervalo_explicar=300, historial=100,
+                 max_huellas=1000, timeout_explicar_ms=30000, archivo_log=None, obtener_engine=None):
+        # obtener_engine da el engine para el EXPLAIN de las consultas que no pasan por SQLAlchemy
+        self.obtener_engine = obtener_engine
+        self.umbral = umbral_ms / 1000
+        self.explicar = explicar
+        self.intervalo_explicar = intervalo_explicar
+        self.max_huellas = max_huellas
+        self.timeout_explicar_ms = timeout_explicar_ms
+        self._lock = threading.Lock()
+        self._huellas = {}
+        self._recientes = deque(maxlen=historial)
+        self._ultimo_plan = {}
+        self._pool = None
+        self._instalado = False
+
+        self.consultas = 0
+        self.lentas = 0
+        self.planes = 0
+        self.errores_plan = 0
+
+        self._log = logging.getLogger(f"{__name__}.lentas")
+        if archivo_log:
+            manejador = logging.handlers.RotatingFileHandler(
+                archivo_log, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8'
+            )
+            manejador.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            self._log.addHandler(manejador)
+
+    @classmethod
+    def desde_entorno(cls, obtener_engine=None):
+        """Crea el registro con las variables SLOW_QUERY_* del entorno"""
+        return cls(
+            obtener_engine=obtener_engine,
+            umbral_ms=float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '500')),
+            explicar=os.getenv('SLOW_QUERY_EXPLAIN', 'false').strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on'),
+            intervalo_explicar=float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS', '300')),
+            historial=int(os.getenv('SLOW_QUERY_HISTORY', '100')),
+            timeout_explicar_ms=int(os.getenv('SLOW_QUERY_EXPLAIN_TIMEOUT_MS', '30000')),
+            archivo_log=os.getenv('SLOW_QUERY_LOG_FILE') or None,
+        )
+
+    def instalar(self, objetivo=Engine):
+        """Engancha el registro a la ejecución de consultas de un engine (por defecto, de todos)"""
+        if self._instalado:
+            return
+        event.listen(objetivo, 'before_cursor_execute', self._antes_de_consulta)
+        event.listen(objetivo, 'after_cursor_execute', self._despues_de_consulta)
+        event.listen(objetivo, 'handle_error', self._error_consulta)
+        self._instalado = True
+
+    @staticmethod
+    def _interna(conn):
+        return conn.get_execution_options().get(OPCION_INTERNA, False)
+
+    def _antes_de_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        if not self._interna(conn):
+            conn.info.setdefault('inicio_consultas', []).append(time.perf_counter())
+
+    def _despues_de_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('inicio_consultas')
+        if self._interna(conn) or not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+        filas = getattr(cursor, 'rowcount', -1)
+        self.registrar(conn.engine, statement, parameters, duracion, filas if filas is not None and filas >= 0 else None, executemany)
+
+    def _error_consulta(self, contexto_excepcion):
+        conn = contexto_excepcion.connection
+        inicios = conn.info.get('inicio_consultas') if conn is not None else None
+        if inicios:
+            inicios.pop()
+
+    def registrar(self, engine, sentencia, parametros, duracion, filas=None, varias=False):
+        """Acumula una ejecución y trata como lenta la que supera el umbral"""
+        huella = huella_sentencia(sentencia)
+        lenta = duracion >= self.umbral
+        with self._lock:
+            self.consultas += 1
+            estadisticas = self._huellas.get(huella)
+            if estadisticas is None and len(self._huellas) < self.max_huellas:
+                estadisticas = self._huellas[huella] = EstadisticasHuella(normalizar_sentencia(sentencia))
+            if estadisticas is not None:
+                estadisticas.ejecuciones += 1
+                estadisticas.tiempo_total += duracion
+                estadisticas.tiempo_maximo = max(estadisticas.tiempo_maximo, duracion)
+                estadisticas.filas += filas or 0
+                if lenta:
+                    estadisticas.lentas += 1
+            if not lenta:
+                return
+            self.lentas += 1
+            entrada = {
+                "huella": huella,
+                "fecha": datetime.now().isoformat(timespec='seconds'),
+                "duracion_ms": round(duracion * 1000, 3),
+                "filas": filas,
+                "sentencia": normalizar_sentencia(sentencia),
+                "plan": None,
+            }
+            self._recientes.append(entrada)
+            ahora = time.monotonic()
+            analizar = (
+                self.explicar and not varias and _SOLO_LECTURA.match(sentencia) is not None
+                and ahora - self._ultimo_plan.get(huella, float('-inf')) >= self.intervalo_explicar
+            )
+            if analizar:
+                self._ultimo_plan[huella] = ahora
+
+        self._log.warning(
+            f"Consulta lenta [{huella}] {entrada['duracion_ms']:.1f} ms, "
+            f"{filas if filas is not None else '?'} filas: {entrada['sentencia']}"
+        )
+        if analizar and engine is None and self.obtener_engine is not None:
+            engine = self.obtener_engine()
+        if analizar and engine is not None:
+            self._obtener_pool().submit(self._capturar_plan, engine, sentencia, parametros, entrada)
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='explain')
+            return self._pool
+
+    def _capturar_plan(self, engine, sentencia, parametros, entrada):
+        """Ejecuta EXPLAIN (ANALYZE, BUFFERS) de la sentencia en una transacción que se deshace"""
+        try:
+            with engine.connect() as conn:
+                conn = conn.execution_options(**{OPCION_INTERNA: True})
+                with conn.begin() as transaccion:
+                    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.timeout_explicar_ms)}")
+                    resultado = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {sentencia}", parametros)
+                    plan = "\n".join(fila[0] for fila in resultado)
+                    transaccion.rollback()
+        except Exception as e:
+            with self._lock:
+                self.errores_plan += 1
+            logger.error(f"Error al capturar el plan de la consulta [{entrada['huella']}]: {str(e)}")
+            return
+
+        with self._lock:
+            entrada["plan"] = plan
+            self.planes += 1
+        self._log.warning(f"Plan de la consulta lenta [{entrada['huella']}]:\n{plan}")
+
+    def recientes(self):
+        """Últimas consultas lentas, de la más reciente a la más antigua"""
+        with self._lock:
+            return [dict(entrada) for entrada in reversed(self._recientes)]
+
+    def resumen(self, limite=20):
+        """Huellas con mayor tiempo acumulado"""
+        with self._lock:
+            ordenadas = sorted(self._huellas.items(), key=lambda item: item[1].tiempo_total, reverse=True)
+            return [estadisticas.como_dict(huella) for huella, estadisticas in ordenadas[:limite]]
+
+    def estadisticas(self):
+        """Contadores generales del registro"""
+        with self._lock:
+            return {
+                "umbral_ms": round(self.umbral * 1000, 3),
+                "explain": self.explicar,
+                "consultas": self.consultas,
+                "lentas": self.lentas,
+                "planes_capturados": self.planes,
+                "errores_plan": self.errores_plan,
+                "huellas": len(self._huellas),
+            }
+
+    def reiniciar_tras_fork(self):
+        """Olvida el hilo de EXPLAIN heredado del proceso padre"""
+        self._lock = threading.Lock()
+        self._pool = None
@@ -0,0 +1,100 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class EjecutorConsultas:
+    """Ejecuta en paralelo las consultas independientes de un endpoint.
+
+    Cada consulta se lanza en un hilo de un pool acotado y usa su propia
+    conexión prestada por el pool de SQLAlchemy, de modo que la latencia del
+    endpoint se acerca a la de la consulta más lenta y no a la suma de todas.
+    """
+
+    def __init__(self, max_hilos=4):
+        self.max_hilos = max_hilos
+        self._lock = threading.Lock()
+        self._pool = None
+        self.lotes = 0
+        self.consultas = 0
+        self.errores = 0
+
+    def _obtener_pool(self):
+        """Crea el pool de hilos la primera vez que se necesita"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_hilos, thread_name_prefix='consulta')
+            return self._pool
+
+    @staticmethod
+    def _leer(engine, nombre, consulta, parametros):
+        """Ejecuta una consulta con una conexión propia del pool y devuelve el DataFrame"""
+        inicio = time.perf_counter()
+        with engine.connect() as conn:
+            df = pd.read_sql(consulta, conn, params=parametros)
+        logger.debug(f"Consulta '{nombre}' completada en {(time.perf_counter() - inicio) * 1000:.1f} ms ({len(df)} filas)")
+        return df
+
+    def leer(self, engine, consultas):
+        """Ejecuta las consultas `{nombre: consulta}` o `{nombre: (consulta, parámetros)}`
+        y devuelve un diccionario `{nombre: DataFrame}`.
+
+        Si alguna consulta falla se cancelan las pendientes y se relanza el error.
+        """
+        normalizadas = {
+            nombre: consulta if isinstance(consulta, tuple) else (consulta, None)
+            for nombre, consulta in consultas.items()
+        }
+        with self._lock:
+            self.lotes += 1
+            self.consultas += len(normalizadas)
+
+        # Una sola consulta (o pool deshabilitado): no compensa cambiar de hilo
+        if len(normalizadas) <= 1 or self.max_hilos <= 1:
+            return {nombre: self._leer(engine, nombre, consulta, parametros)
+                    for nombre, (consulta, parametros) in normalizadas.items()}
+
+        pool = self._obtener_pool()
+        # Cada hilo ejecuta la consulta con una copia del contexto de la petición
+        futuros = {
+            nombre: pool.submit(contextvars.copy_context().run, self._leer, engine, nombre, consulta, parametros)
+            for nombre, (consulta, parametros) in normalizadas.items()
+        }
+        hechos, pendientes = wait(futuros.values(), return_when=FIRST_EXCEPTION)
+        for futuro in hechos:
+            if futuro.exception() is not None:
+                for pendiente in pendientes:
+                    pendiente.cancel()
+                with self._lock:
+                    self.errores += 1
+                raise futuro.exception()
+
+        return {nombre: futuro.result() for nombre, futuro in futuros.items()}
+
+    def estadisticas(self):
+        """Contadores de lotes y consultas ejecutadas"""
+        with self._lock:
+            return {
+                "max_hilos": self.max_hilos,
+                "lotes": self.lotes,
+                "consultas": self.consultas,
+                "errores": self.errores,
+            }
+
+    def reiniciar_tras_fork(self):
+        """Olvida el pool de hilos heredado del proceso padre (sus hilos no existen en el hijo)"""
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def cerrar(self):
+        """Detiene el pool de hilos esperando a las consultas en curso"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
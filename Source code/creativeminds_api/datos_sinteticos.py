@@ -0,0 +1,371 @@
+"""Generador de datos sintéticos con el esquema de Odoo de Creative Minds.
+
+Crea las tablas creativeminds_proyecto, _tarea, _recurso, _kpi, _empleado,
+_equipo y sus tablas de relación en una base de datos Postgres local y las
+llena con datos reproducibles (misma semilla, mismos datos). El número de
+tareas por proyecto sigue una distribución sesgada: la mayoría de proyectos
+tiene pocas tareas y unos pocos tienen cientos.
+
+    python datos_sinteticos.py --nivel 10k --reemplazar
+    python datos_sinteticos.py --proyectos 2500 --semilla 7 --reemplazar
+
+La base de datos de destino se indica con --dsn o con las variables
+BENCH_DB_* (BENCH_DB_NAME obligatoria; usuario, contraseña, servidor y puerto
+toman por defecto los de DB_*). Nunca se usa la base de datos de la API: si el
+destino coincide con DB_NAME el generador se niega a continuar. Las tablas
+existentes solo se sustituyen con --reemplazar.
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import URL, make_url
+
+logger = logging.getLogger(__name__)
+
+# Niveles de tamaño predefinidos (número de proyectos)
+NIVELES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+
+TABLAS = [
+    'creativeminds_proyecto', 'creativeminds_empleado', 'creativeminds_tarea', 'creativeminds_recurso',
+    'creativeminds_kpi', 'creativeminds_equipo', 'creativeminds_proyecto_empleado_rel',
+    'creativeminds_equipo_empleado_rel',
+]
+
+ESQUEMA = [
+    """CREATE TABLE creativeminds_empleado (
+        id serial PRIMARY KEY, empleado_id integer NOT NULL, nombre varchar NOT NULL, dni varchar(9),
+        departamento varchar, puesto varchar, disponibilidad varchar,
+        create_date timestamp DEFAULT now(), write_date timestamp DEFAULT now())""",
+    """CREATE TABLE creativeminds_proyecto (
+        id serial PRIMARY KEY, proyecto_id integer NOT NULL, nombre varchar NOT NULL, estado varchar,
+        fecha_inicio date, fecha_fin date, presupuesto_estimado double precision,
+        costo_total_recursos double precision, porcentaje_progreso double precision,
+        horas_asignadas double precision, costo_por_hora double precision, costo_total double precision,
+        descripcion text, cliente varchar, prioridad varchar,
+        responsable_id integer REFERENCES creativeminds_empleado(id) ON DELETE SET NULL,
+        riesgos text, hitos text, dependencias text, comentarios text, colaboradores text,
+        create_date timestamp DEFAULT now(), write_date timestamp DEFAULT now())""",
+    """CREATE TABLE creativeminds_tarea (
+        id serial PRIMARY KEY, nombre varchar NOT NULL, descripcion text, estado varchar,
+        fecha_comienzo date, fecha_final date,
+        proyecto_id integer REFERENCES creativeminds_proyecto(id) ON DELETE SET NULL,
+        responsable_id integer REFERENCES creativeminds_empleado(id) ON DELETE SET NULL,
+        create_date timestamp DEFAULT now(), write_date timestamp DEFAULT now())""",
+    """CREATE TABLE creativeminds_recurso (
+        id serial PRIMARY KEY, nombre varchar NOT NULL,
+        proyecto_id integer REFERENCES creativeminds_proyecto(id) ON DELETE SET NULL,
+        costo_por_hora double precision, horas_asignadas double precision, costo_total double precision,
+        fecha_inicio date, fecha_fin date, estado varchar,
+        create_date timestamp DEFAULT now(), write_date timestamp DEFAULT now())""",
+    """CREATE TABLE creativeminds_kpi (
+        id serial PRIMARY KEY, nombre varchar NOT NULL,
+        proyecto_id integer REFERENCES creativeminds_proyecto(id) ON DELETE SET NULL,
+        valor double precision, objetivo double precision,
+        create_date timestamp DEFAULT now(), write_date timestamp DEFAULT now())""",
+    """CREATE TABLE creativeminds_equipo (
+        id serial PRIMARY KEY, equipo_id integer NOT NULL, nombre varchar NOT NULL, descripcion text,
+        responsable_id integer REFERENCES creativeminds_empleado(id) ON DELETE SET NULL,
+        create_date timestamp DEFAULT now(), write_date timestamp DEFAULT now())""",
+    # Tablas de relación Many2many con la misma forma que las crea Odoo
+    """CREATE TABLE creativeminds_proyecto_empleado_rel (
+        proyecto_id integer NOT NULL REFERENCES creativeminds_proyecto(id) ON DELETE CASCADE,
+        empleado_id integer NOT NULL REFERENCES creativeminds_empleado(id) ON DELETE CASCADE,
+        PRIMARY KEY (proyecto_id, empleado_id))""",
+    "CREATE INDEX ON creativeminds_proyecto_empleado_rel (empleado_id, proyecto_id)",
+    """CREATE TABLE creativeminds_equipo_empleado_rel (
+        equipo_id integer NOT NULL REFERENCES creativeminds_equipo(id) ON DELETE CASCADE,
+        empleado_id integer NOT NULL REFERENCES creativeminds_empleado(id) ON DELETE CASCADE,
+        PRIMARY KEY (equipo_id, empleado_id))""",
+    "CREATE INDEX ON creativeminds_equipo_empleado_rel (empleado_id, equipo_id)",
+]
+
+ESTADOS_PROYECTO = ['planificacion', 'en_progreso', 'finalizado', 'cancelado']
+PESOS_ESTADOS_PROYECTO = [0.2, 0.45, 0.25, 0.1]
+ESTADOS_TAREA = ['pendiente', 'en_progreso', 'completada']
+DEPARTAMENTOS = ['Diseño', 'Desarrollo', 'Marketing', 'Ventas', 'Producción', 'Administración']
+PUESTOS = ['Junior', 'Senior', 'Lead', 'Manager']
+DISPONIBILIDADES = ['disponible', 'parcial', 'asignado', 'no_disponible']
+PRIORIDADES = ['baja', 'media', 'alta']
+
+
+class GeneradorDatosSinteticos:
+    """Genera los DataFrames de cada tabla a partir de una semilla.
+
+    Los identificadores son consecutivos desde 1, de modo que las claves
+    ajenas se calculan sin consultar la base de datos.
+    """
+
+    def __init__(self, proyectos, semilla=42, tareas_media=8.0, sesgo_tareas=1.2, max_tareas=2000, hoy=None):
+        self.proyectos = proyectos
+        self.empleados = max(20, proyectos // 5)
+        self.equipos = max(5, proyectos // 50)
+        self.tareas_media = tareas_media
+        self.sesgo_tareas = sesgo_tareas
+        self.max_tareas = max_tareas
+        self.hoy = np.datetime64(hoy or date.today(), 'D')
+        self.rng = np.random.default_rng(semilla)
+
+    def _fechas(self, base, desde, hasta, nulos=0.0):
+        """base + un número aleatorio de días en [desde, hasta], con una fracción de nulos"""
+        fechas = pd.Series(base + self.rng.integers(desde, hasta + 1, len(base)).astype('timedelta64[D]'))
+        if nulos:
+            fechas[self.rng.random(len(base)) < nulos] = pd.NaT
+        return fechas
+
+    def _nulos(self, valores, fraccion):
+        serie = pd.Series(valores)
+        return serie.where(self.rng.random(len(serie)) >= fraccion)
+
+    def empleados_df(self):
+        n = self.empleados
+        ids = np.arange(1, n + 1)
+        return pd.DataFrame({
+            "id": ids,
+            "empleado_id": ids,
+            "nombre": [f"Empleado {i}" for i in ids],
+            "dni": [f"{i:08d}X" for i in ids],
+            "departamento": self._nulos(self.rng.choice(DEPARTAMENTOS, n), 0.05),
+            "puesto": self.rng.choice(PUESTOS, n, p=[0.35, 0.35, 0.2, 0.1]),
+            "disponibilidad": self.rng.choice(DISPONIBILIDADES, n, p=[0.35, 0.25, 0.3, 0.1]),
+        })
+
+    def proyectos_df(self):
+        n = self.proyectos
+        ids = np.arange(1, n + 1)
+        inicio = self._fechas(np.full(n, self.hoy), -700, 30, nulos=0.03)
+        fin = self._fechas(inicio.to_numpy(), 15, 240, nulos=0.1)
+        horas = self.rng.uniform(20, 2000, n).round(1)
+        costo_hora = self.rng.uniform(15, 90, n).round(2)
+        presupuesto = self.rng.uniform(2_000, 250_000, n).round(2)
+        presupuesto[self.rng.random(n) < 0.05] = 0
+        return pd.DataFrame({
+            "id": ids,
+            "proyecto_id": ids,
+            "nombre": [f"Proyecto {i}" for i in ids],
+            "estado": self.rng.choice(ESTADOS_PROYECTO, n, p=PESOS_ESTADOS_PROYECTO),
+            "fecha_inicio": inicio,
+            "fecha_fin": fin,
+            "presupuesto_estimado": presupuesto,
+            "costo_total_recursos": (presupuesto * self.rng.uniform(0.2, 1.4, n)).round(2),
+            "porcentaje_progreso": self.rng.uniform(0, 100, n).round(1),
+            "horas_asignadas": horas,
+            "costo_por_hora": costo_hora,
+            "costo_total": (horas * costo_hora).round(2),
+            "descripcion": [f"Descripción del proyecto {i}" for i in ids],
+            "cliente": [f"Cliente {i}" for i in self.rng.integers(1, max(2, n // 10), n)],
+            "prioridad": self.rng.choice(PRIORIDADES, n, p=[0.3, 0.5, 0.2]),
+            "responsable_id": self._nulos(self.rng.integers(1, self.empleados + 1, n), 0.1).astype('Int64'),
+            "riesgos": self._nulos(np.full(n, "Retrasos de proveedores"), 0.5),
+        })
+
+    def conteo_tareas(self):
+        """Tareas por proyecto con distribución lognormal (media tareas_media, cola larga)"""
+        mu = np.log(self.tareas_media) - self.sesgo_tareas ** 2 / 2
+        conteos = np.floor(self.rng.lognormal(mu, self.sesgo_tareas, self.proyectos)).astype(int)
+        return np.minimum(conteos, self.max_tareas)
+
+    def tareas_df(self, proyectos):
+        conteos = self.conteo_tareas()
+        proyecto_ids = np.repeat(proyectos["id"].to_numpy(), conteos)
+        inicio_proyecto = np.repeat(proyectos["fecha_inicio"].fillna(pd.Timestamp(self.hoy)).to_numpy(), conteos)
+        n = len(proyecto_ids)
+        comienzo = self._fechas(inicio_proyecto.astype('datetime64[D]'), -5, 150, nulos=0.08)
+        final = self._fechas(comienzo.fillna(pd.Timestamp(self.hoy)).to_numpy().astype('datetime64[D]'), 0, 60, nulos=0.08)
+        return pd.DataFrame({
+            "id": np.arange(1, n + 1),
+            "nombre": [f"Tarea {i}" for i in range(1, n + 1)],
+            "estado": self.rng.choice(ESTADOS_TAREA, n, p=[0.35, 0.3, 0.35]),
+            "fecha_comienzo": comienzo,
+            "fecha_final": final,
+            "proyecto_id": proyecto_ids,
+            "responsable_id": self._nulos(self.rng.integers(1, self.empleados + 1, n), 0.15).astype('Int64'),
+        })
+
+    def recursos_df(self):
+        conteos = self.rng.integers(0, 5, self.proyectos)
+        proyecto_ids = np.repeat(np.arange(1, self.proyectos + 1), conteos)
+        n = len(proyecto_ids)
+        horas = self.rng.uniform(1, 200, n).round(1)
+        costo_hora = self.rng.uniform(10, 80, n).round(2)
+        return pd.DataFrame({
+            "id": np.arange(1, n + 1),
+            "nombre": [f"Recurso {i}" for i in range(1, n + 1)],
+            "proyecto_id": proyecto_ids,
+            "costo_por_hora": costo_hora,
+            "horas_asignadas": horas,
+            "costo_total": (horas * costo_hora).round(2),
+            "estado": self.rng.choice(['activo', 'inactivo'], n, p=[0.85, 0.15]),
+        })
+
+    def kpis_df(self):
+        conteos = self.rng.integers(0, 5, self.proyectos)
+        proyecto_ids = np.repeat(np.arange(1, self.proyectos + 1), conteos)
+        n = len(proyecto_ids)
+        objetivo = self.rng.uniform(10, 100, n).round(1)
+        return pd.DataFrame({
+            "id": np.arange(1, n + 1),
+            "nombre": self.rng.choice(['Satisfacción', 'Entregas a tiempo', 'Calidad', 'Rentabilidad'], n),
+            "proyecto_id": proyecto_ids,
+            "valor": (objetivo * self.rng.uniform(0.4, 1.3, n)).round(1),
+            "objetivo": objetivo,
+        })
+
+    def equipos_df(self):
+        ids = np.arange(1, self.equipos + 1)
+        return pd.DataFrame({
+            "id": ids,
+            "equipo_id": ids,
+            "nombre": [f"Equipo {i}" for i in ids],
+            "descripcion": [f"Equipo de trabajo {i}" for i in ids],
+            "responsable_id": self.rng.integers(1, self.empleados + 1, self.equipos),
+        })
+
+    def _relacion(self, origenes, minimo, maximo, columna_origen):
+        """Pares (origen, empleado) sin duplicados para una tabla Many2many"""
+        conteos = self.rng.integers(minimo, maximo + 1, origenes)
+        pares = pd.DataFrame({
+            columna_origen: np.repeat(np.arange(1, origenes + 1), conteos),
+            "empleado_id": self.rng.integers(1, self.empleados + 1, int(conteos.sum())),
+        })
+        return pares.drop_duplicates(ignore_index=True)
+
+    def generar(self):
+        """Devuelve `{tabla: DataFrame}` en orden de inserción (respetando las claves ajenas)"""
+        proyectos = self.proyectos_df()
+        return {
+            'creativeminds_empleado': self.empleados_df(),
+            'creativeminds_proyecto': proyectos,
+            'creativeminds_tarea': self.tareas_df(proyectos),
+            'creativeminds_recurso': self.recursos_df(),
+            'creativeminds_kpi': self.kpis_df(),
+            'creativeminds_equipo': self.equipos_df(),
+            'creativeminds_proyecto_empleado_rel': self._relacion(self.proyectos, 0, 6, 'proyecto_id'),
+            'creativeminds_equipo_empleado_rel': self._relacion(self.equipos, 2, 12, 'equipo_id'),
+        }
+
+
+def _copiar(conexion_dbapi, tabla, df):
+    """Carga un DataFrame con COPY ... FROM STDIN (psycopg 3 o psycopg2)"""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d')
+    sql = f"COPY {tabla} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv)"
+    with conexion_dbapi.cursor() as cursor:
+        if hasattr(cursor, 'copy'):
+            with cursor.copy(sql) as copia:
+                copia.write(buffer.getvalue())
+        else:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+
+
+def cargar(engine, datos, reemplazar=False):
+    """Crea el esquema y carga las tablas generadas; devuelve `{tabla: filas}`"""
+    existentes = set(inspect(engine).get_table_names()) & set(TABLAS)
+    if existentes and not reemplazar:
+        raise RuntimeError(f"Ya existen las tablas {', '.join(sorted(existentes))}; usa --reemplazar para sustituirlas")
+
+    conexion_dbapi = engine.raw_connection()
+    try:
+        with conexion_dbapi.cursor() as cursor:
+            for tabla in reversed(TABLAS):
+                cursor.execute(f"DROP TABLE IF EXISTS {tabla} CASCADE")
+            for sentencia in ESQUEMA:
+                cursor.execute(sentencia)
+        for tabla, df in datos.items():
+            _copiar(conexion_dbapi, tabla, df)
+        with conexion_dbapi.cursor() as cursor:
+            # Las secuencias continúan tras los identificadores cargados
+            for tabla, df in datos.items():
+                if 'id' in df.columns:
+                    cursor.execute(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), {max(len(df), 1)})")
+            cursor.execute("CREATE INDEX ON creativeminds_tarea (proyecto_id)")
+            cursor.execute("CREATE INDEX ON creativeminds_tarea (responsable_id)")
+        conexion_dbapi.commit()
+    except Exception:
+        conexion_dbapi.rollback()
+        raise
+    finally:
+        conexion_dbapi.close()
+
+    # Estadísticas del planificador al día antes de consultar
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+        for tabla in TABLAS:
+            conn.exec_driver_sql(f"ANALYZE {tabla}")
+    return {tabla: len(df) for tabla, df in datos.items()}
+
+
+def url_destino(dsn=None):
+    """URL de la base de datos de pruebas (--dsn o BENCH_DB_*); nunca la de la API"""
+    if dsn:
+        url = make_url(dsn)
+    else:
+        nombre = os.getenv('BENCH_DB_NAME')
+        if not nombre:
+            raise RuntimeError("Indica la base de datos de pruebas con --dsn o con BENCH_DB_NAME")
+        url = URL.create(
+            'postgresql',
+            username=os.getenv('BENCH_DB_USER', os.getenv('DB_USER', 'admin')),
+            password=os.getenv('BENCH_DB_PASSWORD', os.getenv('DB_PASSWORD', 'admin')),
+            host=os.getenv('BENCH_DB_HOST', os.getenv('DB_HOST', 'localhost')),
+            port=int(os.getenv('BENCH_DB_PORT', os.getenv('DB_PORT', '5432'))),
+            database=nombre,
+        )
+
+    # Las tablas se borran y se vuelven a crear: nunca contra la base de datos de la API
+    if url.database == os.getenv('DB_NAME', 'odoo'):
+        raise RuntimeError(
+            f"La base de datos {url.database} es la de la API (DB_NAME); usa una base de datos de pruebas"
+        )
+    return url
+
+
+def generar_base_datos(proyectos, semilla=42, reemplazar=False, engine=None, **opciones):
+    """Genera y carga un conjunto de datos con `proyectos` proyectos"""
+    engine = engine or create_engine(url_destino())
+    inicio = time.perf_counter()
+    datos = GeneradorDatosSinteticos(proyectos, semilla=semilla, **opciones).generar()
+    filas = cargar(engine, datos, reemplazar=reemplazar)
+    logger.info(
+        f"Datos sintéticos cargados en {time.perf_counter() - inicio:.1f} s: "
+        + ", ".join(f"{tabla.replace('creativeminds_', '')}={n}" for tabla, n in filas.items())
+    )
+    return filas
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos con el esquema de Creative Minds")
+    tamano = parser.add_mutually_exclusive_group(required=True)
+    tamano.add_argument('--nivel', choices=sorted(NIVELES), help="Tamaño predefinido (número de proyectos)")
+    tamano.add_argument('--proyectos', type=int, help="Número de proyectos")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--tareas-media', type=float, default=8.0, help="Media de tareas por proyecto")
+    parser.add_argument('--sesgo-tareas', type=float, default=1.2, help="Dispersión lognormal de las tareas por proyecto")
+    parser.add_argument('--reemplazar', action='store_true', help="Sustituye las tablas si ya existen")
+    parser.add_argument('--dsn', help="URL de la base de datos de pruebas (por defecto, las variables BENCH_DB_*)")
+    args = parser.parse_args(argumentos)
+
+    load_dotenv()
+    proyectos = NIVELES[args.nivel] if args.nivel else args.proyectos
+    try:
+        engine = create_engine(url_destino(args.dsn))
+        generar_base_datos(proyectos, semilla=args.semilla, reemplazar=args.reemplazar, engine=engine,
+                           tareas_media=args.tareas_media, sesgo_tareas=args.sesgo_tareas)
+    except Exception as e:
+        logger.error(f"Error al generar los datos sintéticos: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
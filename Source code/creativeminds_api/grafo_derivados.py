@@ -0,0 +1,71 @@
+import inspect
+import threading
+
+
+class GrafoDerivados:
+    """Grafo de valores derivados con nombre.
+
+    Cada nodo es una función cuyos parámetros son los nombres de los valores
+    de los que depende (otros nodos o entradas del cálculo). Al evaluar el
+    grafo cada nodo se calcula una sola vez y su resultado se comparte entre
+    todos los nodos que lo necesitan.
+    """
+
+    def __init__(self):
+        self._nodos = {}
+
+    def nodo(self, nombre=None):
+        """Decorador que registra una función como nodo del grafo"""
+        def decorador(funcion):
+            dependencias = tuple(inspect.signature(funcion).parameters)
+            self._nodos[nombre or funcion.__name__] = (funcion, dependencias)
+            return funcion
+        return decorador
+
+    def nombres(self):
+        """Nombres de los nodos registrados"""
+        return list(self._nodos)
+
+    def dependencias(self, nombre):
+        """Nombres de los valores de los que depende un nodo"""
+        return self._nodos[nombre][1]
+
+    def evaluar(self, **entradas):
+        """Crea un contexto de evaluación a partir de los valores de entrada"""
+        return ContextoDerivados(self, entradas)
+
+
+class ContextoDerivados:
+    """Evaluación perezosa y memorizada de un GrafoDerivados para unas entradas concretas"""
+
+    def __init__(self, grafo, entradas):
+        self._grafo = grafo
+        self._valores = dict(entradas)
+        self._en_curso = set()
+        self._lock = threading.RLock()
+
+    def __getitem__(self, nombre):
+        with self._lock:
+            if nombre in self._valores:
+                return self._valores[nombre]
+            if nombre not in self._grafo._nodos:
+                raise KeyError(f"Valor derivado desconocido: {nombre}")
+            if nombre in self._en_curso:
+                raise ValueError(f"Dependencia circular al calcular '{nombre}'")
+
+            funcion, dependencias = self._grafo._nodos[nombre]
+            self._en_curso.add(nombre)
+            try:
+                valor = funcion(*(self[dependencia] for dependencia in dependencias))
+            finally:
+                self._en_curso.discard(nombre)
+            self._valores[nombre] = valor
+            return valor
+
+    def __contains__(self, nombre):
+        return nombre in self._valores or nombre in self._grafo._nodos
+
+    def calculados(self):
+        """Nombres de los valores ya disponibles en el contexto"""
+        with self._lock:
+            return list(self._valores)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class InstantaneaCartera:
+    """Fotografía de proyectos, tareas y empleados compartida entre endpoints.
+
+    Además de los DataFrames guarda los resultados derivados (análisis,
+    recomendaciones...) para que se calculen una sola vez por versión.
+    """
+
+    def __init__(self, version, proyectos, tareas, empleados, huella=None):
+        self.version = version
+        # Huella de las tablas con la que se cargó (None si no se pudo calcular)
+        self.huella = huella
+        self.cargada_en = datetime.now()
+        self.proyectos = proyectos
+        self.tareas = tareas
+        self.empleados = empleados
+        self._marca_carga = time.monotonic()
+        self._derivados = {}
+        # Reentrante: un derivado puede depender de otro derivado
+        self._lock = threading.RLock()
+
+    def edad(self):
+        """Segundos transcurridos desde que se cargó la instantánea"""
+        return time.monotonic() - self._marca_carga
+
+    def renovar(self):
+        """Reinicia la edad de la instantánea cuando se comprueba que sus datos siguen vigentes"""
+        self._marca_carga = time.monotonic()
+
+    def derivado(self, nombre, calcular):
+        """Devuelve un resultado derivado, calculándolo la primera vez que se pide"""
+        with self._lock:
+            if nombre not in self._derivados:
+                self._derivados[nombre] = calcular(self)
+            return self._derivados[nombre]
+
+    def descripcion(self):
+        """Metadatos de la instantánea para incluir en las respuestas"""
+        return {
+            "version": self.version,
+            "cargada_en": self.cargada_en.isoformat(timespec='seconds'),
+        }
+
+
+class CargadorInstantaneas:
+    """Carga y comparte la instantánea de la cartera entre peticiones concurrentes.
+
+    Solo una petición ejecuta las consultas; las que llegan mientras tanto
+    esperan y reutilizan el mismo resultado. La instantánea se reutiliza
+    hasta que supera `ttl_segundos` o se invalida explícitamente. Si al recargar
+    `cargar` devuelve los mismos DataFrames, se conserva la instantánea vigente
+    junto con sus derivados ya calculados.
+
+    Con `obtener_huella` la instantánea también caduca en cuanto cambia la
+    huella de los datos (la misma con la que la caché de respuestas construye
+    sus claves), de modo que una respuesta guardada con la huella nueva nunca
+    se calcula con datos anteriores a ella. Si la huella es None (no se pudo
+    calcular) solo se aplica el TTL.
+    """
+
+    def __init__(self, cargar, ttl_segundos=5, obtener_huella=None):
+        self._cargar = cargar
+        self.ttl_segundos = ttl_segundos
+        self._obtener_huella = obtener_huella
+        self._lock = threading.Lock()
+        self._lock_async = None
+        self._actual = None
+        self._version = 0
+
+    def _huella(self):
+        return self._obtener_huella() if self._obtener_huella is not None else None
+
+    def _vigente(self, huella=None):
+        actual = self._actual
+        if actual is not None and actual.edad() < self.ttl_segundos and (huella is None or actual.huella == huella):
+            return actual
+        return None
+
+    def obtener(self, engine):
+        """Devuelve la instantánea vigente, cargándola si ha caducado o han cambiado los datos"""
+        huella = self._huella()
+        actual = self._vigente(huella)
+        if actual is not None:
+            return actual
+
+        with self._lock:
+            # Otra petición pudo haberla recargado mientras esperábamos
+            actual = self._vigente(huella)
+            if actual is not None:
+                return actual
+            return self._publicar(*self._cargar(engine), huella=huella)
+
+    async def obtener_async(self, cargar_async, huella=None):
+        """Versión asíncrona de obtener(): `cargar_async` es una corrutina que devuelve los DataFrames.
+
+        La huella, si se quiere comprobar, la calcula quien llama (fuera del bucle de eventos).
+        """
+        actual = self._vigente(huella)
+        if actual is not None:
+            return actual
+
+        if self._lock_async is None:
+            self._lock_async = asyncio.Lock()
+        async with self._lock_async:
+            actual = self._vigente(huella)
+            if actual is not None:
+                return actual
+            proyectos, tareas, empleados = await cargar_async()
+            with self._lock:
+                return self._publicar(proyectos, tareas, empleados, huella=huella)
+
+    def _publicar(self, proyectos, tareas, empleados, huella=None):
+        """Sustituye la instantánea vigente por una nueva con los datos cargados"""
+        actual = self._actual
+        if (actual is not None and proyectos is actual.proyectos
+                and tareas is actual.tareas and empleados is actual.empleados):
+            actual.huella = huella
+            actual.renovar()
+            return actual
+
+        self._version += 1
+        self._actual = InstantaneaCartera(self._version, proyectos, tareas, empleados, huella=huella)
+        logger.info(f"Instantánea de cartera v{self._version} cargada "
+                    f"({len(proyectos)} proyectos, {len(tareas)} tareas, {len(empleados)} empleados)")
+        return self._actual
+
+    def invalidar(self):
+        """Descarta la instantánea vigente para forzar una recarga"""
+        with self._lock:
+            self._actual = None
@@ -0,0 +1,128 @@
+import dataclasses
+import decimal
+import json
+import math
+import uuid
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from metricas_peticiones import medir_fase
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa el módulo json estándar
+    orjson = None
+
+
+def _lista_columna(columna):
+    """Convierte una columna a lista de valores nativos de Python en una sola pasada"""
+    if orjson is not None and columna.dtype.kind in 'biuf':
+        # orjson escribe los NaN como null, no hace falta sustituirlos
+        return columna.tolist()
+    return columna.astype(object).where(columna.notna(), None).tolist()
+
+
+def registros_dataframe(df):
+    """Convierte un DataFrame en lista de registros trabajando columna a columna.
+
+    Cada columna se convierte con un único tolist() y las filas se forman
+    combinando esas listas, sin pasar por DataFrame.to_dict().
+    """
+    columnas = [str(c) for c in df.columns]
+    valores = [_lista_columna(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [dict(zip(columnas, fila)) for fila in zip(*valores)]
+
+
+def _convertir(obj):
+    """Convierte a tipos JSON los objetos que el codificador no sabe serializar"""
+    if obj is None or obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, pd.DataFrame):
+        return registros_dataframe(obj)
+    if isinstance(obj, pd.Series):
+        return {str(k): (None if _es_nulo(v) else v) for k, v in obj.items()}
+    if isinstance(obj, (datetime, date)):
+        # Mismo formato que el proveedor por defecto de Flask (RFC 822)
+        return http_date(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _es_nulo(valor):
+    """Indica si un valor escalar es nulo (None, NaN, NaT o NA)"""
+    try:
+        return bool(pd.isna(valor))
+    except (TypeError, ValueError):
+        return False
+
+
+def _limpiar_nan(obj):
+    """Sustituye recursivamente los NaN por None (solo para el codificador estándar)"""
+    if isinstance(obj, float):
+        return None if math.isnan(obj) or math.isinf(obj) else obj
+    if isinstance(obj, dict):
+        return {k: _limpiar_nan(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_limpiar_nan(v) for v in obj]
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray, np.generic)):
+        return _limpiar_nan(_convertir(obj))
+    return obj
+
+
+class JSONProviderAnalitica(DefaultJSONProvider):
+    """Proveedor JSON de la API que entiende tipos de NumPy y pandas.
+
+    Usa orjson si está instalado. Serializa los escalares de NumPy, escribe
+    NaN/NaT como null, mantiene el formato de fechas de Flask y acepta
+    DataFrames y Series directamente, sin convertirlos antes con to_dict().
+    """
+
+    def _opciones_orjson(self, kwargs):
+        opciones = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            opciones |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def dumps_bytes(self, obj, **kwargs):
+        """Serializa a JSON en bytes UTF-8"""
+        if orjson is not None:
+            return orjson.dumps(obj, default=_convertir, option=self._opciones_orjson(kwargs))
+
+        kwargs.setdefault('default', _convertir)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(_limpiar_nan(obj), allow_nan=False, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args['indent'] = 2
+        else:
+            dump_args['separators'] = (',', ':')
+        with medir_fase('serialize'):
+            cuerpo = self.dumps_bytes(obj, **dump_args) + b"\n"
+        return self._app.response_class(cuerpo, mimetype=self.mimetype)
@@ -0,0 +1,422 @@
+import bisect
+import contextvars
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Medición de la petición en curso (se propaga a los hilos que copian el contexto)
+_medicion_actual = contextvars.ContextVar('medicion_peticion', default=None)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FASES = ('db', 'compute', 'serialize')
+
+
+class MedicionPeticion:
+    """Tiempos por fase y filas leídas durante una petición.
+
+    El tiempo de base de datos es tiempo de reloj con al menos una consulta
+    en curso, de modo que las consultas en paralelo no se cuentan dos veces.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        self.fases = defaultdict(float)
+        self.consultas = 0
+        self.filas = 0
+        self._consultas_activas = 0
+        self._inicio_db = None
+
+    def consulta_iniciada(self):
+        with self._lock:
+            if self._consultas_activas == 0:
+                self._inicio_db = time.perf_counter()
+            self._consultas_activas += 1
+
+    def consulta_terminada(self, filas=None):
+        with self._lock:
+            self._consultas_activas = max(self._consultas_activas - 1, 0)
+            if self._consultas_activas == 0 and self._inicio_db is not None:
+                self.fases['db'] += time.perf_counter() - self._inicio_db
+                self._inicio_db = None
+            self.consultas += 1
+            if filas is not None and filas >= 0:
+                self.filas += filas
+
+    def sumar_fase(self, fase, duracion):
+        with self._lock:
+            self.fases[fase] += duracion
+
+    def cerrar(self):
+        """Calcula el total y la fase de cálculo (todo lo que no es base de datos ni serialización)"""
+        total = time.perf_counter() - self.inicio
+        with self._lock:
+            self.fases['compute'] = max(total - self.fases['db'] - self.fases['serialize'], 0.0)
+        return total
+
+
+def medicion_actual():
+    """Medición de la petición en curso o None fuera de una petición instrumentada"""
+    return _medicion_actual.get()
+
+
+@contextmanager
+def medir_fase(fase):
+    """Acumula en la petición en curso el tiempo del bloque bajo la fase indicada"""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar_fase(fase, time.perf_counter() - inicio)
+
+
+class Histograma:
+    """Histograma acumulativo con los buckets de Prometheus"""
+
+    def __init__(self, buckets=BUCKETS_SEGUNDOS):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+def _escapar(valor):
+    """Escapa un valor de etiqueta según el formato de texto de Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(**valores):
+    return ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in valores.items())
+
+
+class RegistroMetricas:
+    """Contadores e histogramas por ruta, serializables para sumarlos entre procesos"""
+
+    def __init__(self):
+        self.peticiones = defaultdict(int)
+        self.duracion = defaultdict(Histograma)
+        self.fases = defaultdict(Histograma)
+        self.consultas = defaultdict(int)
+        self.filas = defaultdict(int)
+        # (nombre, tipo, ayuda) -> {etiquetas ordenadas: valor}
+        self.extras = defaultdict(lambda: defaultdict(float))
+
+    def registrar(self, ruta, metodo, estado, total, medicion):
+        self.peticiones[(ruta, metodo, estado)] += 1
+        self.duracion[(ruta, metodo)].observar(total)
+        for fase in FASES:
+            self.fases[(ruta, fase)].observar(medicion.fases[fase])
+        self.consultas[ruta] += medicion.consultas
+        self.filas[ruta] += medicion.filas
+
+    def sumar_extras(self, extras, solo_contadores=False):
+        """Suma métricas adicionales en tuplas (nombre, tipo, ayuda, [(etiquetas, valor)])"""
+        for nombre, tipo, ayuda, muestras in extras:
+            if solo_contadores and tipo != 'counter':
+                continue
+            serie = self.extras[(nombre, tipo, ayuda)]
+            for etiquetas, valor in muestras:
+                serie[tuple(sorted(etiquetas.items()))] += valor
+
+    def a_dict(self):
+        return {
+            "peticiones": [[*clave, n] for clave, n in self.peticiones.items()],
+            "duracion": [[*clave, h.conteos, h.suma, h.total] for clave, h in self.duracion.items()],
+            "fases": [[*clave, h.conteos, h.suma, h.total] for clave, h in self.fases.items()],
+            "consultas": [[ruta, n] for ruta, n in self.consultas.items()],
+            "filas": [[ruta, n] for ruta, n in self.filas.items()],
+            "extras": [
+                [nombre, tipo, ayuda, [[dict(etiquetas), valor] for etiquetas, valor in serie.items()]]
+                for (nombre, tipo, ayuda), serie in self.extras.items()
+            ],
+        }
+
+    def sumar(self, datos, solo_contadores=False):
+        """Suma un registro serializado con a_dict(). Con `solo_contadores` no se suman los gauges adicionales"""
+        for ruta, metodo, estado, n in datos["peticiones"]:
+            self.peticiones[(ruta, metodo, estado)] += n
+        for destino, clave in ((self.duracion, "duracion"), (self.fases, "fases")):
+            for a, b, conteos, suma, total in datos[clave]:
+                histograma = destino[(a, b)]
+                histograma.conteos = [x + y for x, y in zip(histograma.conteos, conteos)]
+                histograma.suma += suma
+                histograma.total += total
+        for ruta, n in datos["consultas"]:
+            self.consultas[ruta] += n
+        for ruta, n in datos["filas"]:
+            self.filas[ruta] += n
+        self.sumar_extras(datos["extras"], solo_contadores)
+
+
+class MetricasPeticiones:
+    """Registro de contadores e histogramas por ruta en formato de texto de Prometheus.
+
+    Sin `directorio` las métricas son del proceso. Con varios workers hay que
+    indicar un directorio compartido (METRICS_MULTIPROC_DIR, que servidor.py
+    crea si no se indica): cada proceso vuelca en él su registro como mucho
+    cada `intervalo_volcado` segundos, y exportar() suma los de todos, de modo
+    que cualquier worker que atienda el scrape publica los totales del
+    servidor. Cuando un worker termina, el maestro acumula sus contadores
+    (proceso_terminado) para que los totales no bajen al reciclarlo; sus
+    gauges se descartan.
+    """
+
+    ACUMULADO = 'acumulado.json'
+
+    def __init__(self, prefijo='creativeminds', directorio=None, intervalo_volcado=1.0):
+        self.prefijo = prefijo
+        self.directorio = directorio
+        self.intervalo_volcado = intervalo_volcado
+        # Función sin argumentos con las métricas adicionales del proceso (pools, caché...)
+        self.extras = None
+        self._lock = threading.Lock()
+        self._registro = RegistroMetricas()
+        self._ultimo_volcado = 0.0
+        self._instalado_motor = False
+
+    @classmethod
+    def desde_entorno(cls):
+        """Crea el registro con METRICS_MULTIPROC_DIR y METRICS_FLUSH_SECONDS"""
+        return cls(
+            directorio=os.getenv('METRICS_MULTIPROC_DIR') or None,
+            intervalo_volcado=float(os.getenv('METRICS_FLUSH_SECONDS', '1')),
+        )
+
+    def instalar(self, blueprint):
+        """Engancha la medición a todas las rutas del blueprint y a las consultas de SQLAlchemy"""
+        blueprint.before_request(self._iniciar)
+        blueprint.after_request(self._finalizar)
+        if not self._instalado_motor:
+            event.listen(Engine, 'before_cursor_execute', self._antes_de_consulta)
+            event.listen(Engine, 'after_cursor_execute', self._despues_de_consulta)
+            event.listen(Engine, 'handle_error', self._error_consulta)
+            self._instalado_motor = True
+
+    @staticmethod
+    def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+        medicion = _medicion_actual.get()
+        if medicion is not None:
+            conn.info['medicion_peticion'] = medicion
+            medicion.consulta_iniciada()
+
+    @staticmethod
+    def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+        medicion = conn.info.pop('medicion_peticion', None)
+        if medicion is not None:
+            medicion.consulta_terminada(getattr(cursor, 'rowcount', None))
+
+    @staticmethod
+    def _error_consulta(contexto_excepcion):
+        conn = contexto_excepcion.connection
+        medicion = conn.info.pop('medicion_peticion', None) if conn is not None else None
+        if medicion is not None:
+            medicion.consulta_terminada()
+
+    def _iniciar(self):
+        medicion = MedicionPeticion()
+        g._token_medicion = _medicion_actual.set(medicion)
+        g.medicion_peticion = medicion
+
+    def _finalizar(self, respuesta):
+        medicion = g.pop('medicion_peticion', None)
+        token = g.pop('_token_medicion', None)
+        if medicion is None:
+            return respuesta
+        if token is not None:
+            try:
+                _medicion_actual.reset(token)
+            except ValueError:
+                _medicion_actual.set(None)
+
+        total = medicion.cerrar()
+        ruta = request.url_rule.rule if request.url_rule is not None else request.path
+        self.registrar(ruta, request.method, respuesta.status_code, total, medicion)
+
+        respuesta.headers['Server-Timing'] = ", ".join(
+            [f"{fase};dur={medicion.fases[fase] * 1000:.1f}" for fase in FASES] + [f"total;dur={total * 1000:.1f}"]
+        )
+        return respuesta
+
+    def registrar(self, ruta, metodo, estado, total, medicion):
+        with self._lock:
+            self._registro.registrar(ruta, metodo, estado, total, medicion)
+        if self.directorio and time.monotonic() - self._ultimo_volcado >= self.intervalo_volcado:
+            try:
+                self.volcar()
+            except OSError as e:
+                logger.error(f"No se pudieron volcar las métricas en {self.directorio}: {str(e)}")
+
+    def estadisticas(self):
+        """Peticiones, tiempo total, consultas y filas acumuladas por ruta en este proceso"""
+        with self._lock:
+            registro = self._registro
+            resultado = {}
+            for (ruta, _metodo), datos in registro.duracion.items():
+                actual = resultado.setdefault(ruta, {"peticiones": 0, "tiempo_total": 0.0})
+                actual["peticiones"] += datos.total
+                actual["tiempo_total"] += datos.suma
+            for ruta, actual in resultado.items():
+                actual["consultas"] = registro.consultas[ruta]
+                actual["filas"] = registro.filas[ruta]
+            return resultado
+
+    # Agregación entre procesos
+
+    def _archivo_proceso(self, pid):
+        return os.path.join(self.directorio, f"proceso_{pid}.json")
+
+    @contextmanager
+    def _bloqueo(self, exclusivo):
+        """Bloqueo del directorio: la lectura de todos los archivos no se cruza con la acumulación de un proceso terminado"""
+        with open(os.path.join(self.directorio, '.lock'), 'a') as archivo:
+            fcntl.flock(archivo, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _escribir(ruta, datos):
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'w') as archivo:
+            json.dump(datos, archivo)
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _leer(ruta):
+        try:
+            with open(ruta) as archivo:
+                return json.load(archivo)
+        except FileNotFoundError:
+            return None
+
+    def volcar(self):
+        """Escribe el registro de este proceso (con sus métricas adicionales) en el directorio compartido"""
+        if not self.directorio:
+            return
+        registro = self._copia()
+        self._ultimo_volcado = time.monotonic()
+        self._escribir(self._archivo_proceso(os.getpid()), registro.a_dict())
+
+    def proceso_terminado(self, pid):
+        """Acumula los contadores de un proceso que ya terminó y retira su archivo (lo llama el maestro)"""
+        if not self.directorio:
+            return
+        with self._bloqueo(exclusivo=True):
+            datos = self._leer(self._archivo_proceso(pid))
+            if datos is None:
+                return
+            acumulado = RegistroMetricas()
+            anterior = self._leer(os.path.join(self.directorio, self.ACUMULADO))
+            if anterior is not None:
+                acumulado.sumar(anterior)
+            acumulado.sumar(datos, solo_contadores=True)
+            self._escribir(os.path.join(self.directorio, self.ACUMULADO), acumulado.a_dict())
+            os.remove(self._archivo_proceso(pid))
+
+    def limpiar(self):
+        """Vacía el directorio compartido (al arrancar el servidor, antes de crear los workers)"""
+        if not self.directorio:
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        with self._bloqueo(exclusivo=True):
+            for ruta in glob.glob(os.path.join(self.directorio, '*.json')):
+                os.remove(ruta)
+
+    def reiniciar_tras_fork(self):
+        """Empieza un registro vacío en el worker: lo heredado del maestro no es de este proceso"""
+        self._lock = threading.Lock()
+        self._registro = RegistroMetricas()
+        self._ultimo_volcado = 0.0
+
+    def _copia(self):
+        """Copia del registro de este proceso con sus métricas adicionales"""
+        registro = RegistroMetricas()
+        with self._lock:
+            registro.sumar(self._registro.a_dict())
+        if self.extras is not None:
+            registro.sumar_extras(self.extras())
+        return registro
+
+    def _registro_total(self):
+        """Registro de este proceso o, con directorio compartido, la suma de todos los procesos"""
+        if not self.directorio:
+            return self._copia()
+
+        self.volcar()
+        registro = RegistroMetricas()
+        with self._bloqueo(exclusivo=False):
+            rutas = [os.path.join(self.directorio, self.ACUMULADO)]
+            rutas += glob.glob(os.path.join(self.directorio, 'proceso_*.json'))
+            for ruta in rutas:
+                datos = self._leer(ruta)
+                if datos is not None:
+                    registro.sumar(datos)
+        return registro
+
+    def exportar(self):
+        """Texto en formato de exposición de Prometheus, con las métricas adicionales de `extras`"""
+        p = self.prefijo
+        registro = self._registro_total()
+        lineas = []
+
+        def cabecera(nombre, tipo, ayuda):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+        def histograma(nombre, datos, **etiquetas):
+            acumulado = 0
+            for limite, conteo in zip(list(datos.buckets) + ['+Inf'], datos.conteos):
+                acumulado += conteo
+                lineas.append(f"{nombre}_bucket{{{_etiquetas(**etiquetas, le=limite)}}} {acumulado}")
+            lineas.append(f"{nombre}_sum{{{_etiquetas(**etiquetas)}}} {datos.suma:.6f}")
+            lineas.append(f"{nombre}_count{{{_etiquetas(**etiquetas)}}} {datos.total}")
+
+        cabecera(f"{p}_http_requests_total", "counter", "Peticiones atendidas por ruta, método y estado")
+        for (ruta, metodo, estado), n in sorted(registro.peticiones.items()):
+            lineas.append(f"{p}_http_requests_total{{{_etiquetas(route=ruta, method=metodo, status=estado)}}} {n}")
+
+        cabecera(f"{p}_http_request_duration_seconds", "histogram", "Duración total de las peticiones")
+        for (ruta, metodo), datos in sorted(registro.duracion.items()):
+            histograma(f"{p}_http_request_duration_seconds", datos, route=ruta, method=metodo)
+
+        cabecera(f"{p}_request_phase_seconds", "histogram", "Duración de cada fase de la petición (db, compute, serialize)")
+        for (ruta, fase), datos in sorted(registro.fases.items()):
+            histograma(f"{p}_request_phase_seconds", datos, route=ruta, phase=fase)
+
+        cabecera(f"{p}_db_queries_total", "counter", "Consultas SQL ejecutadas por ruta")
+        for ruta, n in sorted(registro.consultas.items()):
+            lineas.append(f"{p}_db_queries_total{{{_etiquetas(route=ruta)}}} {n}")
+
+        cabecera(f"{p}_db_rows_total", "counter", "Filas devueltas por la base de datos por ruta")
+        for ruta, n in sorted(registro.filas.items()):
+            lineas.append(f"{p}_db_rows_total{{{_etiquetas(route=ruta)}}} {n}")
+
+        for (nombre, tipo, ayuda), serie in registro.extras.items():
+            cabecera(f"{p}_{nombre}", tipo, ayuda)
+            for etiquetas, valor in sorted(serie.items()):
+                texto = f"{{{_etiquetas(**dict(etiquetas))}}}" if etiquetas else ""
+                lineas.append(f"{p}_{nombre}{texto} {int(valor) if float(valor).is_integer() else valor}")
+
+        return "\n".join(lineas) + "\n"
@@ -0,0 +1,176 @@
+import string
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+
+class Recomendacion:
+    """Texto de recomendación asociado a una regla.
+
+    El texto puede contener campos {indicador} que se rellenan con los valores
+    de la fila evaluada. Las secundarias se descartan primero al resumir.
+    """
+
+    def __init__(self, texto, secundaria=False):
+        self.texto = texto
+        self.secundaria = secundaria
+
+    def __repr__(self):
+        return f"Recomendacion({self.texto!r})"
+
+
+class Regla:
+    """Regla declarativa: condición vectorial sobre indicadores, mensaje y recomendaciones.
+
+    `condicion` es una función que recibe los indicadores, con una columna
+    (array de numpy) por atributo, y devuelve un array booleano o un valor
+    constante, p. ej. `lambda i: (i.n_finalizados > 0) & (i.eficiencia_finalizados > 10)`.
+    Se evalúa de una vez sobre columnas completas. Una regla sin categoría
+    solo aporta recomendaciones.
+    """
+
+    def __init__(self, codigo, condicion, categoria=None, mensaje=None, prioridad=100, recomendaciones=()):
+        if not callable(condicion):
+            raise TypeError(f"La condición de la regla {codigo} debe ser una función de los indicadores")
+        self.codigo = codigo
+        self.condicion = condicion
+        self.categoria = categoria
+        self.mensaje = mensaje
+        self.prioridad = prioridad
+        self.recomendaciones = tuple(
+            r if isinstance(r, Recomendacion) else Recomendacion(r) for r in recomendaciones
+        )
+
+    def __repr__(self):
+        return f"Regla({self.codigo!r})"
+
+
+class MotorReglas:
+    """Conjunto de reglas evaluadas columna a columna.
+
+    Los indicadores son un DataFrame con una fila por elemento evaluado (una
+    sola fila para la cartera completa, una por proyecto para el análisis por
+    proyecto); cada regla produce una columna booleana de activación.
+    """
+
+    def __init__(self, reglas, categorias=(), por_defecto=None):
+        self.reglas = list(reglas)
+        self.categorias = tuple(categorias)
+        self.por_defecto = dict(por_defecto or {})
+
+        codigos = [regla.codigo for regla in self.reglas]
+        repetidos = sorted({codigo for codigo in codigos if codigos.count(codigo) > 1})
+        if repetidos:
+            raise ValueError(f"Códigos de regla repetidos: {', '.join(repetidos)}")
+
+        self._por_codigo = {regla.codigo: regla for regla in self.reglas}
+
+    def regla(self, codigo):
+        return self._por_codigo[codigo]
+
+    def evaluar(self, indicadores):
+        """Evalúa todas las reglas sobre el DataFrame de indicadores"""
+        columnas = SimpleNamespace(**{columna: indicadores[columna].to_numpy() for columna in indicadores.columns})
+        filas = len(indicadores)
+
+        activaciones = {}
+        for regla in self.reglas:
+            try:
+                resultado = regla.condicion(columnas)
+            except AttributeError as e:
+                raise ValueError(f"La regla {regla.codigo} usa un indicador desconocido: {str(e)}") from e
+            # Las condiciones constantes (p. ej. `lambda i: True`) se extienden a todas las filas
+            activaciones[regla.codigo] = np.broadcast_to(np.asarray(resultado, dtype=bool), (filas,))
+
+        return EvaluacionReglas(self, indicadores, pd.DataFrame(activaciones, index=indicadores.index))
+
+
+class EvaluacionReglas:
+    """Resultado de evaluar un MotorReglas: activaciones por fila y código de regla"""
+
+    def __init__(self, motor, indicadores, activaciones):
+        self.motor = motor
+        self.indicadores = indicadores
+        self.activaciones = activaciones
+
+    def _valores(self, fila):
+        # Columna a columna para conservar el tipo de cada indicador (enteros sin decimales)
+        return {columna: self.indicadores[columna].iat[fila] for columna in self.indicadores.columns}
+
+    def codigos(self, fila=0):
+        """Códigos de las reglas activadas en una fila, en orden de declaración"""
+        activadas = self.activaciones.iloc[fila]
+        return [regla.codigo for regla in self.motor.reglas if activadas[regla.codigo]]
+
+    def analisis(self, fila=0):
+        """Mensajes de las reglas activadas agrupados por categoría (con el mensaje por defecto si no hay ninguno)"""
+        valores = None
+        resultado = {categoria: [] for categoria in self.motor.categorias}
+        for codigo in self.codigos(fila):
+            regla = self.motor.regla(codigo)
+            if regla.categoria is None or regla.mensaje is None:
+                continue
+            valores = valores if valores is not None else self._valores(fila)
+            resultado.setdefault(regla.categoria, []).append(regla.mensaje.format(**valores))
+
+        for categoria, mensaje in self.motor.por_defecto.items():
+            if not resultado.get(categoria):
+                resultado[categoria] = [mensaje]
+        return resultado
+
+    def recomendaciones(self, fila=0):
+        """Recomendaciones de las reglas activadas ordenadas por prioridad, como Recomendacion con el texto ya rellenado"""
+        activadas = [self.motor.regla(codigo) for codigo in self.codigos(fila)]
+        activadas = [regla for regla in activadas if regla.recomendaciones]
+        if not activadas:
+            return []
+
+        valores = self._valores(fila)
+        resultado = []
+        for regla in sorted(activadas, key=lambda r: r.prioridad):
+            for recomendacion in regla.recomendaciones:
+                resultado.append(Recomendacion(recomendacion.texto.format(**valores), recomendacion.secundaria))
+        return resultado
+
+    def _textos(self, plantilla, filas):
+        """Plantilla rellenada para cada una de las filas indicadas"""
+        campos = {
+            nombre.split('.')[0].split('[')[0]
+            for _, nombre, _, _ in string.Formatter().parse(plantilla) if nombre
+        }
+        if not campos:
+            return [plantilla] * len(filas)
+        valores = {campo: self.indicadores[campo].to_numpy()[filas].tolist() for campo in campos}
+        return [plantilla.format(**{campo: valores[campo][i] for campo in campos}) for i in range(len(filas))]
+
+    def analisis_filas(self):
+        """Análisis de todas las filas: se recorren las reglas (no las filas) y solo se rellenan las activadas"""
+        resultados = [{categoria: [] for categoria in self.motor.categorias} for _ in range(len(self.indicadores))]
+        for regla in self.motor.reglas:
+            if regla.categoria is None or regla.mensaje is None:
+                continue
+            filas = np.flatnonzero(self.activaciones[regla.codigo].to_numpy())
+            for fila, mensaje in zip(filas.tolist(), self._textos(regla.mensaje, filas)):
+                resultados[fila].setdefault(regla.categoria, []).append(mensaje)
+
+        for resultado in resultados:
+            for categoria, mensaje in self.motor.por_defecto.items():
+                if not resultado.get(categoria):
+                    resultado[categoria] = [mensaje]
+        return resultados
+
+    def recomendaciones_filas(self):
+        """Recomendaciones de todas las filas, en el mismo orden por prioridad que recomendaciones()"""
+        resultados = [[] for _ in range(len(self.indicadores))]
+        # La ordenación es estable: recorrer las reglas ordenadas equivale a ordenar las activadas de cada fila
+        for regla in sorted(self.motor.reglas, key=lambda r: r.prioridad):
+            if not regla.recomendaciones:
+                continue
+            filas = np.flatnonzero(self.activaciones[regla.codigo].to_numpy())
+            if len(filas) == 0:
+                continue
+            for recomendacion in regla.recomendaciones:
+                for fila, texto in zip(filas.tolist(), self._textos(recomendacion.texto, filas)):
+                    resultados[fila].append(Recomendacion(texto, recomendacion.secundaria))
+        return resultados
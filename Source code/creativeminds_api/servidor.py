@@ -0,0 +1,104 @@
+"""Arranque de producción de la API con gunicorn (pre-fork, varios workers).
+
+Este archivo sirve a la vez de lanzador y de archivo de configuración:
+
+    python servidor.py
+    gunicorn -c servidor.py app:app
+
+Se sirve la aplicación `app` del módulo app.py, que se crea una sola vez al
+importarlo (en el maestro, por preload_app). La configuración se lee de las
+variables de entorno WEB_*.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Directorio en el que los workers publican sus métricas para que /api/metrics
+# devuelva los totales del servidor; si no se indica se crea uno temporal
+_directorio_metricas_temporal = None
+if not os.getenv('METRICS_MULTIPROC_DIR'):
+    _directorio_metricas_temporal = tempfile.mkdtemp(prefix='creativeminds-metricas-')
+    os.environ['METRICS_MULTIPROC_DIR'] = _directorio_metricas_temporal
+
+
+def _entero(nombre, por_defecto):
+    valor = os.getenv(nombre)
+    return int(valor) if valor else por_defecto
+
+
+# Configuración de gunicorn
+bind = os.getenv('WEB_BIND', '0.0.0.0:5000')
+workers = _entero('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+threads = _entero('WEB_THREADS', 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = _entero('WEB_TIMEOUT', 60)
+graceful_timeout = _entero('WEB_GRACEFUL_TIMEOUT', 30)
+keepalive = _entero('WEB_KEEPALIVE', 5)
+
+# Reciclar cada worker tras un número de peticiones (con variación para que no reinicien todos a la vez)
+max_requests = _entero('WEB_MAX_REQUESTS', 1000)
+max_requests_jitter = _entero('WEB_MAX_REQUESTS_JITTER', 100)
+
+# Cargar la aplicación en el proceso maestro antes del fork: los workers comparten
+# el código importado y arrancan más rápido
+preload_app = True
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('WEB_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    """Antes de crear los workers, el maestro carga el almacén de agregados una sola vez"""
+    from app import preparar_maestro
+    preparar_maestro()
+
+
+def post_fork(server, worker):
+    """Tras el fork, cada worker crea sus propios pools y abre sus conexiones"""
+    from app import preparar_worker
+    preparar_worker()
+
+
+def worker_exit(server, worker):
+    """En el worker que termina (p. ej. al reciclarse), vuelca sus últimas métricas"""
+    from app import cerrar_worker
+    cerrar_worker()
+
+
+def child_exit(server, worker):
+    """En el maestro, acumula las métricas del worker que ha terminado"""
+    from app import worker_terminado
+    worker_terminado(worker.pid)
+
+
+def on_exit(server):
+    """Al parar el servidor se borra el directorio de métricas temporal"""
+    if _directorio_metricas_temporal:
+        shutil.rmtree(_directorio_metricas_temporal, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    from gunicorn.app.base import BaseApplication
+
+    class ServidorAPI(BaseApplication):
+        """Aplicación gunicorn con la configuración de este módulo"""
+
+        def load_config(self):
+            ajustes = {
+                clave: valor for clave, valor in globals().items()
+                if clave in self.cfg.settings and valor is not None
+            }
+            for clave, valor in ajustes.items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            from app import app
+            return app
+
+    ServidorAPI().run()
@@ -0,0 +1,142 @@
+"""Agregados incrementales frente al cálculo completo de _metricas_dashboard"""
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import app
+from agregados_incrementales import COLUMNAS_EMPLEADO, COLUMNAS_PROYECTO, COLUMNAS_TAREA, AlmacenAgregados
+from benchmark_funciones import crear_fixture
+from instantanea import InstantaneaCartera
+
+HOY = date.today()
+
+
+def _filas(df, columnas):
+    """Filas como las devuelve la base de datos (None en lugar de NaN)"""
+    df = df[columnas].astype(object)
+    return df.where(df.notna(), None).to_dict(orient='records')
+
+
+def _aplicar(almacen, proyectos=(), tareas=(), empleados=(), existentes=None):
+    """Aplica filas leídas y, si se indica, los ids existentes de la reconciliación"""
+    with almacen._lock:
+        almacen._aplicar_cambios('proyectos', list(proyectos))
+        almacen._aplicar_cambios('tareas', list(tareas))
+        almacen._aplicar_cambios('empleados', list(empleados))
+        if existentes is not None:
+            almacen._reconciliar_borrados(existentes)
+        almacen.version += 1
+
+
+def _comprobar(almacen):
+    esperado = app._metricas_dashboard(InstantaneaCartera(almacen.version, *almacen.marcos()))
+    obtenido = almacen.metricas()
+    assert obtenido.keys() == esperado.keys()
+    for clave, valor in esperado.items():
+        assert obtenido[clave] == pytest.approx(valor), clave
+
+
+@pytest.fixture
+def cartera():
+    fixture = crear_fixture(300, semilla=11)
+    tareas = fixture["tareas"].join(fixture["tareas_analisis"][['responsable_id']])
+    filas = {
+        "proyectos": _filas(fixture["proyectos"], COLUMNAS_PROYECTO),
+        "tareas": _filas(tareas, COLUMNAS_TAREA),
+        "empleados": _filas(fixture["empleados_totales"], COLUMNAS_EMPLEADO),
+    }
+    almacen = AlmacenAgregados(intervalo_sondeo=0)
+    _aplicar(almacen, **filas)
+    return almacen, filas
+
+
+def test_carga_inicial(cartera):
+    almacen, _ = cartera
+    _comprobar(almacen)
+    assert almacen.metricas()["proyectos_retrasados"] > 0
+
+
+def test_modificaciones(cartera):
+    almacen, filas = cartera
+    proyectos, tareas, empleados = filas["proyectos"], filas["tareas"], filas["empleados"]
+
+    cambios_proyectos = [
+        dict(proyectos[0], estado='finalizado'),
+        dict(proyectos[1], estado='en_progreso', fecha_fin=HOY - timedelta(days=5)),
+        dict(proyectos[2], costo_total_recursos=proyectos[2]['costo_total_recursos'] * 3, porcentaje_progreso=None),
+    ]
+    cambios_tareas = [
+        dict(tareas[0], estado='completada'),
+        dict(tareas[1], estado='pendiente', fecha_final=HOY - timedelta(days=1)),
+        dict(tareas[2], responsable_id=None),
+    ]
+    cambios_empleados = [dict(empleados[0], disponibilidad='disponible' if empleados[0]['disponibilidad'] != 'disponible' else 'asignado')]
+    _aplicar(almacen, cambios_proyectos, cambios_tareas, cambios_empleados)
+    _comprobar(almacen)
+
+    # Las filas repetidas de la ventana de solape no se vuelven a aplicar
+    aplicadas = almacen.filas_aplicadas
+    _aplicar(almacen, cambios_proyectos, cambios_tareas, cambios_empleados)
+    assert almacen.filas_aplicadas == aplicadas
+    _comprobar(almacen)
+
+
+def test_altas_y_bajas(cartera):
+    almacen, filas = cartera
+    proyectos, tareas, empleados = filas["proyectos"], filas["tareas"], filas["empleados"]
+
+    # Alta de un proyecto vencido con una tarea
+    nuevo = dict(proyectos[0], id=max(p['id'] for p in proyectos) + 1, estado='en_progreso',
+                 fecha_fin=HOY - timedelta(days=30))
+    tarea = dict(tareas[0], id=max(t['id'] for t in tareas) + 1, proyecto_id=nuevo['id'], estado='completada')
+    _aplicar(almacen, [nuevo], [tarea])
+    _comprobar(almacen)
+
+    # Baja de un proyecto con sus tareas y de un empleado
+    borrado = proyectos[3]['id']
+    _aplicar(almacen, existentes={
+        "proyectos": {p['id'] for p in proyectos if p['id'] != borrado} | {nuevo['id']},
+        "tareas": {t['id'] for t in tareas if t['proyecto_id'] != borrado} | {tarea['id']},
+        "empleados": {e['id'] for e in empleados[1:]},
+    })
+    assert almacen.filas_eliminadas == 1 + sum(t['proyecto_id'] == borrado for t in tareas) + 1
+    _comprobar(almacen)
+
+
+def test_tareas_sin_proyecto_cargado(cartera):
+    almacen, filas = cartera
+    proyectos, tareas = filas["proyectos"], filas["tareas"]
+    siguiente = max(t['id'] for t in tareas) + 1
+
+    # Tareas sin proyecto o de un proyecto que aún no se ha leído no cuentan (como en el JOIN)
+    pendiente_id = max(p['id'] for p in proyectos) + 1
+    huerfanas = [
+        dict(tareas[0], id=siguiente, proyecto_id=None, estado='completada'),
+        dict(tareas[0], id=siguiente + 1, proyecto_id=pendiente_id, estado='pendiente'),
+    ]
+    total = almacen.metricas()["total_tareas"]
+    _aplicar(almacen, tareas=huerfanas)
+    assert almacen.metricas()["total_tareas"] == total
+    _comprobar(almacen)
+
+    # Al llegar el proyecto se cuentan sus tareas, y al borrarlo se descuentan
+    _aplicar(almacen, proyectos=[dict(proyectos[0], id=pendiente_id)])
+    assert almacen.metricas()["total_tareas"] == total + 1
+    _comprobar(almacen)
+
+    _aplicar(almacen, existentes={"proyectos": {p['id'] for p in proyectos}})
+    assert almacen.metricas()["total_tareas"] == total
+    _comprobar(almacen)
+
+
+def test_marcos_alineados_con_las_filas(cartera):
+    almacen, filas = cartera
+    proyectos_df, tareas_df, empleados_df = almacen.marcos()
+
+    assert len(proyectos_df) == len(filas["proyectos"])
+    assert len(tareas_df) == len(filas["tareas"])
+    assert len(empleados_df) == len(filas["empleados"])
+    # Sin cambios se devuelven los mismos DataFrames
+    assert almacen.marcos()[0] is proyectos_df
+    assert pd.Series(tareas_df.columns).isin(COLUMNAS_TAREA + ['nombre_proyecto']).all()
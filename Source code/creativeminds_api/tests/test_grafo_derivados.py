@@ -0,0 +1,96 @@
+"""Grafo de valores derivados: cada nodo se calcula una vez por evaluación"""
+from collections import Counter
+
+import pytest
+
+import app
+from benchmark_funciones import crear_fixture
+from grafo_derivados import GrafoDerivados
+
+
+def _grafo_contado():
+    llamadas = Counter()
+    grafo = GrafoDerivados()
+
+    @grafo.nodo('doble')
+    def doble(x):
+        llamadas['doble'] += 1
+        return 2 * x
+
+    @grafo.nodo('suma')
+    def suma(x, doble):
+        llamadas['suma'] += 1
+        return x + doble
+
+    @grafo.nodo('producto')
+    def producto(doble, suma):
+        llamadas['producto'] += 1
+        return doble * suma
+
+    return grafo, llamadas
+
+
+def test_cada_nodo_se_calcula_una_vez():
+    grafo, llamadas = _grafo_contado()
+    contexto = grafo.evaluar(x=3)
+
+    assert contexto['producto'] == 54
+    assert contexto['suma'] == 9
+    assert llamadas == {'doble': 1, 'suma': 1, 'producto': 1}
+
+
+def test_cada_evaluacion_tiene_sus_valores():
+    grafo, llamadas = _grafo_contado()
+
+    assert grafo.evaluar(x=1)['producto'] == 6
+    assert grafo.evaluar(x=2)['producto'] == 24
+    assert llamadas['doble'] == 2
+
+
+def test_entradas_sustituyen_a_los_nodos():
+    grafo, llamadas = _grafo_contado()
+
+    assert grafo.evaluar(x=3, doble=10)['suma'] == 13
+    assert llamadas['doble'] == 0
+
+
+def test_errores():
+    grafo = GrafoDerivados()
+
+    @grafo.nodo('a')
+    def a(b):
+        return b
+
+    @grafo.nodo('b')
+    def b(a):
+        return a
+
+    with pytest.raises(ValueError):
+        grafo.evaluar()['a']
+    with pytest.raises(KeyError):
+        grafo.evaluar()['c']
+
+
+def test_grafo_del_proyecto_comparte_los_valores_intermedios():
+    fixture = crear_fixture(100)
+    contexto = app._evaluar_proyecto(
+        fixture["proyecto"], fixture["tareas_proyecto"], fixture["recursos_proyecto"], fixture["kpis_proyecto"]
+    )
+
+    contexto['analisis']
+    reglas = contexto['reglas']
+    contexto['recomendaciones']
+    contexto['metricas']
+
+    # Análisis y recomendaciones salen de la misma evaluación de reglas
+    assert contexto['reglas'] is reglas
+    assert {'indicadores', 'reglas', 'analisis', 'recomendaciones', 'metricas', 'conteo_estados_tareas'} <= set(contexto.calculados())
+
+
+def test_tareas_sin_estado_cuentan_en_el_total():
+    fixture = crear_fixture(100)
+    tareas = fixture["tareas_proyecto"].copy()
+    tareas.iloc[0, tareas.columns.get_loc('estado')] = None
+    metricas = app._evaluar_proyecto(fixture["proyecto"], tareas, fixture["recursos_proyecto"], fixture["kpis_proyecto"])['metricas']
+
+    assert metricas['total_tareas'] == len(tareas)
@@ -0,0 +1,114 @@
+"""Análisis FODA y recomendaciones globales de la cartera (motor_cartera)"""
+from datetime import date, timedelta
+
+import pytest
+
+import app
+from benchmark_funciones import crear_fixture
+
+HOY = date.today()
+DEPARTAMENTOS = ['Diseño', 'Desarrollo', 'Marketing', 'Ventas', 'Administración']
+
+
+@pytest.fixture
+def fixture():
+    return crear_fixture(200, semilla=3)
+
+
+def _cartera(fixture, en_progreso, ratio_costo, progreso, cada_disponible):
+    """Proyectos, tareas y empleados del fixture con los valores que activan las reglas de cada caso"""
+    proyectos = fixture["proyectos"].reset_index(drop=True).copy()
+    tareas = fixture["tareas"].join(fixture["tareas_analisis"][['responsable_id']])
+    empleados = fixture["empleados_totales"].reset_index(drop=True).copy()
+
+    activos = proyectos.index < en_progreso
+    proyectos['estado'] = ['en_progreso' if activo else 'finalizado' for activo in activos]
+    proyectos['presupuesto_estimado'] = 1000.0
+    proyectos['costo_total_recursos'] = 1000.0 * ratio_costo
+    proyectos['porcentaje_progreso'] = progreso
+    # Los proyectos activos pares ya pasaron su fecha de fin
+    proyectos['fecha_fin'] = [
+        HOY - timedelta(days=10) if activo and i % 2 == 0 else HOY + timedelta(days=100)
+        for i, activo in enumerate(activos)
+    ]
+
+    empleados['disponibilidad'] = ['disponible' if i % cada_disponible == 0 else 'asignado' for i in range(len(empleados))]
+    empleados['departamento'] = [DEPARTAMENTOS[i % len(DEPARTAMENTOS)] for i in range(len(empleados))]
+    return proyectos, tareas, empleados
+
+
+def test_cartera_con_problemas_recorta_las_recomendaciones(fixture):
+    proyectos, tareas, empleados = _cartera(fixture, en_progreso=100, ratio_costo=1.2, progreso=10.0, cada_disponible=10)
+    proyectos.loc[0, 'porcentaje_progreso'] = 95.0
+    # Todas las tareas al mismo empleado: sobrecarga y reparto desigual
+    tareas['responsable_id'] = empleados['id'].iat[0]
+    disponibles = 100 * len(range(0, len(empleados), 10)) / len(empleados)
+
+    evaluacion = app._evaluar_reglas_cartera(proyectos, tareas, empleados)
+
+    assert app._analizar_fortalezas_debilidades(proyectos, tareas, empleados, evaluacion) == {
+        "fortalezas": ["Buena colaboración interdepartamental (5 departamentos)"],
+        "debilidades": [
+            "Tendencia a superar presupuestos (20.00% de sobrecosto promedio)",
+            "Alto porcentaje de proyectos retrasados (50.00%)",
+            "Bajo progreso promedio en los proyectos activos (10.85%)",
+            "Distribución desigual de la carga de trabajo entre empleados",
+        ],
+        "oportunidades": ["Considerar implementar más KPIs para medir el rendimiento de los proyectos"],
+        "amenazas": [
+            f"Baja disponibilidad de personal ({disponibles:.2f}%)",
+            f"Posible sobrecarga de trabajo en algunos empleados (máx. {len(tareas)} tareas)",
+        ],
+    }
+    # 16 recomendaciones: las 8 primeras no secundarias por prioridad y las 2 genéricas
+    assert len(evaluacion.recomendaciones()) == 16
+    assert app._generar_recomendaciones(evaluacion) == [
+        "Establecer revisiones periódicas de gastos durante la ejecución de proyectos",
+        "Revisar y ajustar el proceso de planificación de plazos",
+        "Realizar revisiones semanales del progreso de proyectos críticos",
+        "Considerar la implementación de metodologías ágiles para mejorar la velocidad de entrega",
+        "Revisar la asignación de tareas para equilibrar la carga de trabajo",
+        "Evaluar la necesidad de contratar personal adicional o freelancers",
+        "Priorizar proyectos y posiblemente posponer los menos críticos",
+        "Redistribuir tareas entre el equipo para evitar el agotamiento",
+        "Implementar reuniones retrospectivas al finalizar cada proyecto",
+        "Mantener una base de conocimientos con lecciones aprendidas",
+    ]
+
+
+def test_cartera_sana_mantiene_todas_las_recomendaciones(fixture):
+    proyectos, tareas, empleados = _cartera(fixture, en_progreso=5, ratio_costo=0.8, progreso=80.0, cada_disponible=2)
+    # Ningún proyecto activo vencido
+    proyectos.loc[proyectos['estado'] == 'en_progreso', 'fecha_fin'] = HOY + timedelta(days=100)
+    # Sin id de empleado (como en la instantánea) no se evalúa la carga de trabajo
+    empleados = empleados.drop(columns='id')
+
+    evaluacion = app._evaluar_reglas_cartera(proyectos, tareas, empleados)
+
+    assert evaluacion.codigos() == ['EFICIENCIA_ALTA', 'PLAZOS_CUMPLIDOS', 'PERSONAL_DISPONIBLE', 'PROGRESO_ALTO',
+                                    'COLABORACION', 'BUENAS_PRACTICAS']
+    assert app._analizar_fortalezas_debilidades(proyectos, tareas, empleados, evaluacion) == {
+        "fortalezas": [
+            "Buena eficiencia presupuestaria global (20.00% de ahorro promedio)",
+            "Excelente cumplimiento de plazos (solo 0.00% de proyectos retrasados)",
+            "Buen progreso promedio en los proyectos activos (80.00%)",
+            "Buena colaboración interdepartamental (5 departamentos)",
+        ],
+        "debilidades": ["No se identificaron debilidades críticas en este momento"],
+        "oportunidades": ["Alta disponibilidad de personal (50.00%) para nuevos proyectos"],
+        "amenazas": ["Vigilar la asignación de recursos para evitar cuellos de botella"],
+    }
+    assert app._generar_recomendaciones(evaluacion) == [
+        "Aprovechar la disponibilidad para capacitar al personal en nuevas habilidades",
+        "Considerar iniciar proyectos estratégicos planificados para el futuro",
+        "Implementar reuniones retrospectivas al finalizar cada proyecto para identificar mejoras",
+        "Mantener una base de conocimientos documentando lecciones aprendidas de cada proyecto",
+    ]
+
+
+def test_analisis_sin_evaluacion_previa_igual_al_de_la_evaluacion(fixture):
+    proyectos, tareas, empleados = fixture["proyectos"], fixture["tareas"], fixture["empleados"]
+    evaluacion = app._evaluar_reglas_cartera(proyectos, tareas, empleados)
+
+    assert app._analizar_fortalezas_debilidades(proyectos, tareas, empleados) == evaluacion.analisis()
+    assert set(evaluacion.analisis()) == set(app.motor_cartera.categorias)
@@ -0,0 +1,122 @@
+"""Paridad entre el análisis de un proyecto (grafo) y el de toda la cartera (/proyectos/analisis)"""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import app
+from benchmark_funciones import crear_fixture
+
+HOY = date(2024, 6, 1)
+
+
+@pytest.fixture(scope='module')
+def cartera():
+    fixture = crear_fixture(300, semilla=7)
+    proyectos = fixture["proyectos_analisis"].reset_index(drop=True)
+    tareas = fixture["tareas_analisis"].reset_index(drop=True)
+    # Casos límite que no siempre salen en los datos sintéticos
+    proyectos.loc[0, ['fecha_inicio', 'fecha_fin']] = None
+    proyectos.loc[1, 'presupuesto_estimado'] = 0
+    proyectos.loc[2, 'costo_total_recursos'] = 0
+    tareas.loc[tareas['proyecto_id'] == proyectos.loc[3, 'id'], 'responsable_id'] = None
+    tareas.loc[tareas['proyecto_id'] == proyectos.loc[4, 'id'], 'estado'] = None
+    return proyectos, tareas, fixture["recursos"], fixture["kpis"]
+
+
+def _evaluar_uno(proyectos, tareas, recursos, kpis, fila):
+    proyecto = proyectos.iloc[fila]
+    return app._evaluar_proyecto(
+        proyecto,
+        tareas[tareas['proyecto_id'] == proyecto['id']],
+        recursos[recursos['proyecto_id'] == proyecto['id']],
+        kpis[kpis['proyecto_id'] == proyecto['id']],
+        HOY
+    )
+
+
+def test_analisis_de_un_proyecto_igual_al_de_la_cartera(cartera):
+    proyectos, tareas, recursos, kpis = cartera
+    conjunto = app._analisis_proyectos(proyectos, tareas, recursos, kpis, HOY)
+
+    for fila, esperado in enumerate(conjunto):
+        derivados = _evaluar_uno(proyectos, tareas, recursos, kpis, fila)
+        assert derivados['analisis'] == esperado['analisis'], esperado['id']
+        assert derivados['recomendaciones'] == esperado['recomendaciones'], esperado['id']
+
+
+def test_indicadores_coinciden_con_las_metricas_del_proyecto(cartera):
+    proyectos, tareas, recursos, kpis = cartera
+    indicadores = app._indicadores_proyectos(proyectos, tareas, recursos, kpis, HOY)
+    comunes = ['tasa_completitud', 'porcentaje_presupuesto_usado', 'indice_rendimiento_cronograma',
+               'indice_rendimiento_costo', 'total_recursos', 'total_kpis']
+
+    for fila in range(len(proyectos)):
+        metricas = _evaluar_uno(proyectos, tareas, recursos, kpis, fila)['metricas']
+        for campo in comunes:
+            assert indicadores[campo].iat[fila] == pytest.approx(metricas[campo]), (fila, campo)
+        # Sin fechas las métricas dan None y los indicadores NaN
+        for campo in ('porcentaje_tiempo_transcurrido', 'desviacion_tiempo_progreso'):
+            if metricas[campo] is None:
+                assert pd.isna(indicadores[campo].iat[fila]), (fila, campo)
+            else:
+                assert indicadores[campo].iat[fila] == pytest.approx(metricas[campo]), (fila, campo)
+
+
+def _proyecto(**valores):
+    base = {
+        "id": 1, "nombre": "P", "estado": "en_progreso",
+        "fecha_inicio": date(2024, 1, 1), "fecha_fin": date(2024, 12, 31),
+        "presupuesto_estimado": 1000.0, "costo_total_recursos": 500.0, "porcentaje_progreso": 50.0,
+    }
+    base.update(valores)
+    return pd.Series(base)
+
+
+def _tareas(*filas):
+    return pd.DataFrame(list(filas), columns=['proyecto_id', 'estado', 'fecha_comienzo', 'fecha_final', 'responsable_id'])
+
+
+def _recursos(n):
+    return pd.DataFrame({"proyecto_id": [1] * n})
+
+
+def test_proyecto_sin_fechas_no_activa_reglas_de_tiempo():
+    derivados = app._evaluar_proyecto(
+        _proyecto(fecha_inicio=None, fecha_fin=None, costo_total_recursos=1000.0, porcentaje_progreso=10.0),
+        _tareas(), _recursos(3), _recursos(3), HOY
+    )
+
+    # Sin valor planificado el índice de cronograma es 0 y cuenta como retraso
+    assert derivados['analisis']['puntos_debiles'] == ["Retraso en el cronograma", "Sobrecosto del proyecto"]
+    assert derivados['analisis']['riesgos'] == [app.motor_proyectos.por_defecto['riesgos']]
+    assert derivados['analisis']['puntos_fuertes'] == [app.motor_proyectos.por_defecto['puntos_fuertes']]
+    assert derivados['recomendaciones'] == [
+        "Reevaluar el presupuesto del proyecto, ya que está cerca o por encima del límite",
+    ]
+
+
+def test_recomendaciones_con_recuentos_y_orden_de_prioridad():
+    tareas = _tareas(
+        (1, 'pendiente', date(2024, 2, 1), date(2024, 3, 1), None),
+        (1, 'pendiente', date(2024, 2, 1), date(2024, 7, 1), 5),
+        (1, 'completada', date(2024, 1, 1), date(2024, 2, 1), 5),
+    )
+    derivados = app._evaluar_proyecto(_proyecto(), tareas, _recursos(0), _recursos(0), HOY)
+
+    assert derivados['recomendaciones'] == [
+        "Asignar responsables a las 1 tareas sin asignar",
+        "Priorizar las 1 tareas retrasadas",
+        "Asignar recursos al proyecto para un mejor seguimiento y control",
+    ]
+    assert derivados['analisis']['oportunidades'] == [
+        "Definir más KPIs para un mejor seguimiento del proyecto",
+        "Considerar asignar más recursos al proyecto",
+    ]
+
+
+def test_proyecto_sin_reglas_activadas_da_la_recomendacion_generica():
+    proyecto = _proyecto(porcentaje_progreso=42.0, costo_total_recursos=420.0)
+    derivados = app._evaluar_proyecto(proyecto, _tareas(), _recursos(3), _recursos(3), HOY)
+
+    assert derivados['recomendaciones'] == [app.RECOMENDACION_PROYECTO_POR_DEFECTO]
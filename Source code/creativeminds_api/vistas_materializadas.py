@@ -0,0 +1,254 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Clave del bloqueo consultivo que evita refrescos simultáneos desde varios procesos
+CLAVE_BLOQUEO_REFRESCO = 74210316
+
+# Agregados por departamento. Los proyectos se deduplican por departamento antes
+# de agregar, así un proyecto con varios empleados del mismo departamento cuenta
+# una sola vez en AVG y SUM.
+SQL_RENDIMIENTO_DEPARTAMENTO = """
+    WITH empleados_departamento AS (
+        SELECT departamento, COUNT(*) AS total_empleados
+        FROM creativeminds_empleado
+        WHERE departamento IS NOT NULL
+        GROUP BY departamento
+    ),
+    proyectos_departamento AS (
+        SELECT DISTINCT e.departamento, pe.proyecto_id
+        FROM creativeminds_empleado e
+        JOIN creativeminds_proyecto_empleado_rel pe ON e.id = pe.empleado_id
+        WHERE e.departamento IS NOT NULL
+    ),
+    agregados_proyectos AS (
+        SELECT
+            pd.departamento,
+            COUNT(p.id) AS total_proyectos,
+            AVG(p.porcentaje_progreso) AS progreso_promedio,
+            SUM(p.costo_total_recursos) AS costo_total,
+            SUM(p.presupuesto_estimado) AS presupuesto_total
+        FROM proyectos_departamento pd
+        JOIN creativeminds_proyecto p ON p.id = pd.proyecto_id
+        GROUP BY pd.departamento
+    )
+    SELECT
+        ed.departamento,
+        ed.total_empleados,
+        COALESCE(ap.total_proyectos, 0) AS total_proyectos,
+        ap.progreso_promedio,
+        ap.costo_total,
+        ap.presupuesto_total
+    FROM empleados_departamento ed
+    LEFT JOIN agregados_proyectos ap ON ap.departamento = ed.departamento
+"""
+
+# Agregados por equipo, con los miembros y los proyectos deduplicados por equipo
+SQL_RENDIMIENTO_EQUIPO = """
+    WITH miembros_equipo AS (
+        SELECT ee.equipo_id, COUNT(DISTINCT em.id) AS total_miembros
+        FROM creativeminds_equipo_empleado_rel ee
+        JOIN creativeminds_empleado em ON ee.empleado_id = em.id
+        GROUP BY ee.equipo_id
+    ),
+    proyectos_equipo AS (
+        SELECT DISTINCT ee.equipo_id, pe.proyecto_id
+        FROM creativeminds_equipo_empleado_rel ee
+        JOIN creativeminds_empleado em ON ee.empleado_id = em.id
+        JOIN creativeminds_proyecto_empleado_rel pe ON em.id = pe.empleado_id
+    ),
+    agregados_proyectos AS (
+        SELECT
+            pq.equipo_id,
+            COUNT(p.id) AS total_proyectos,
+            AVG(p.porcentaje_progreso) AS progreso_promedio
+        FROM proyectos_equipo pq
+        JOIN creativeminds_proyecto p ON p.id = pq.proyecto_id
+        GROUP BY pq.equipo_id
+    )
+    SELECT
+        eq.id,
+        eq.nombre,
+        COALESCE(me.total_miembros, 0) AS total_miembros,
+        COALESCE(ap.total_proyectos, 0) AS total_proyectos,
+        ap.progreso_promedio
+    FROM creativeminds_equipo eq
+    LEFT JOIN miembros_equipo me ON me.equipo_id = eq.id
+    LEFT JOIN agregados_proyectos ap ON ap.equipo_id = eq.id
+"""
+
+# nombre de la vista: (consulta que la define, columna única para el refresco concurrente, orden de lectura)
+VISTAS_RENDIMIENTO = {
+    'creativeminds_api_rendimiento_departamento': (SQL_RENDIMIENTO_DEPARTAMENTO, 'departamento', 'departamento'),
+    'creativeminds_api_rendimiento_equipo': (SQL_RENDIMIENTO_EQUIPO, 'id', 'id'),
+}
+
+
+class GestorVistasMaterializadas:
+    """Crea, refresca y sirve las vistas materializadas de rendimiento.
+
+    Las vistas se crean la primera vez que se consultan y se refrescan con
+    REFRESH MATERIALIZED VIEW CONCURRENTLY cada `intervalo_refresco` segundos
+    desde un hilo en segundo plano (0 desactiva el refresco programado). Si
+    las vistas están desactivadas o no se pueden crear, las consultas se
+    ejecutan directamente sobre las tablas con la misma definición.
+    """
+
+    def __init__(self, obtener_engine, vistas=None, habilitadas=True, intervalo_refresco=300):
+        self._obtener_engine = obtener_engine
+        self.vistas = VISTAS_RENDIMIENTO if vistas is None else vistas
+        self.habilitadas = habilitadas
+        self.intervalo_refresco = intervalo_refresco
+
+        self._lock = threading.Lock()
+        self._creadas = False
+        self._hilo = None
+        self._pid_hilo = None
+        self._detener = threading.Event()
+
+        self.refrescos = 0
+        self.errores_refresco = 0
+        self.ultimo_refresco = None
+        self.duracion_ultimo_refresco = None
+
+    @classmethod
+    def desde_entorno(cls, obtener_engine):
+        """Crea el gestor con METRICS_MATVIEWS_ENABLED y METRICS_MATVIEWS_REFRESH_SECONDS"""
+        habilitadas = os.getenv('METRICS_MATVIEWS_ENABLED', 'true').strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+        intervalo = float(os.getenv('METRICS_MATVIEWS_REFRESH_SECONDS', '300'))
+        return cls(obtener_engine, habilitadas=habilitadas, intervalo_refresco=intervalo)
+
+    def asegurar(self, engine):
+        """Crea las vistas y sus índices únicos si aún no existen. Devuelve si están disponibles.
+
+        Las vistas que ya existían (creadas antes de un reinicio) pueden tener
+        datos de entonces, así que se refrescan antes de servir la primera
+        consulta; solo se considera refrescado lo que se acaba de crear o
+        refrescar.
+        """
+        if not self.habilitadas:
+            return False
+        if self._creadas:
+            self._iniciar_programacion()
+            return True
+
+        with self._lock:
+            if not self._creadas:
+                try:
+                    with engine.begin() as conn:
+                        existentes = {
+                            fila[0] for fila in conn.execute(
+                                text("SELECT matviewname FROM pg_matviews WHERE schemaname = current_schema()")
+                            )
+                        }
+                        for nombre, (consulta, columna_unica, _) in self.vistas.items():
+                            conn.execute(text(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {nombre} AS {consulta}"))
+                            # El índice único es obligatorio para REFRESH ... CONCURRENTLY
+                            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {nombre}_unico ON {nombre} ({columna_unica})"))
+                    if existentes & set(self.vistas):
+                        # Se espera a un refresco en curso de otro proceso y se refresca igualmente
+                        self._refrescar_vistas(engine, esperar=True)
+                    else:
+                        self.ultimo_refresco = datetime.now()
+                    self._creadas = True
+                    logger.info(f"Vistas materializadas disponibles: {', '.join(self.vistas)}")
+                except Exception as e:
+                    logger.error(f"No se pudieron crear las vistas materializadas, se consultarán las tablas: {str(e)}")
+                    self.habilitadas = False
+                    return False
+
+        self._iniciar_programacion()
+        return True
+
+    def consulta(self, engine, nombre):
+        """Devuelve la consulta SQL que lee los agregados de una vista (o su definición si no está disponible)"""
+        definicion, _, orden = self.vistas[nombre]
+        if self.asegurar(engine):
+            return f"SELECT * FROM {nombre} ORDER BY {orden}"
+        return f"SELECT * FROM ({definicion}) AS {nombre} ORDER BY {orden}"
+
+    def refrescar(self, engine=None):
+        """Refresca todas las vistas sin bloquear las lecturas. Devuelve False si otro proceso ya lo está haciendo"""
+        engine = engine or self._obtener_engine()
+        if engine is None or not self.asegurar(engine):
+            return False
+
+        try:
+            return self._refrescar_vistas(engine)
+        except Exception as e:
+            self.errores_refresco += 1
+            logger.error(f"Error al refrescar las vistas materializadas: {str(e)}")
+            return False
+
+    def _refrescar_vistas(self, engine, esperar=False):
+        """Ejecuta el refresco; con `esperar` se espera al bloqueo en lugar de desistir si otro proceso lo tiene"""
+        inicio = time.perf_counter()
+        with engine.begin() as conn:
+            # Solo un proceso refresca a la vez; el bloqueo se libera al terminar la transacción
+            if esperar:
+                conn.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": CLAVE_BLOQUEO_REFRESCO})
+            elif not conn.execute(text("SELECT pg_try_advisory_xact_lock(:clave)"), {"clave": CLAVE_BLOQUEO_REFRESCO}).scalar():
+                return False
+            for nombre in self.vistas:
+                conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {nombre}"))
+
+        self.refrescos += 1
+        self.ultimo_refresco = datetime.now()
+        self.duracion_ultimo_refresco = time.perf_counter() - inicio
+        return True
+
+    def eliminar(self, engine=None):
+        """Elimina las vistas (p. ej. antes de actualizar el módulo de Odoo que modifica las tablas)"""
+        engine = engine or self._obtener_engine()
+        with self._lock:
+            with engine.begin() as conn:
+                for nombre in self.vistas:
+                    conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {nombre}"))
+            self._creadas = False
+
+    def _iniciar_programacion(self):
+        """Arranca el hilo de refresco en este proceso si no está en marcha"""
+        if self.intervalo_refresco <= 0:
+            return
+        # Tras un fork el hilo del proceso padre no existe en el hijo
+        if self._hilo is not None and self._pid_hilo == os.getpid() and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is not None and self._pid_hilo == os.getpid() and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle_refresco, name='refresco-vistas', daemon=True)
+            self._pid_hilo = os.getpid()
+            self._hilo.start()
+
+    def _bucle_refresco(self):
+        while not self._detener.wait(self.intervalo_refresco):
+            self.refrescar()
+
+    def detener(self):
+        """Detiene el refresco programado"""
+        self._detener.set()
+
+    def descripcion(self):
+        """Estado de las vistas para incluir en las respuestas"""
+        return {
+            "materializadas": self.habilitadas and self._creadas,
+            "actualizadas_en": self.ultimo_refresco.isoformat(timespec='seconds') if self.ultimo_refresco else None,
+            "intervalo_refresco_segundos": self.intervalo_refresco,
+        }
+
+    def estadisticas(self):
+        """Contadores de refresco de las vistas"""
+        datos = self.descripcion()
+        datos.update({
+            "refrescos": self.refrescos,
+            "errores_refresco": self.errores_refresco,
+            "duracion_ultimo_refresco_ms": round(self.duracion_ultimo_refresco * 1000, 3) if self.duracion_ultimo_refresco is not None else None,
+        })
+        return datos